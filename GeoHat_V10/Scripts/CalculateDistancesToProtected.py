@@ -2,14 +2,18 @@
 #CalculateDistancesToProteced.py
 #
 # Description: 
-#  This script uses the cost distance and cost back link rasters generated when
-#  the Create Edge List script is run. It loops through each patch and calculates
+#  This script uses the cost distance windows saved in the cost distance stack
+#  (see GeoHATstack.py) when the Create Edge List script is run. It loops through each patch and calculates
 #  zonal statistics to find the least cost distances between the patch and all
 #  the protected area clusters in the supplied protected areas raster. The result
 #  is an edge list of each patch, the protected areas, and the distances between
 #  them.
 #
-# Inputs: <Patch raster> <Protected area raster> <Cost distance raster folder>
+#  Completed patches are recorded in a ledger file beside the output. If a run
+#  is interrupted, run the script again with --resume to pick up where it left
+#  off.
+#
+# Inputs: <Patch raster> <Protected area raster> <Cost distance stack folder> {--resume}
 # Outputs: <Patch to protected area edge list>
 #
 # July 2012, John.Fay@duke.edu
@@ -17,11 +21,13 @@
 
 import sys, os, math, arcpy
 import arcpy.sa as sa
+import GeoHATledger, GeoHATstack
 
 arcpy.CheckOutExtension("Spatial")
 arcpy.env.overwriteOutput = True
 
 #Input variables
+resume = GeoHATledger.ResumeRequested(sys.argv)
 patchRaster = sys.argv[1]
 protectedRaster = sys.argv[2]
 CDs = sys.argv[3]
@@ -42,14 +48,19 @@ while row:
     row = rows.next()
 del row, rows
 
-#Create the output
-outFile = open(distanceCSV_Filename,'w')
-outFile.write("PatchID,ProtAreaID,Cost\n")
+#Create the output (or reopen it, if resuming)
+ledger = GeoHATledger.CompletionLedger(distanceCSV_Filename,resume)
+outFile = GeoHATledger.OpenCSV(distanceCSV_Filename,"PatchID,ProtAreaID,Cost\n",ledger)
+
+# Open the cost distance stack
+stack = GeoHATstack.OpenStack(CDs)
 
-# Loop through CD rasters and calculate zonal min to each protected area
+# Loop through CD windows and calculate zonal min to each protected area
 for ID in patchIDs:
+    if ledger.IsComplete(ID) or ID not in stack:
+        continue
     msg("Working on patch %d" %ID)
-    CD_Raster = CDs + "\\CD_%s.img" %ID
+    CD_Raster = GeoHATstack.ReadRasters(stack,ID)[0]
     zStatTable = sa.ZonalStatisticsAsTable(protectedRaster,"VALUE",CD_Raster,"in_memory/ZStat",'',"MINIMUM")
     recs = arcpy.SearchCursor(zStatTable)
     rec = recs.next()
@@ -57,5 +68,8 @@ for ID in patchIDs:
         outFile.write("%s,%d,%s\n" %(ID, rec.VALUE, rec.MIN))
         rec = recs.next()
     del rec, recs
+    GeoHATledger.CommitCSV(outFile,ledger,ID)
 
-outFile.close()
\ No newline at end of file
+outFile.close()
+stack.Close()
+ledger.Close()
\ No newline at end of file
@@ -8,6 +8,13 @@
 #  - Predicted importance: The mean importance rank of all the zip codes found
 #    in a given patch. (The rank is derived from counting the EOs found within
 #    a zip code divided by the zip code area, with a 5 being the highest).
+#  - Zip code evenness: the Shannon evenness of the zip codes' areas within
+#    the patch (H / ln(number of zip codes); 0 if the patch has one).
+#
+#  The patch and zipcode rasters are read into arrays and cross tabulated in
+#  one pass (GeoHATzonal.ZoneCrosstab); richness, evenness, mean rank and
+#  area all come from the patch by zipcode cell counts. EO points are
+#  assigned to patches by the row and column of the cell they fall in.
 #
 # Inputs: <patch raster> <zipcode raster> <Element occurrence features>
 # Outputs: Patch biodiversity importance CSV
@@ -16,6 +23,8 @@
 
 import sys, os, arcpy
 import arcpy.sa as sa
+import numpy as np
+import GeoHATutils, GeoHATzonal, GeoHATspatial
 
 arcpy.CheckOutExtension("spatial")
 arcpy.env.overwriteOutput = True
@@ -32,62 +41,55 @@ outputCSV = sys.argv[4]
 def msg(txt): print txt; arcpy.AddMessage(txt); return      
 
 ## --PROCESSES--
-#Compute variety of zip codes per patch and area weighted zip code frequency
-##--THIS SHOULD BE UPDATED TO DO EVENNESS-- (by combining patches and zipcodes)
-msg("Computing zip code richness")
-#...Compute zonal variety of zipcodes on patches
-masterTable = sa.ZonalStatisticsAsTable(patchRaster,"VALUE",zipcodeRaster,"in_memory/zipTable",'',"VARIETY")
+# Read the patch raster, and the zipcode raster over the same extent
+msg("Reading patch and zip code rasters")
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0)
+zipArr, zipInfo = GeoHATutils.RasterToArray(zipcodeRaster,0,rasInfo)
+cellArea = rasInfo['cellSize'] ** 2
+patchCells = np.bincount(patchArr.ravel().astype(np.int64))
+patchCells[0] = 0
+patchIDs = np.flatnonzero(patchCells)
+AreaHA = patchCells[patchIDs] * cellArea / 10000.0
 
-#Compute mean zip importance
+#Compute variety, evenness and mean importance of zip codes per patch from the
+# count of cells of each patch and zip code
+msg("Computing zip code richness and evenness")
+keys, counts = GeoHATzonal.ZoneCrosstab(patchArr,zipArr)
 if not arcpy.ListFields(zipcodeRaster,"EO_Rank"):
     arcpy.AddWarning("No rank attribute in zipcode raster; cannot add zip importantce")
+    zipCodes, zipRank = None, None
 else:
     msg("Calculating mean zipcode importance for each patch")
-    zipRank = sa.Lookup(zipcodeRaster,"EO_Rank")
-    tmpTable = sa.ZonalStatisticsAsTable(patchRaster,"VALUE",zipcodeRaster,"in_memory/tmpTable",'',"MEAN")
-    arcpy.JoinField_management(masterTable,"VALUE",tmpTable,"VALUE",["MEAN"])
-    arcpy.Delete_management(tmpTable)
+    zipCodes, zipRank = GeoHATzonal.RasterAttribute(zipcodeRaster,"EO_Rank")
+ids, zipCells, ZipCount, ZipEvenness, MeanRank = GeoHATzonal.CrosstabSummary(keys,counts,zipCodes,zipRank)
+#...Spread the results over all patches (0 for patches with no zip codes)
+pos = np.searchsorted(patchIDs,ids)
+ZipVariety = np.zeros(len(patchIDs),np.int64)
+ZipVariety[pos] = ZipCount
+Evenness = np.zeros(len(patchIDs))
+Evenness[pos] = ZipEvenness
+ZipRank = np.zeros(len(patchIDs))
+if MeanRank is not None:
+    ZipRank[pos] = MeanRank
 
 #Compute number of element occurrences per patch and area weighted frequency
 msg("Ranking patches by element occurrences")
 #...Extract the EO points falling within the extent **THIS COULD BE FILTERED FOR RARE SPECIES HERE TOO!**
 msg("...extracting element occurrences with locational uncertainty < 1km")
 EOFilter = "\"UNCRT_DIST\" <= 1000"
-selEOs = arcpy.Select_analysis(EOs,"in_memory/SelectedEOs",EOFilter)
-#...Sample the EO points for zip code values
-tmpPoints = sa.Sample(patchRaster,selEOs,"in_memory/SampleResults")
-#...Calculate the number of points in each zipcode
-rasterNameFld = arcpy.ListFields(tmpPoints)[-1].name
-tmpTable = arcpy.Statistics_analysis(tmpPoints,"in_memory\\tmpTable",[["OBJECTID","COUNT"]],rasterNameFld)
-# ...Join the patch table to the tmpTable to get count (area)
-arcpy.JoinField_management(masterTable,"VALUE",tmpTable,rasterNameFld,["FREQUENCY"])
-arcpy.Delete_management(tmpTable)
+EOxy = arcpy.da.FeatureClassToNumPyArray(EOs,["SHAPE@X","SHAPE@Y"],EOFilter,rasInfo['spatialReference'])
+#...Find the patch of the cell each point falls in and count the points in each patch
+EOpatches = GeoHATspatial.PointZones(patchArr,rasInfo,EOxy["SHAPE@X"],EOxy["SHAPE@Y"])
+EOcount = np.bincount(EOpatches.astype(np.int64),minlength=len(patchCells))[patchIDs]
 
 #Output results to csv file
-    #VALUE = patch ID
-    #"FREQUENCY" = count of EOs in patch
-    #"Count" = patch area (in cells)
-    #"VARIETY" = number of different zip codes in patch
-    #"MEAN" = mean zip rank (0 = no EOs found in zip; 5 = many)
 msg("Writing data to %s" %outputCSV)
+lines = ["PatchID, EOCount, EODensity, ZipVariety, ZipDensity, MeanZipRank, ZipEvenness\n"]
+EOdensity = EOcount / AreaHA
+ZipDensity = ZipVariety / AreaHA
+for row in zip(patchIDs.tolist(),EOcount.tolist(),EOdensity.tolist(),ZipVariety.tolist(),
+               ZipDensity.tolist(),ZipRank.tolist(),Evenness.tolist()):
+    lines.append("%d,%d,%2.2f,%d,%2.2f,%2.2f,%2.4f\n" %row)
 csvFile = open(outputCSV,'w')
-csvFile.write("PatchID, EOCount, EODensity, ZipVariety, ZipDensity, MeanZipRank\n")
-recs = arcpy.SearchCursor(masterTable)
-rec = recs.next()
-while rec:
-    # Get values from record
-    ID = rec.VALUE
-    AreaHA = (rec.count ** 2) / 10000.0
-    EOcount = rec.FREQUENCY
-    if not rec.FREQUENCY: EOcount = 0
-    EOdensity = EOcount/AreaHA
-    ZipCount = rec.VARIETY
-    if not rec.VARIETY: ZipCount = 0
-    ZipDensity = ZipCount/AreaHA
-    ZipRank = rec.MEAN
-    # Write them
-    csvFile.write("%d,%d,%2.2f,%d,%2.2f,%2.2f\n" %(ID,EOcount,EOdensity,ZipCount,ZipDensity,ZipRank))
-    rec = recs.next()
-del rec, recs
-                  
-csvFile.close()
\ No newline at end of file
+csvFile.write("".join(lines))
+csvFile.close()
@@ -6,9 +6,40 @@
 #  i.e. area of further distances are discounted using a decay rate:
 #   SUM: exp(ln(0.1) * (patch distance)) * (patch area)
 #
+#  Both sums are computed for all patches at once as sparse matrix-vector
+#  products over a CSR adjacency of the edge list (GeoHATedges.Adjacency).
+#  Centrality measures are those of each patch itself.
+#
+#  Batch mode: if several distance thresholds are given (e.g. "1000;5000;20000"
+#  for short, medium and long distance dispersers), the edge list is read
+#  once, sorted by cost, and the patch sums are grown threshold by threshold
+#  from the edges added since the last one. connectedArea, idwArea and degree
+#  for every threshold are written to a single wide table (one set of columns
+#  per threshold); centrality measures are only computed for a single
+#  threshold.
+#
+#  Sampled centrality: for large graphs, a relative error (e.g. 0.05) can be
+#  given to estimate the shortest path measures from a sample of source
+#  patches instead of searching from every patch
+#  (GeoHATcentrality.SampledCentrality). Pivots are drawn until the 95%
+#  confidence interval of each patch's betweenness is within that error of
+#  the subgraph's highest value (or up to 1000 pivots per subgraph), and the
+#  interval bounds are added to the table. In this mode betweenness,
+#  closeness and harmonic are estimates, and eccentricity (and so the
+#  reported diameter) is a lower bound: the distance to the farthest pivot.
+#  Subgraphs of up to 200 patches, and the pivots' own values, are exact.
+#
+#  Otherwise betweenness, closeness, harmonic closeness and eccentricity all
+#  come from one shortest path search per patch
+#  (GeoHATcentrality.ShortestPathSweep) rather than a separate set of
+#  searches for each measure. Harmonic closeness (the sum of 1 / distance to
+#  the other patches) and eccentricity (the distance to the farthest
+#  connected patch) are added to the table; the largest eccentricity in a
+#  subgraph is its diameter.
+#
 # Requires: NetworkX to be stored in script folder (or installed)
 #
-# Inputs: <Patch raster> <edge list> <maxDistance>
+# Inputs: <Patch raster> <edge list> <maxDistance(s), separated by semicolons> {centrality relative error}
 # Output: <Patch connected attribute table (CSV format)>
 #  
 # June 14, 2012
@@ -18,7 +49,9 @@
 # Import system modules
 import sys, string, os, arcpy, math
 import arcpy.sa as sa
+import numpy as np
 import networkx as nx
+import GeoHATedges, GeoHATcentrality
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -27,97 +60,150 @@ arcpy.env.overwriteOutput = True
 # Input variables
 patchRaster = sys.argv[1]   
 edgeListFN = sys.argv[2]    
-maxDistance = int(sys.argv[3])   
+maxDistances = sorted([int(d) for d in sys.argv[3].replace(",",";").split(";") if d.strip()])
+maxDistance = maxDistances[-1]
 k = math.log(0.1) / maxDistance ##Decay coefficient
 
 # Output variables
 outputFN = sys.argv[4]   
 
+# Relative error of sampled centrality (optional; exact if not given)
+if len(sys.argv) > 5 and sys.argv[5] not in ("#","","0"):
+    relError = float(sys.argv[5])
+else:
+    relError = None
+
 ##---FUNCTIONS---
 def msg(txt): print txt; arcpy.AddMessage(txt); return
 
 ##---PROCESSES---
-# Create a list of patch IDs and a dictionary of areas
+# Create a list of patch IDs and an array of areas
 msg("Creating list of patch areas")
-patchAreas = {}
+patchIDs = []
+patchCounts = []
 cellSize2HA = (arcpy.Raster(patchRaster).meanCellWidth ** 2) / 10000
 rows = arcpy.SearchCursor(patchRaster)
 row = rows.next()
 while row:
-    patchAreas[row.VALUE] = round(row.COUNT * cellSize2HA)
+    patchIDs.append(row.VALUE)
+    patchCounts.append(row.COUNT)
     row = rows.next()
 del row, rows
-patchIDs = patchAreas.keys()
-
-# Create a graph from the edge list
-msg("Creating graph from nodes < %d from each other" %maxDistance)
-G = nx.Graph()
-subDict = {}
-edgeList = open(edgeListFN,'r')
-headerLine = edgeList.readline()
-dataLine = edgeList.readline()
-while dataLine:
-    lineData = dataLine.split(",")
-    u = int(lineData[0])
-    v = int(lineData[1])
-    w = float(lineData[2][:-1])
-    if w <= maxDistance:
-        G.add_edge(u,v,weight = w)
-    dataLine = edgeList.readline()
-edgeList.close()
-
-# Calculate degree, betweenness, and closeness centrality - one subgraph at time
-subGs = nx.connected_component_subgraphs(G)
-msg("There graph contains %d subgraph(s)" %len(subGs))
-dG = {}
-bG = {}
-cG = {}
-eG = {}
-for subG in subGs:
-    #msg("Calculating degree centrality...")
-    dG.update(nx.centrality.degree_centrality(subG))
-    #msg("Calculating betweenness centrality...")
-    bG.update(nx.centrality.betweenness_centrality(subG,normalized=True,weight='weight'))
-    #msg("Calculating closeness centrality...")
-    cG.update(nx.centrality.closeness_centrality(subG,normalized=True,distance='weight'))
-    #msg("Calculating closeness centrality...")
-    eG.update(nx.centrality.eigenvector_centrality(subG))
-
-# Create the output file
-msg("Writing outputs to %s" %outputFN)
-connAreaFileObj = open(outputFN, 'w')
-connAreaFileObj.write("patchID, connectedArea, idwArea, degree, betweenness, closeness, eigenvector\n")
-
-# Loop through patch IDs
-for patchID in patchIDs:
-    if not patchID in G.nodes():
-        msg("Patch #%d is isolated" %patchID)
-        connAreaFileObj.write("%d, 0, 0, 0, 0, 0, 0\n" %patchID)
-        continue
-    # Reset area accumulators
-    connArea = 0
-    idwArea = 0
-    # Get the edges connected to the selected node
-    edges = G.edge[patchID]
-    # Diameter (number of neighbors)
-    degree = len(edges)
-    # Loop through each connected patch and tabulate area and IDW area
-    for toID in edges.keys():
-        distance = edges[toID]['weight']
-        connArea += patchAreas[toID]
-        idwArea += round(math.exp(k * distance) * patchAreas[toID])
-        degreeN = dG[toID] 
-        between = bG[toID] * 100.0
-        closeness = cG[toID] * 100.0
-        eigenvector = eG[toID] * 100.0
-    # Write values to the file
-    connAreaFileObj.write("%d, %d, %d, %d, %2.4f, %2.4f, %2.4f\n"
-                          %(patchID, connArea, idwArea, degree, between, closeness, eigenvector))
+order = np.argsort(patchIDs)
+patchIDs = np.array(patchIDs)[order]
+patchAreas = np.floor(np.array(patchCounts,np.float64)[order] * cellSize2HA + 0.5)
 
-# Close the text file
-connAreaFileObj.close()
+# If given several thresholds, grow the patch sums from the edges sorted by cost
+if len(maxDistances) > 1:
+    msg("Reading edges < %d from each other" %maxDistance)
+    fromIDs, toIDs, costs = GeoHATedges.UniqueEdges(*GeoHATedges.OpenEdges(edgeListFN).Read(maxDistance))
+    # Find the rows of each edge's patches, dropping edges to unknown patches
+    a = np.minimum(np.searchsorted(patchIDs,fromIDs),len(patchIDs) - 1)
+    b = np.minimum(np.searchsorted(patchIDs,toIDs),len(patchIDs) - 1)
+    known = (patchIDs[a] == fromIDs) & (patchIDs[b] == toIDs)
+    a, b, costs = a[known], b[known], costs[known].astype(np.float64)
+    nPatches = len(patchIDs)
+    degree = np.zeros(nPatches)
+    connArea = np.zeros(nPatches)
+    columns = []
+    header = ["patchID"]
+    start = 0
+    for distance in maxDistances:
+        msg("Calculating connected and IDW areas within %d" %distance)
+        # Add the edges between the last threshold and this one
+        end = np.searchsorted(costs,distance,'right')
+        newA, newB = a[start:end], b[start:end]
+        degree += np.bincount(newA,minlength=nPatches) + np.bincount(newB,minlength=nPatches)
+        connArea += np.bincount(newA,patchAreas[newB],nPatches) + np.bincount(newB,patchAreas[newA],nPatches)
+        start = end
+        # The decay rate depends on the threshold, so IDW areas are summed
+        #  over all the edges within it
+        decay = np.exp(math.log(0.1) / distance * costs[:end])
+        idwArea = np.bincount(a[:end],np.floor(decay * patchAreas[b[:end]] + 0.5),nPatches) + \
+                  np.bincount(b[:end],np.floor(decay * patchAreas[a[:end]] + 0.5),nPatches)
+        columns += [connArea.copy(), idwArea, degree.copy()]
+        header += ["connectedArea_%d" %distance, "idwArea_%d" %distance, "degree_%d" %distance]
+    # Write all the patches' values to one wide table
+    msg("Writing outputs to %s" %outputFN)
+    rowFormat = "%d" + ", %d, %d, %d" * len(maxDistances) + "\n"
+    lines = [", ".join(header) + "\n"]
+    for row in zip(patchIDs.tolist(), *[column.tolist() for column in columns]):
+        lines.append(rowFormat %row)
+    connAreaFileObj = open(outputFN, 'w')
+    connAreaFileObj.write("".join(lines))
+    connAreaFileObj.close()
 
+# Otherwise, calculate connectivity and centrality at the one threshold
+else:
+    # Read the edges within the distance threshold into a sparse adjacency matrix
+    msg("Creating graph from nodes < %d from each other" %maxDistance)
+    fromIDs, toIDs, costs = GeoHATedges.UniqueEdges(*GeoHATedges.OpenEdges(edgeListFN).Read(maxDistance))
+    A = GeoHATedges.Adjacency(fromIDs,toIDs,costs,patchIDs)
 
-    
+    # Sum the areas of each patch's neighbors, and their areas weighted by the
+    #  decay of their distance (rounded per neighbor)
+    msg("Calculating connected and IDW areas")
+    degree = A.Degree()
+    connArea = A.MatVec(patchAreas)
+    idwArea = A.RowSums(np.floor(np.exp(k * A.data) * patchAreas[A.indices] + 0.5))
 
+    # Calculate degree, betweenness, closeness, harmonic, eccentricity and
+    #  eigenvector centrality - one subgraph at time
+    G = nx.Graph()
+    G.add_weighted_edges_from(zip(patchIDs[A.rows].tolist(),patchIDs[A.indices].tolist(),A.data.tolist()))
+    subGs = nx.connected_component_subgraphs(G)
+    msg("There graph contains %d subgraph(s)" %len(subGs))
+    dG = {}
+    bG = {}
+    cG = {}
+    hG = {}
+    xG = {}
+    eG = {}
+    if relError:
+        msg("Estimating betweenness, closeness, harmonic and eccentricity to within %s" %relError)
+        sampled = GeoHATcentrality.SampledCentrality(G,relError,0.95,'weight')
+        bG, bLo, bHi = sampled["betweenness"], sampled["betweennessLo"], sampled["betweennessHi"]
+        cG, hG, xG = sampled["closeness"], sampled["harmonic"], sampled["eccentricity"]
+    for subG in subGs:
+        #msg("Calculating degree centrality...")
+        dG.update(nx.centrality.degree_centrality(subG))
+        if not relError:
+            #msg("Calculating betweenness, closeness, harmonic and eccentricity...")
+            sweep = GeoHATcentrality.ShortestPathSweep(subG,'weight')
+            bG.update(sweep["betweenness"])
+            cG.update(sweep["closeness"])
+            hG.update(sweep["harmonic"])
+            xG.update(sweep["eccentricity"])
+        #msg("Calculating eigenvector centrality...")
+        eG.update(nx.centrality.eigenvector_centrality(subG))
+    diameter = 0
+    if xG:
+        diameter = max(xG.values())
+    if relError:
+        msg("The largest subgraph diameter is at least %s" %diameter)
+    else:
+        msg("The largest subgraph diameter is %s" %diameter)
 
+    # Write all the patches' values to the output file at once
+    msg("%d patches are isolated" %(degree == 0).sum())
+    msg("Writing outputs to %s" %outputFN)
+    header = "patchID, connectedArea, idwArea, degree, betweenness, closeness, eigenvector, harmonic, eccentricity"
+    if relError:
+        header += ", betweennessLo, betweennessHi"
+    lines = [header + "\n"]
+    for patchID, area, idw, nbrs in zip(patchIDs.tolist(), connArea.tolist(), idwArea.tolist(), degree.tolist()):
+        if nbrs == 0:
+            if relError:
+                lines.append("%d, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0\n" %patchID)
+            else:
+                lines.append("%d, 0, 0, 0, 0, 0, 0, 0, 0\n" %patchID)
+            continue
+        line = "%d, %d, %d, %d, %2.4f, %2.4f, %2.4f, %g, %2.4f" \
+               %(patchID, area, idw, nbrs, bG[patchID] * 100.0, cG[patchID] * 100.0, eG[patchID] * 100.0,
+                 hG[patchID], xG[patchID])
+        if relError:
+            line += ", %2.4f, %2.4f" %(bLo[patchID] * 100.0, bHi[patchID] * 100.0)
+        lines.append(line + "\n")
+    connAreaFileObj = open(outputFN, 'w')
+    connAreaFileObj.write("".join(lines))
+    connAreaFileObj.close()
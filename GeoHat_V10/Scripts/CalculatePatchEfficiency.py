@@ -8,6 +8,10 @@
 #  distance is tabulated for each patch. And finally a distance weighted value
 #  of protected area near each patch is tabulated. 
 #
+#  The edge list is read into NumPy arrays and summarized for all patches
+#  at once (GeoHATzonal.EdgeEfficiency). Protected area sizes come from the
+#  protected area raster's value/count table, so no tables are joined.
+#
 # Inputs: <Patch raster> <edge list> <maxDistance>
 # Output: <Patch connected attribute table (CSV format)>
 #  
@@ -16,8 +20,10 @@
 #---------------------------------------------------------------------------------
 
 # Import system modules
-import sys, string, os, arcpy
+import sys, string, os, arcpy, math
 import arcpy.sa as sa
+import numpy as np
+import GeoHATedges, GeoHATzonal
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -37,47 +43,24 @@ def msg(txt): print txt; arcpy.AddMessage(txt); return
 
 ##---PROCESSES---
 msg("Computing protected area and distance weighted protected area from each patch")
-#Create a table from the edge list
-#edgeTbl = arcpy.CopyRows_management(edgeListFN,"in_memory/EdgeTbl")
-edgeTbl = arcpy.TableSelect_analysis(edgeListFN,"in_memory/EdgtTbl",'"Cost" < %s' %maxDistance)
-#Join protected area VAT to table
-arcpy.JoinField_management(edgeTbl,"ProtAreaID",protareaRaster,"VALUE",["COUNT"])
-#Calculate area and IDW area for each patch
-arcpy.AddField_management(edgeTbl,"protArea","DOUBLE",10,2)
-arcpy.AddField_management(edgeTbl,"idwArea","DOUBLE",10,2)
+# Read the edge list (PatchID, ProtAreaID, Cost)
+patchIDs, protIDs, costs = GeoHATedges.ReadCSV(edgeListFN)
+# Get the cell count of each protected area from the raster's value table
+protValues, protCounts = GeoHATzonal.RasterValueCounts(protareaRaster)
 cellSize2HA = (arcpy.Raster(protareaRaster).meanCellWidth ** 2) / 10000
-arcpy.CalculateField_management(edgeTbl,"protArea","[COUNT] * %s" %cellSize2HA)
-#round(math.exp(k * distance) * patchAreas[toID])
-arcpy.CalculateField_management(edgeTbl,"idwArea","[protArea] * Exp(%s * [Cost])" %k)
 
-#Calculate summary stats on patch field
+# Count the protected areas within the threshold of each patch, and sum their
+#  areas and their areas weighted by exp(k * Cost)
 msg("Digesting results")
-sumTbl = arcpy.Statistics_analysis(edgeTbl,"in_memory/sumTbl",[["protArea","SUM"],["idwArea","SUM"]],"PatchID")
+ids, paCounts, paAreas, idwAreas = GeoHATzonal.EdgeEfficiency(patchIDs,protIDs,costs,protValues,protCounts,
+                                                             maxDistance,cellSize2HA)
 
 # Create the output CSV file
 msg("Writing outputs to %s" %outputFN)
+lines = ["patchID, PAreaCount, connectedPArea, idwPArea\n"]
+for patchID, paCount, paArea, idwArea in zip(ids.tolist(), paCounts.tolist(), paAreas.tolist(), idwAreas.tolist()):
+    lines.append("%d, %d, %2.4f, %2.4f\n" %(patchID, paCount, paArea, idwArea))
 connAreaFileObj = open(outputFN, 'w')
-connAreaFileObj.write("patchID, PAreaCount, connectedPArea, idwPArea\n")
-
-# Loop through patch IDs
-recs = arcpy.SearchCursor(sumTbl)
-rec = recs.next()
-while rec:
-    #Get row values
-    patchID = rec.PatchID
-    paCount = rec.FREQUENCY
-    paArea = rec.SUM_protArea
-    idwArea = rec.SUM_idwArea
-    # Write values to the file
-    connAreaFileObj.write("%d, %d, %2.4f, %2.4f\n" %(patchID, paCount, paArea, idwArea))
-    # Move to next record
-    rec = recs.next()
-
-# Close the text file
+connAreaFileObj.write("".join(lines))
 connAreaFileObj.close()
 msg("Finished")
-
-
-    
-
-
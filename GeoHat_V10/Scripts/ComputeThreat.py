@@ -8,6 +8,8 @@
 #  and the nearest developed pixel. And the third is a distance decayed value between
 #  patch and development: patches with development closer to the patch is weighted greater
 #  than development further away. (Development has 1% influence at 1200 m away.)
+#  The distance to development is computed in NumPy with an exact, multithreaded
+#  Euclidean distance transform (GeoHATdistance.py) instead of EucDistance.
 #
 # Inputs: <Patch raster> <NLCD raster>
 # Outputs: <Threat CSV table>
@@ -16,7 +18,8 @@
 #
 
 import sys, os, math, arcpy
-import GeoHATutils
+import numpy as np
+import GeoHATutils, GeoHATdistance
 import arcpy.sa as sa
 
 arcpy.CheckOutExtension("Spatial")
@@ -44,10 +47,13 @@ focalMean = sa.FocalStatistics(devBinary,nbrHood,"MEAN")
 
 # Compute distance decay
 msg("Computing distance decayed development")
-devNodata = sa.Con(nlcdRaster,1,'',"VALUE IN (22,23,24)")
-eucDist = sa.EucDistance(devNodata)
+nlcdArr, nlcdInfo = GeoHATutils.RasterToArray(nlcdRaster,0)
+developed = (nlcdArr == 22) | (nlcdArr == 23) | (nlcdArr == 24)
+del nlcdArr
+eucDist = GeoHATdistance.EuclideanDistance(developed,nlcdInfo['cellSize'],dtype=np.float32)
 k = math.log(0.01) / distanceThreshold
-devDecay = sa.Exp(eucDist * k)
+devDecay = GeoHATutils.ArrayToRaster(np.exp(eucDist * np.float32(k)),nlcdInfo)
+del eucDist, developed
 
 # FOCAL MEAN: Compute zonal stats
 msg("Computing patch threat values")
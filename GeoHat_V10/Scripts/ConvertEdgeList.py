@@ -0,0 +1,35 @@
+#---------------------------------------------------------------------------------
+# ConvertEdgeList.py
+#
+# Description: Converts a CSV edge list (as written by the edge list scripts)
+#  to a binary edge file (see GeoHATedges.py). Edge files load much faster
+#  than CSV edge lists, can be read only up to a cost threshold, and support
+#  constant time lookup of the cost between any two patches. Any script that
+#  reads an edge list accepts either format.
+#
+# Inputs: <CSV edge list>
+# Output: <Binary edge file (.edg)>
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+# Import system modules
+import sys, arcpy
+import GeoHATedges
+
+# Input variables
+csvEdgeList = sys.argv[1]
+
+# Output variables
+edgeFile = sys.argv[2]
+
+##---FUNCTIONS---
+def msg(txt): print txt; arcpy.AddMessage(txt); return
+
+##---PROCESSES---
+msg("Reading edges from %s" %csvEdgeList)
+fromIDs, toIDs, costs = GeoHATedges.ReadCSV(csvEdgeList)
+msg("Writing %d edges to %s" %(len(costs),edgeFile))
+GeoHATedges.WriteEdges(edgeFile,fromIDs,toIDs,costs)
+
+msg("Finished")
@@ -1,9 +1,18 @@
 #---------------------------------------------------------------------------------
 # CreateEdgeListFromStack.py
 #
-# Description: 
-#  Creates an edge list of all patches from cost distance rasters saved in
-#  the supplied workspace. 
+# Description:
+#  Creates an edge list of all patches from the cost distance stack saved in
+#  the supplied workspace (see GeoHATstack.py).
+#
+#  The patch raster is read once, aligned to the stack, and indexed by patch
+#  (GeoHATzonal.ZonePixelIndex). The minimum cost to each patch is then found
+#  in NumPy from that index for each cost distance window, rather than with
+#  ZonalStatisticsAsTable. A pool of threads reads and decodes the windows
+#  while others reduce them, and the edges are written in bulk.
+#
+# Inputs: <Patch raster> <Cost distance stack folder> {threads}
+# Outputs: <Edge list CSV file> (and a binary .edg edge file alongside it)
 #
 # June 14, 2012
 # John.Fay@duke.edu
@@ -12,6 +21,9 @@
 # Import system modules
 import sys, string, os, arcpy
 import arcpy.sa as sa
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import GeoHATutils, GeoHATzonal, GeoHATstack, GeoHATedges
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -24,55 +36,68 @@ CostDistWS = sys.argv[2]    #r'C:\WorkSpace\GHAT\GHAT_014\Scratch\CostRasters'
 # Output variables
 edgeListFN = sys.argv[3]    #r'C:\WorkSpace\GHAT\GHAT_014\Scratch\EdgeListStack.csv'
 
+# Number of threads (optional)
+if len(sys.argv) > 4 and sys.argv[4] not in ("#",""):
+    threads = int(sys.argv[4])
+else:
+    threads = multiprocessing.cpu_count()
+
+# Script variables
+batchSize = 100             # Number of patches whose edges are written at once
+
 ##---FUNCTIONS---
 def msg(txt):
     print txt
     arcpy.AddMessage(txt)
     return
 
+def PatchEdges(fromID):
+    '''Reads a patch's cost distance window from the stack and returns the
+    edge list rows to patches with higher IDs'''
+    costDist, backLink, (row0, col0) = stack.Read(fromID)
+    toIDs, costs = patchIndex.WindowMinimum(costDist,row0,col0,fromID)
+    lines = []
+    for toID, cost in zip(toIDs, costs):
+        lines.append("%d,%d,%s\n" %(fromID,toID,float(cost)))
+    return "".join(lines)
+
 ##---PROCESSES---
-# Create a list of patch IDs
-msg("Creating list of patch IDs...")
-patchIDs = []
-rows = arcpy.SearchCursor(patchRaster)
-row = rows.next()
-while row:
-    patchIDs.append(row.VALUE)
-    row = rows.next()
-del row, rows
+# Open the stack of cost distance windows
+msg("Opening cost distance stack...")
+stack = GeoHATstack.OpenStack(CostDistWS)
+fromIDs = stack.PatchIDs()
 
-# Create a list of rasters and patch IDs
-msg("Extracting cost distance rasters...")
-origWS = arcpy.env.workspace
-arcpy.env.workspace = CostDistWS
-cdRasters = arcpy.ListRasters("*CostDist.img")
+# Read the patch raster over the stack's extent and index its cells by patch
+msg("Indexing patch cells...")
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0,stack.info)
+patchIndex = GeoHATzonal.ZonePixelIndex(patchArr)
+del patchArr
 
 # Create the edge list
 msg("Creating edge list...")
 edgeList = open(edgeListFN, 'w')
 edgeList.write("FromID,ToID,Cost\n")
 
-# Loop through cdRaster and calculate zonal stats for the patches
-zStatTbl = "in_memory/zStatTbl"
-for cdRaster in cdRasters:
-    # Get the from patch from the file name
-    fromID = int(cdRaster.split("_")[0][1:])
-    msg("Adding edges to patch %s" %fromID)
-    # Calculate zonal min (shortest distance) for each patch
-    result = sa.ZonalStatisticsAsTable(patchRaster,"VALUE",cdRaster,zStatTbl,"#","MINIMUM")
-    # Write the table to the edge list (only records not added before)
-    rows = arcpy.SearchCursor(zStatTbl,"VALUE > %s" %fromID)
-    row = rows.next()
-    while row:
-        toID = row.VALUE
-        cost = row.MIN
-        edgeList.write("%s, %s, %s\n" %(fromID,toID,cost))
-        row = rows.next()
-        
-#Restore original workspace
-arcpy.env.workspace = origWS
+# Calculate the zonal min (shortest distance) to each patch from each window,
+#  writing the edges in batches, in patch ID order
+pool = ThreadPool(threads)
+batch = []
+iter = 0
+for lines in pool.imap(PatchEdges,fromIDs):
+    batch.append(lines)
+    iter = iter + 1
+    if len(batch) == batchSize or iter == len(fromIDs):
+        edgeList.write("".join(batch))
+        batch = []
+        msg("Added edges from %d of %d patches" %(iter,len(fromIDs)))
+pool.close()
+pool.join()
 
-#Close the edgelist
+#Close the stack and the edgelist
+stack.Close()
 edgeList.close()
 
-msg("Finished")
\ No newline at end of file
+# Write the binary edge file alongside the edge list for faster reading
+GeoHATedges.ConvertCSV(edgeListFN)
+
+msg("Finished")
@@ -4,143 +4,231 @@
 # Description:
 #  Loops through each patch in a raster dataset and creates a cost surface
 #  to determine the minimum distance to each other patch in the raster and
-#  writes these minimum distances out to an edge file, in CSV format. 
+#  writes these minimum distances out to an edge file, in CSV format.
 #
-#  If a cost threshold is supplied, costs will not be calcualted beyond that
-#  point. This may save a little time in processing, but rasters are still
-#  created for the entire extent.(In future versions, I will revert to a
-#  method that creates patch subnetworks and loops through these to speed
-#  analysis.
+#  Cost distances are calculated with the NumPy engine in GeoHATcostdist.py
+#  rather than sa.CostDistance. If a cost threshold is supplied, only cells
+#  within that cost of the patch are visited and the results are kept for a
+#  window around the patch, so per patch processing time scales with the
+#  area inside the threshold rather than with the entire extent.
 #
-#  The user also has an option to save the cost rasters. This requires a lot
-#  of disk space, but the rasters can be use for subsequent calculations, e.g.,
-#  calculating distance to protected areas and corridor analyses.
+#  The user also has an option to save the cost distance and back link
+#  windows. These are written to a compact, compressed stack (see
+#  GeoHATstack.py) in the save folder rather than as CD_/BL_ rasters, and can
+#  be used for subsequent calculations, e.g., calculating distance to
+#  protected areas and corridor analyses.
 #
-#  Finally, the user can select to create least cost paths. This adds significant
-#  processing time and is not recommended. 
+#  Finally, the user can select to create least cost paths. These are traced
+#  from the back link windows (GeoHATpaths.py) and written in batches to a
+#  shapefile, GeoPackage or feature class (GeoHATvector.py). Paths keep only
+#  the cells where they change direction and can be simplified further with
+#  an optional tolerance in map units. Each path is attributed with its
+#  length, accumulated cost and highest single cell cost, and, if a land
+#  cover (NLCD) raster is given, the share of its length through developed
+#  classes 22, 23 and 24, all collected from the windows it is traced through.
+#
+#  If a number of worker processes is given (and rasters and least cost paths
+#  are not requested), patches are processed in parallel. The patch and cost
+#  arrays are shared with the workers as read-only memory maps and the edges
+#  are merged into one edge list, sorted by FromID and ToID.
+#
+#  Completed patches are recorded in a ledger file beside the edge list. If a
+#  run is interrupted, running the script again with --resume skips patches
+#  in the ledger and appends the remaining edges.
+#
+# Inputs: <patch raster>, <cost surface raster>, <maxDist>, {worker processes}, {LCP simplification tolerance}, {land cover raster}, {--resume}
+# Outputs: <edge list CSV file> (and a binary .edg edge file alongside it)
 #
-# Inputs: <patch raster>, <cost surface raster>, <maxDist>
-# Outputs: <edge list CSV file> 
-# 
 # June 2012, John.Fay@duke.edu
 # -------------------------------------------------------------------------
 # To do:
 #  - Add an option to save all the cost distance and back link rasters
-#  - Add an option to calculate least cost paths 
+#  - Add an option to calculate least cost paths
 
 # Import modules
 import sys, os, arcpy
 import arcpy.sa as sa
-
-arcpy.CheckOutExtension("spatial")
-arcpy.env.overwriteOutput = 1
-
-# User variables
-patchRaster = sys.argv[1]           # Input patch raster
-costRaster = sys.argv[2]            # Cost raster
-maxDist = sys.argv[3]               # Maximum cost distance; can reduce processing
-saveRasters = sys.argv[4]           # Boolean whether to save cost distance/back link rasters
-saveRasterLocation = sys.argv[5]    # Folder where cost distance rasters are saved
-computeLCPs = sys.argv[6]           # Boolean whether to create least cost path features
-lcpFC = sys.argv[7]                 # Feature class to hold least cost paths
-edgeList = sys.argv[8]              # Output edge list
-
-# Script variables
-arcpy.env.extent = patchRaster      # Set the extent to minimize processing
-if maxDist == "0": maxDist = "#"    # Set maxDist to # if zero is specified
-if (computeLCPs == 'true'):         # Create a backlink file, if creating LCPs
-    backLink = arcpy.env.scratchWorkspace + "\\backlink"
-else:
-    backLink = ""
+import numpy as np
+import GeoHATutils, GeoHATzonal, GeoHATcostdist, GeoHATledger, GeoHATstack, GeoHATpaths, GeoHATvector, GeoHATedges
 
 ##--FUNCTIONS--
 def msg(txt):  print msg; arcpy.AddMessage(txt); return
 
-##--PROCESSES--
-# If asked to save LCPs, create the LCP output feature class
-if computeLCPs == 'true':
-    msg("Creating LCP feature class")
-    SR = arcpy.Describe(patchRaster).SpatialReference
-    arcpy.CreateFeatureclass_management(os.path.dirname(lcpFC),os.path.basename(lcpFC),"POLYLINE","#","ENABLED","#",SR)
-    arcpy.AddField_management(lcpFC,"FromID","LONG",10)
-    arcpy.AddField_management(lcpFC,"ToID","LONG",10)
-    arcpy.AddField_management(lcpFC,"Cost","DOUBLE",10,2)
-    arcpy.DeleteField_management(lcpFC,"ID")
-            
-# Get a list of patch IDs
-msg("Creating a list of patch IDs")
-patchIDs = []
-rows = arcpy.SearchCursor(patchRaster)
-row = rows.next()
-while row:
-    patchIDs.append(row.Value)
-    row = rows.next()
-del row, rows
-
-# Initiate the output edge list
-msg("Initializing the output edge file")
-outFile = open(edgeList,'w')
-outFile.write("FromID,ToID,Cost\n")
-
-# Initiate status variables
-total = float(len(patchIDs))
-interval = total/20 #<-- 20.0 reports status at 5% completion intervals
-interval2 = interval
-iter = 0
-msg("Initiating edge list creation...")
-
-# Loop through each patchID in the PatchIDList
-for patchID in patchIDs:
-    iter = iter + 1
-    if iter > interval:
-        msg(" %d%% complete." %(float(iter/total)*100.0))
-        interval = interval + interval2
-    # - Isolate the TO patch
-    selectedPatch = sa.SetNull(patchRaster, patchRaster, "Value <> %s" %patchID)
-    # - If saving outputs, set the back link raster name
-    if saveRasters == 'true':
-        backLink = os.path.join(saveRasterLocation,"BL_%s.img" %patchID)
-    # - Calculate a cost distance and cost back link raster to the selected patch
-    costDist = sa.CostDistance(selectedPatch, costRaster, maxDist, backLink)
-    # - If saving outputs, save the cost distance as an integer raster
+# The processes are run only when the script is run directly; worker
+#  processes import this script and must not run them again.
+if __name__ == '__main__':
+    arcpy.CheckOutExtension("spatial")
+    arcpy.env.overwriteOutput = 1
+
+    # User variables
+    resume = GeoHATledger.ResumeRequested(sys.argv)   # Whether to resume an interrupted run
+    patchRaster = sys.argv[1]           # Input patch raster
+    costRaster = sys.argv[2]            # Cost raster
+    maxDist = sys.argv[3]               # Maximum cost distance; can reduce processing
+    saveRasters = sys.argv[4]           # Boolean whether to save cost distance/back link rasters
+    saveRasterLocation = sys.argv[5]    # Folder where cost distance rasters are saved
+    computeLCPs = sys.argv[6]           # Boolean whether to create least cost path features
+    lcpFC = sys.argv[7]                 # Feature class to hold least cost paths
+    edgeList = sys.argv[8]              # Output edge list
+    if len(sys.argv) > 9:               # Number of worker processes (optional)
+        workers = sys.argv[9]
+    else:
+        workers = "#"
+    if len(sys.argv) > 10 and sys.argv[10] not in ("#",""):
+        tolerance = float(sys.argv[10]) # LCP simplification tolerance (optional)
+    else:
+        tolerance = 0
+    if len(sys.argv) > 11 and sys.argv[11] not in ("#",""):
+        landCoverRaster = sys.argv[11]  # NLCD land cover, for the developed share of each LCP (optional)
+    else:
+        landCoverRaster = None
+
+    # Script variables
+    arcpy.env.extent = patchRaster      # Set the extent to minimize processing
+    if maxDist in ("0","#",""):         # Set maxDist to None if zero is specified
+        maxDist = None
+    else:
+        maxDist = float(maxDist)
+    if workers in ("#","","0","1"):     # Run serially unless asked for workers
+        workers = 1
+    else:
+        workers = int(workers)
+    if workers > 1 and (saveRasters == 'true' or computeLCPs == 'true'):
+        msg("Rasters and least cost paths are created serially; ignoring worker processes")
+        workers = 1
+
+    ##--PROCESSES--
+    # Open the ledger of completed patches and initiate the output edge list
+    msg("Initializing the output edge file")
+    ledger = GeoHATledger.CompletionLedger(edgeList,resume)
+    outFile = GeoHATledger.OpenCSV(edgeList,"FromID,ToID,Cost\n",ledger)
+    if ledger.completed:
+        msg("Resuming: %d patches already completed" %len(ledger.completed))
+
+    # If asked to save LCPs, create the LCP output (or, if resuming, remove any
+    #  paths from a patch that was not completed)
+    if computeLCPs == 'true':
+        msg("Creating LCP output")
+        SR = arcpy.Describe(patchRaster).SpatialReference
+        lcpFields = GeoHATvector.LCP_FIELDS + GeoHATpaths.ProfileFields(landCoverRaster is not None)
+        lcpWriter = GeoHATvector.OpenFeatureWriter(lcpFC,lcpFields,SR,ledger,"FromID")
+
+    # Read the patch and cost rasters into arrays
+    msg("Reading patch and cost rasters")
+    patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0)
+    costArr, rasInfo = GeoHATutils.CostRasterToArray(costRaster,rasInfo)
+    cellSize = rasInfo['cellSize']
+    if computeLCPs == 'true' and landCoverRaster:
+        coverArr, rasInfo = GeoHATutils.RasterToArray(landCoverRaster,0,rasInfo)
+
+    # If saving cost distance and back link windows, open the stack that holds them
     if saveRasters == 'true':
-        cdInt = sa.Int(costDist) #Convert to integer raster to save space
-        cdInt.save(os.path.join(saveRasterLocation,"CD_%s.img" %patchID))
-    # - Tabulate zonal stats for the other patches on the cost distance
-    zStatTable = sa.ZonalStatisticsAsTable(patchRaster,"Value",costDist,"in_memory\zstattbl","DATA","MINIMUM")
-    # - Write out edges to an edge list; setting to VALUE > patchID writes only the lower half of the matrix
-    recs = arcpy.SearchCursor(zStatTable,"VALUE > %d" %patchID)
-    rec = recs.next()
-    while rec:
-        outFile.write("%d,%d,%s\n" %(patchID, rec.VALUE, rec.MIN))
-        # - If asked to write LCPs, here we go
+        if ledger.completed:
+            stack = GeoHATstack.OpenStack(saveRasterLocation,'a')
+        else:
+            stack = GeoHATstack.OpenStack(saveRasterLocation,'w',rasInfo,maxDist)
+
+    # Get a list of patch IDs and the cells belonging to each
+    msg("Creating a list of patch IDs")
+    patchIDs, patchOffsets, patchCells = GeoHATzonal.ZoneIndex(patchArr)
+
+    # Skip patches completed in a previous run
+    pending = []
+    for i in range(len(patchIDs)):
+        if not ledger.IsComplete(patchIDs[i]):
+            pending.append(i)
+
+    # Initiate status variables
+    total = float(len(patchIDs))
+    interval = total/20 #<-- 20.0 reports status at 5% completion intervals
+    interval2 = interval
+    iter = len(patchIDs) - len(pending)
+    msg("Initiating edge list creation...")
+
+    # If running in parallel, write each slice of patches as the workers finish it
+    if workers > 1:
+        msg("Processing patches with %d worker processes" %workers)
+        scratchFolder = arcpy.env.scratchFolder or os.path.dirname(edgeList)
+        edgeChunks = GeoHATcostdist.ParallelEdges(patchArr,costArr,(patchIDs,patchOffsets,patchCells),
+                                                  cellSize,maxDist,workers,scratchFolder,indices=np.array(pending,int))
+        for chunkIDs, fromIDs, toIDs, costs in edgeChunks:
+            lines = []
+            for fromID, toID, cost in zip(fromIDs, toIDs, costs):
+                lines.append("%d,%d,%s\n" %(fromID, toID, float(cost)))
+            outFile.write("".join(lines))
+            GeoHATledger.CommitCSV(outFile,ledger,chunkIDs)
+            iter = iter + len(chunkIDs)
+            if iter > interval:
+                msg(" %d%% complete." %(float(iter/total)*100.0))
+                interval = interval + interval2
+
+    # Otherwise, loop through each patchID in the PatchIDList
+    else:
+        uncommitted = []
+        for i in pending:
+            patchID = int(patchIDs[i])
+            iter = iter + 1
+            if iter > interval:
+                msg(" %d%% complete." %(float(iter/total)*100.0))
+                interval = interval + interval2
+            # - Calculate cost distance and back link windows from the selected patch and
+            #   tabulate the minimum cost distance to the other patches in the window
+            sourceCells = patchCells[patchOffsets[i]:patchOffsets[i+1]]
+            toIDs, minCosts, window = GeoHATcostdist.PatchEdges(patchArr, costArr, sourceCells, patchID, cellSize, maxDist)
+            cdArr, blArr, (row0, col0) = window
+            # - If saving outputs, add the windows to the stack
+            if saveRasters == 'true':
+                stack.Write(patchID,cdArr,blArr,row0,col0)
+            # - Write out edges to an edge list; only patches with higher IDs are kept,
+            #   which writes only the lower half of the matrix
+            lines = []
+            for ToPatchID, minCost in zip(toIDs, minCosts):
+                lines.append("%d,%d,%s\n" %(patchID, ToPatchID, float(minCost)))
+            outFile.write("".join(lines))
+            # - If asked to write LCPs, trace the paths from the lowest cost cell of
+            #   each to-patch back to the selected patch
+            if computeLCPs == 'true':
+                nRows, nCols = cdArr.shape
+                lcpIDs, lcpCosts, startCells = GeoHATzonal.ZonalArgMinimum(patchArr[row0:row0+nRows,col0:col0+nCols],cdArr)
+                keep = (lcpIDs > patchID) & (lcpCosts > 0)
+                lcpIDs, lcpCosts, startCells = lcpIDs[keep], lcpCosts[keep], startCells[keep]
+                paths = GeoHATpaths.TracePaths(blArr,startCells)
+                window = (slice(row0,row0+nRows),slice(col0,col0+nCols))
+                coverWindow = None
+                if landCoverRaster:
+                    coverWindow = coverArr[window]
+                attributes = [np.repeat(patchID,len(lcpIDs)), lcpIDs.astype(np.int64), lcpCosts.astype(np.float64)]
+                attributes += GeoHATpaths.PathProfiles(paths,nCols,cellSize,cdArr,costArr[window],coverWindow)
+                lines = GeoHATpaths.PathPolylines(paths,nCols,row0,col0,rasInfo,tolerance)
+                for values, (xCoords, yCoords) in zip(zip(*[column.tolist() for column in attributes]), lines):
+                    lcpWriter.Add(xCoords,yCoords,values)
+            # - Record the patch as complete once its outputs are written; least
+            #   cost paths are written in batches, so patches are recorded in batches
+            uncommitted.append(patchID)
+            if computeLCPs == 'true':
+                if not lcpWriter.Ready():
+                    continue
+                lcpWriter.Flush()
+            if saveRasters == 'true':
+                stack.Flush()
+            GeoHATledger.CommitCSV(outFile,ledger,uncommitted)
+            uncommitted = []
+
+        # Write any remaining paths and record their patches
         if computeLCPs == 'true':
-            ToPatchID = rec.VALUE
-            if rec.MIN > 0:
-                # Isolate the to-patch
-                ToPatch = sa.SetNull(patchRaster,patchRaster,"VALUE <> %d" %ToPatchID)
-                # Calculate the least cost path to the to_patch
-                lcpRaster = sa.CostPath(ToPatch,costDist,backLink,"BEST_SINGLE")
-                # Convert the raster to a feature
-                lcpFeature = "in_memory/LCPfeature"
-                result = arcpy.RasterToPolyline_conversion(lcpRaster,lcpFeature)
-                # Dissolve the feature
-                lcpDissolve = "in_memory/LCPdissolve"
-                result = arcpy.Dissolve_management(lcpFeature,lcpDissolve)
-                # Copy the features over to the LCP feature class
-                cur = arcpy.InsertCursor(lcpFC)
-                feat = cur.newRow()
-                feat.shape = arcpy.SearchCursor(lcpDissolve).next().shape
-                feat.FromID = patchID
-                feat.ToID = ToPatchID
-                feat.Cost = rec.MIN
-                cur.insertRow(feat)
-                del feat, cur
-        rec = recs.next()
-    del rec, recs
-                
-# Close the edge list file object
-outFile.close()
-
-# Clean up and exit
-arcpy.AddMessage("Edges successfully written to %s" %edgeList)
+            lcpWriter.Close()
+        if saveRasters == 'true':
+            stack.Flush()
+        GeoHATledger.CommitCSV(outFile,ledger,uncommitted)
+
+    # Close the edge list file object, the stack, and the ledger
+    outFile.close()
+    if saveRasters == 'true':
+        stack.Close()
+    ledger.Close()
+
+    # Write the binary edge file alongside the edge list for faster reading
+    GeoHATedges.ConvertCSV(edgeList)
+
+    # Clean up and exit
+    arcpy.AddMessage("Edges successfully written to %s" %edgeList)
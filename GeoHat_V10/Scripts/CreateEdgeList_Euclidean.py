@@ -5,8 +5,16 @@
 #  centroids. This is much faster, but possibly less accurate than the
 #  cost distance approach.
 #
-# Inputs: <Patch raster> <edge list> <maxDistance>
-# Output: <Patch connected area raster> {patch connected area table}
+#  Centroids are computed from the patch raster in NumPy and the pairs are
+#  found with a grid hash of the centroids (GeoHATspatial.py). If a maximum
+#  distance is given, only pairs within that distance are written; if a
+#  number of neighbors is given, each patch is linked only to its k nearest
+#  patches. Edges are written to the edge list as they are found, so the
+#  full matrix of patch pairs is never built.
+#
+# Inputs: <Patch raster> <edge list> <save centroids> {centroid FC} {maxDistance} {k nearest}
+# Output: <Edge list CSV file> {centroid feature class}
+#  (a binary .edg edge file is also written alongside the edge list)
 #  
 # June 14, 2012
 # John.Fay@duke.edu
@@ -15,6 +23,7 @@
 # Import system modules
 import sys, string, os, arcpy, math
 import arcpy.sa as sa
+import GeoHATutils, GeoHATspatial, GeoHATedges
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -23,6 +32,14 @@ arcpy.env.overwriteOutput = True
 # Input variables
 patchRaster = sys.argv[1]
 saveCentroids = sys.argv[3]
+if len(sys.argv) > 5 and sys.argv[5] not in ("#","","0"):
+    maxDistance = float(sys.argv[5])    # Search radius
+else:
+    maxDistance = None
+if len(sys.argv) > 6 and sys.argv[6] not in ("#","","0"):
+    kNearest = int(sys.argv[6])         # Number of nearest neighbors
+else:
+    kNearest = None
 
 # Output variables
 edgeListFN = sys.argv[2]
@@ -35,59 +52,52 @@ def msg(txt):
     return
 
 ##---PROCESSES---
-# Create a centroid feature class from the patch raster
+# Compute the patch centroids from the patch raster
 msg("Extracting patch centroids")
-patchCentroids = "in_memory\Centroids"
-centroidRaster = sa.ZonalGeometry(patchRaster,"VALUE","CENTROID")
-arcpy.RasterToPoint_conversion(centroidRaster,patchCentroids)
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0)
+patchIDs, xCoords, yCoords = GeoHATspatial.ZoneCentroids(patchArr,rasInfo)
+del patchArr
 
 # Save the centroids, if requested
 if saveCentroids == 'true':
     msg("Centroids will be saved to %s" %centroidFC)
-    arcpy.CopyFeatures_management(patchCentroids,centroidFC)
+    arcpy.CreateFeatureclass_management(os.path.dirname(centroidFC),os.path.basename(centroidFC),
+                                        "POINT","#","#","#",rasInfo['spatialReference'])
     arcpy.AddField_management(centroidFC,"PatchID","LONG",10)
-    arcpy.CalculateField_management(centroidFC,"PatchID","[grid_code]")
-    arcpy.DeleteField_management(centroidFC,"pointid")
-    arcpy.DeleteField_management(centroidFC,"grid_code")
-
-
-# Calculate point distance table
-msg("Calculating point distance")
-ptDistTbl = "in_memory\PtDistance"
-result = arcpy.PointDistance_analysis(patchCentroids, patchCentroids,ptDistTbl)
+    cur = arcpy.InsertCursor(centroidFC)
+    for patchID, x, y in zip(patchIDs, xCoords, yCoords):
+        feat = cur.newRow()
+        feat.shape = arcpy.Point(x, y)
+        feat.PatchID = int(patchID)
+        cur.insertRow(feat)
+    del cur
 
-# Add attribute indices to point distance table
-msg("Adding fields")
-result = arcpy.AddField_management(ptDistTbl,"FromID","Long",10)
-result = arcpy.AddField_management(ptDistTbl,"ToID","Long",10)
-
-# Create a dictionary of FIDs:GridCodes
-msg("Updating ID fields")
-idDict = {}
-fidFld = arcpy.Describe(patchCentroids).OIDFieldName
-idFld = "grid_code"
-rows = arcpy.SearchCursor(patchCentroids)
-row = rows.next()
-while row:
-    idDict[row.getValue(fidFld)] = row.getValue(idFld)
-    row = rows.next()
-del row, rows
+# Find the pairs of centroids
+if kNearest:
+    msg("Finding the %d nearest patches to each patch" %kNearest)
+    pairs = [GeoHATspatial.NearestPairs(xCoords,yCoords,kNearest,maxDistance)]
+elif maxDistance:
+    msg("Finding patches within %s of each patch" %maxDistance)
+    pairs = GeoHATspatial.RadiusPairs(xCoords,yCoords,maxDistance)
+else:
+    msg("Calculating distances between all patches")
+    pairs = GeoHATspatial.RadiusPairs(xCoords,yCoords)
 
 # Create the output file
 edgeFile = open(edgeListFN, 'w')
 edgeFile.write("FromID, ToID, Distance\n")
 
-# Update the fields in the PtDist Table
+# Write the edges as each block of pairs is found
 msg("Writing edge list to %s" %edgeListFN)
-rows = arcpy.SearchCursor(ptDistTbl,"INPUT_FID < NEAR_FID")
-row = rows.next()
-while row:
-    fromID = idDict[row.INPUT_FID]
-    toID = idDict[row.NEAR_FID]
-    distance = row.DISTANCE
-    edgeFile.write("%d, %d, %d\n" %(fromID, toID, round(distance)))
-    row = rows.next()
+for i, j, distance in pairs:
+    lines = []
+    for fromID, toID, dist in zip(patchIDs[i], patchIDs[j], distance):
+        lines.append("%d, %d, %d\n" %(fromID, toID, round(dist)))
+    edgeFile.write("".join(lines))
 edgeFile.close()
 
+# Write the binary edge file alongside the edge list for faster reading
+GeoHATedges.ConvertCSV(edgeListFN)
+
    
 msg("Finished")
\ No newline at end of file
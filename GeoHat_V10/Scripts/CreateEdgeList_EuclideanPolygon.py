@@ -1,12 +1,20 @@
 #---------------------------------------------------------------------------------
 # CreateEdgeList_EuclideanPolygon.py
 #
-# Description: Creates an edge list using Euclidean distances from patch
-#  centroids. This is much faster, but possibly less accurate than the
-#  cost distance approach.
+# Description: Creates an edge list using Euclidean distances between patch
+#  edges (i.e., the nearest distance between patch boundaries) rather than
+#  between patch centroids.
 #
-# Inputs: <Patch raster> <edge list> <maxDistance>
-# Output: <Patch connected area raster> {patch connected area table}
+#  Distances are computed directly from the raster: the boundary cells of each
+#  patch are extracted and indexed on a grid (GeoHATspatial.py), and the
+#  nearest boundary-to-boundary distance and the closest points on each patch
+#  are found in batched passes. If a search radius is given, only pairs
+#  within that distance are written; otherwise every pair of patches is
+#  written, found with a search radius that doubles until each patch has been
+#  paired with every other one.
+#
+# Inputs: <Patch raster> <edge list> {searchRadius}
+# Output: <Edge list CSV file> (and a binary .edg edge file alongside it)
 #  
 # June 14, 2012
 # John.Fay@duke.edu
@@ -14,18 +22,17 @@
 
 # Import system modules
 import sys, string, os, arcpy, math
-import arcpy.sa as sa
-
-# Check out any necessary licenses
-arcpy.CheckOutExtension("spatial")
-arcpy.env.overwriteOutput = True
+import GeoHATutils, GeoHATspatial, GeoHATedges
 
 # Input variables
-subPatchRaster = r'C:\WorkSpace\GHAT\GeoHAT_016_Squirrel\Data\SubPatches'#sys.argv[1]
-searchRadius = ''
+subPatchRaster = sys.argv[1]
+if len(sys.argv) > 3 and sys.argv[3] not in ("#",""):
+    searchRadius = float(sys.argv[3])
+else:
+    searchRadius = None
 
 # Output variables
-edgeListFN = r'C:\WorkSpace\GHAT\GeoHAT_016_Squirrel\Scratch\PolyEdges.csv'
+edgeListFN = sys.argv[2]
 
 ##---FUNCTIONS---
 def msg(txt):
@@ -34,47 +41,29 @@ def msg(txt):
     return
 
 ##---PROCESSES---
-# Convert raster to polygon
-msg("Converting %s to polygons" %subPatchRaster)
-tmpPoly = "in_memory/tmpPoly"
-arcpy.RasterToPolygon_conversion(subPatchRaster,tmpPoly,"NO_SIMPLIFY")
-dslvPoly =  "in_memory/dslvPoly"
-arcpy.Dissolve_management(tmpPoly,dslvPoly,"grid_code")
+# Read the patch raster
+msg("Reading %s" %subPatchRaster)
+patchArr, rasInfo = GeoHATutils.RasterToArray(subPatchRaster,0)
 
-# Generate near table
-nearTable = "in_memory/NearTable"
-arcpy.GenerateNearTable_analysis(dslvPoly,dslvPoly,nearTable,searchRadius,"LOCATION","NO_ANGLE","ALL")
-
-# Join IDs back to near table
-arcpy.JoinField_management(nearTable,"IN_FID",dslvPoly,"OBJECTID","grid_code")
-arcpy.JoinField_management(nearTable,"NEAR_FID",dslvPoly,"OBJECTID","grid_code")
-arcpy.CopyRows_management(nearTable,r'C:\WorkSpace\GHAT\GeoHAT_016_Squirrel\Scratch\scratch.gdb\nearTable')
+# Find the nearest boundary cells of each pair of patches
+msg("Calculating edge-to-edge distances")
+fromIDs, toIDs, distances, fromXs, fromYs, toXs, toYs = \
+    GeoHATspatial.NearestBoundaryPairs(patchArr,rasInfo,searchRadius)
 
 # Create the output file
 edgeFile = open(edgeListFN, 'w')
 edgeFile.write("FromID, ToID, Distance, FromX, FromY, ToX, ToY\n")
 
-# Update the fields in the PtDist Table
+# Write the edges
 msg("Writing edge list to %s" %edgeListFN)
-rows = arcpy.SearchCursor(nearTable,"grid_code < grid_code_1")
-row = rows.next()
-while row:
-    fromID = row.grid_code
-    toID = row.grid_code_1
-    fromRec = arcpy.SearchCursor(nearTable,"grid_code = %s AND grid_code_1 = %s" %(toID, fromID)).next()
-    if fromRec:
-        fromX = fromRec.NEAR_X
-        fromY = fromRec.NEAR_Y
-    else:
-        fromX = 0
-        fromY = 0
-    del fromRec
-    toX = row.NEAR_X
-    toY = row.NEAR_Y
-    distance = round(row.NEAR_DIST)
-    edgeFile.write("%d, %d, %d, %s, %s, %s, %s\n" %(fromID,toID,distance,fromX,fromY,toX,toY))
-    row = rows.next()
+lines = []
+for fromID, toID, distance, fromX, fromY, toX, toY in zip(fromIDs, toIDs, distances, fromXs, fromYs, toXs, toYs):
+    lines.append("%d, %d, %d, %s, %s, %s, %s\n" %(fromID,toID,round(distance),fromX,fromY,toX,toY))
+edgeFile.write("".join(lines))
 edgeFile.close()
 
+# Write the binary edge file alongside the edge list for faster reading
+GeoHATedges.ConvertCSV(edgeListFN)
+
    
 msg("Finished")
\ No newline at end of file
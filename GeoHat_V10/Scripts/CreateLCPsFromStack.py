@@ -5,21 +5,73 @@
 #  Each path among patch pairs is a separate feature and is attributed
 #  with the cost of traveling that path.
 #
+#  Paths are traced in NumPy (GeoHATpaths.py): for each patch, the paths from
+#  every other patch are followed back through the patch's back link window
+#  in a single pass, starting at the lowest cost cell of each other patch (as
+#  sa.CostPath's BEST_SINGLE option does). Segments shared by several paths
+#  are traced once.
+#
+#  Each path is written as a polyline through the cells where it changes
+#  direction, with no raster to vector conversion. A simplification tolerance
+#  (in map units) can be given to thin the vertices further with a batched
+#  Douglas-Peucker pass (GeoHATpaths.PathPolylines).
+#
+#  If the cost raster is supplied, each path is also attributed with its
+#  length, accumulated cost and highest single cell cost, and if a land
+#  cover (NLCD) raster is supplied, with the share of its length through
+#  developed classes 22, 23 and 24. These are collected from the windows the
+#  paths are traced through (GeoHATpaths.PathProfiles).
+#
+#  Paths can be limited to a selection of the edges in the edge list: all
+#  edges, those under a cost threshold, the minimum spanning tree, or the
+#  Gabriel or relative neighborhood graph edges (GeoHATedges.SelectEdges).
+#  Only the selected paths are traced, and patches with no selected edges
+#  are skipped.
+#
+#  Paths are buffered and written to the output in large batches (see
+#  GeoHATvector.py); the output can be a shapefile, GeoPackage (.gpkg) or
+#  feature class. Completed patches are recorded in a ledger file once
+#  their paths are written. If a run is interrupted,
+#  run the script again with --resume to skip the completed patches.
+#
 # June 14, 2012
 # John.Fay@duke.edu
 
 # Import system modules
 import sys, string, os, arcpy
 import arcpy.sa as sa
+import numpy as np
+import GeoHATutils, GeoHATzonal, GeoHATledger, GeoHATstack, GeoHATedges, GeoHATpaths, GeoHATvector
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
 arcpy.env.overwriteOutput = True
 
 # Input variables
+resume = GeoHATledger.ResumeRequested(sys.argv)
 patchRaster = sys.argv[1]
 CostDistWS = sys.argv[2]
 edgeListFN = sys.argv[3]
+if len(sys.argv) > 5 and sys.argv[5] not in ("#",""):
+    selection = sys.argv[5].upper()     # ALL, THRESHOLD, MST, GABRIEL or RNG
+else:
+    selection = "ALL"
+if len(sys.argv) > 6 and sys.argv[6] not in ("#","","0"):
+    maxCost = float(sys.argv[6])        # Cost threshold
+else:
+    maxCost = None
+if len(sys.argv) > 7 and sys.argv[7] not in ("#",""):
+    tolerance = float(sys.argv[7])      # Path simplification tolerance
+else:
+    tolerance = 0
+if len(sys.argv) > 8 and sys.argv[8] not in ("#",""):
+    costRaster = sys.argv[8]            # Cost raster, for path profile attributes
+else:
+    costRaster = None
+if len(sys.argv) > 9 and sys.argv[9] not in ("#",""):
+    landCoverRaster = sys.argv[9]       # NLCD land cover, for the developed share of each path
+else:
+    landCoverRaster = None
 
 # Output variables
 lcpFCSave = sys.argv[4]
@@ -31,74 +83,83 @@ def msg(txt):
     return
 
 ##---PROCESSES---
-# Create a dictionary of edge costs from edge list file
-msg("Creating list of edge costs")
-edgeDict = {}
-edgeList = open(edgeListFN,'r')
-headerLine = edgeList.readline()
-dataLine = edgeList.readline()
-while dataLine:
-    lineData = dataLine.split(",")
-    fromID = int(lineData[0])
-    toID = int(lineData[1])
-    cost = float(lineData[2][:-1])
-    edgeDict[(fromID,toID)] = cost
-    dataLine = edgeList.readline()
-edgeList.close()
+# Open the edge list and select the edges to create paths for
+msg("Selecting %s edges" %selection)
+allEdges = GeoHATedges.OpenEdges(edgeListFN)
+selFrom, selTo, selCosts = GeoHATedges.SelectEdges(allEdges,selection,maxCost)
+msg("%d of %d edges selected" %(len(selCosts),len(allEdges)))
+edges = GeoHATedges.BuildStore(selFrom,selTo,selCosts)
+selPatches = set(np.minimum(selFrom,selTo).tolist())
 
-# Create a list of patch IDs
-msg("Creating list of patch IDs...")
-patchIDs = []
-rows = arcpy.SearchCursor(patchRaster)
-row = rows.next()
-while row:
-    patchIDs.append(row.VALUE)
-    row = rows.next()
-del row, rows
+# Open the stack of cost distance and back link windows and read the patch
+#  raster over the stack's extent
+msg("Reading patch raster...")
+stack = GeoHATstack.OpenStack(CostDistWS)
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0,stack.info)
+patchIDs = stack.PatchIDs()
+lcpFields = GeoHATvector.LCP_FIELDS
+if costRaster:
+    msg("Reading cost raster...")
+    costArr, rasInfo = GeoHATutils.CostRasterToArray(costRaster,rasInfo)
+    lcpFields = lcpFields + GeoHATpaths.ProfileFields(landCoverRaster is not None)
+if costRaster and landCoverRaster:
+    msg("Reading land cover raster...")
+    coverArr, rasInfo = GeoHATutils.RasterToArray(landCoverRaster,0,rasInfo)
 
-# Loop through patches and and calculate least cost paths
-streamFC = "in_memory/LCPlines"
-dslvFC = "in_memory/LCPline"
-lcpFC = "in_memory/LCPlineOut"
+# Open the ledger of completed patches and the output; if resuming, remove
+#  any paths written for a patch that was not completed
+ledger = GeoHATledger.CompletionLedger(lcpFCSave,resume)
+if ledger.completed:
+    msg("Resuming: %d patches already completed" %len(ledger.completed))
+SR = arcpy.Describe(patchRaster).spatialReference
+lcpWriter = GeoHATvector.OpenFeatureWriter(lcpFCSave,lcpFields,SR,ledger,"ToID")
+if not lcpWriter.resumed:
+    ledger.Reset()
 
-first = True
+# Loop through patches and and calculate least cost paths
+uncommitted = []
 for to_patch in patchIDs:
-    # Idenfity the cost and back link rasters
-    cdRaster = os.path.join(CostDistWS,"CD_%s.img" %to_patch)
-    blRaster = os.path.join(CostDistWS,"BL_%s.img" %to_patch)
-    # Loop through each from patch (skipping ones already processed...)
-    for from_patch in patchIDs:
-        if from_patch <= to_patch: continue
-        msg("Creating least cost path from %s to %s" %(to_patch, from_patch))
-        # Extract the cost
-        cost = edgeDict[(to_patch,from_patch)]
-        # Isolate the to patch
-        fromPatch = sa.SetNull(patchRaster,patchRaster,"VALUE <> %s" %from_patch)
-        # Calculate least cost paths from all patches to the current patch
-        lcpRaster = sa.CostPath(fromPatch,cdRaster,blRaster,"BEST_SINGLE")
-        # Convert the backlink to a flow direction raster
-        #fdRaster = sa.Int(sa.Exp2(blRaster) / 2)
-        # Convert the LCP raster to a vector
-        arcpy.RasterToPolyline_conversion(lcpRaster,streamFC,'ZERO',0,"NO_SIMPLIFY")
-        #sa.StreamToFeature(lcpRaster,fdRaster,streamFC,"NO_SIMPLIFY")
-        if first:   # If the first patch, dissolve to the output FC file
-            arcpy.Dissolve_management(streamFC,lcpFC)
-            arcpy.AddField_management(lcpFC,"FromID","LONG",10)
-            arcpy.AddField_management(lcpFC,"ToID","LONG",10)
-            arcpy.AddField_management(lcpFC,"Cost","DOUBLE",10,2)
-            arcpy.CalculateField_management(lcpFC,"FromID",from_patch)
-            arcpy.CalculateField_management(lcpFC,"ToID",to_patch)
-            arcpy.CalculateField_management(lcpFC,"Cost",cost)
-            first = False
-        else:       # Otherwise, dissolve it and append it to the original
-            arcpy.Dissolve_management(streamFC,dslvFC)
-            arcpy.AddField_management(dslvFC,"FromID","LONG",10)
-            arcpy.AddField_management(dslvFC,"ToID","LONG",10)
-            arcpy.AddField_management(dslvFC,"Cost","DOUBLE",10,2)
-            arcpy.CalculateField_management(dslvFC,"FromID",from_patch)
-            arcpy.CalculateField_management(dslvFC,"ToID",to_patch)
-            arcpy.CalculateField_management(dslvFC,"Cost",cost)
-            arcpy.Append_management(dslvFC,lcpFC)
+    if ledger.IsComplete(to_patch):
+        continue
+    if to_patch not in selPatches:
+        uncommitted.append(to_patch)
+        continue
+    msg("Creating least cost paths to patch %s" %to_patch)
+    # Extract the cost and back link windows from the stack
+    costDist, backLink, (row0, col0) = stack.Read(to_patch)
+    nRows, nCols = costDist.shape
+    # Find the lowest cost cell of each from patch (skipping ones already
+    #  processed and pairs not in the edge list)
+    fromIDs, minCosts, startCells = GeoHATzonal.ZonalArgMinimum(patchArr[row0:row0+nRows,col0:col0+nCols],costDist)
+    keep = fromIDs > to_patch
+    fromIDs, startCells = fromIDs[keep], startCells[keep]
+    costs = edges.Costs(fromIDs,np.repeat(to_patch,len(fromIDs)))
+    keep = ~np.isnan(costs)
+    fromIDs, startCells, costs = fromIDs[keep], startCells[keep], costs[keep]
+    # Trace the paths from all the from patches back to the current patch
+    paths = GeoHATpaths.TracePaths(backLink,startCells)
+    # Collect the profile attributes of the paths from the same windows
+    attributes = [fromIDs.astype(np.int64), np.repeat(to_patch,len(fromIDs)), costs.astype(np.float64)]
+    if costRaster:
+        window = (slice(row0,row0+nRows),slice(col0,col0+nCols))
+        coverWindow = None
+        if landCoverRaster:
+            coverWindow = coverArr[window]
+        attributes += GeoHATpaths.PathProfiles(paths,nCols,rasInfo['cellSize'],costDist,costArr[window],coverWindow)
+    # Convert the paths to polylines and add them to the output
+    lines = GeoHATpaths.PathPolylines(paths,nCols,row0,col0,rasInfo,tolerance)
+    for values, (xCoords, yCoords) in zip(zip(*[column.tolist() for column in attributes]), lines):
+        lcpWriter.Add(xCoords,yCoords,values)
+    # Once a batch of paths is written, record their patches as complete
+    uncommitted.append(to_patch)
+    if lcpWriter.Ready():
+        lcpWriter.Flush()
+        ledger.Commit(uncommitted)
+        uncommitted = []
 
-arcpy.CopyFeatures_management(lcpFC,lcpFCSave)
-msg("Finished")
\ No newline at end of file
+# Write the remaining paths and close the output
+lcpWriter.Close()
+ledger.Commit(uncommitted)
+stack.Close()
+ledger.Close()
+msg("Finished")
@@ -5,19 +5,21 @@
 #  The paths created are not attributed in any useful manner, but processing
 #  them is *relatively* quick. The output is useful for display purposes.
 #
-#  This tool requires the cost distance and cost back link rasters created
-#  when the CreateEdgeList script is run. It loops through each patch, extracts
-#  the cost distance and cost back link raster associated with that patch and
-#  uses them to draw raster LCPs back to that patch. At each iteration, the
-#  LCP is combined with previously calculated LCPs to create a raster identifying
-#  all cells involved in any least cost path. After all patches have been processed
-#  this raster is converted to a polyline feature class.
+#  This tool requires the cost distance stack (see GeoHATstack.py) created
+#  when the CreateEdgeList script is run. The patch raster is first region
+#  grouped, so each contiguous (8 connected) part of a patch is a zone of its
+#  own. The script then loops through each patch, reads the cost distance and
+#  back link windows associated with that patch and traces the least cost
+#  path from each region of the other patches in the window back to that
+#  patch (GeoHATpaths.TracePaths), starting at the region's lowest cost cell
+#  as sa.CostPath's EACH_ZONE option does. Each path is added to a
+#  tiled uint16 count of the paths crossing each cell
+#  (GeoHATpaths.CorridorFrequency). After all patches have been processed the
+#  counts are written once, as a corridor frequency raster, and the cells
+#  crossed by any path are converted to a polyline feature class.
 #
-#  A commented out procedure (which adds processing time) converts the LCP to a set
-#  of stream features at each patch iteration. The stream features are combined into
-#  a master feature class containing the stream features from each iteration. The
-#  result more accurately reflects the directions of each LCP, but at a cost of
-#  processing time.
+# Inputs: <Patch raster> <Cost distance stack folder>
+# Outputs: <LCP feature class> {Corridor frequency raster}
 #
 # June 14, 2012
 # John.Fay@duke.edu
@@ -25,6 +27,8 @@
 # Import system modules
 import sys, string, os, arcpy
 import arcpy.sa as sa
+import numpy as np
+import GeoHATutils, GeoHATzonal, GeoHATstack, GeoHATpaths
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -36,54 +40,52 @@ CostDistWS = sys.argv[2]
 
 # Output variables
 lcpFC = sys.argv[3]
+if len(sys.argv) > 4 and sys.argv[4] not in ("#",""):
+    freqRaster = sys.argv[4]        # Corridor frequency raster (optional)
+else:
+    scratchWS = arcpy.env.scratchWorkspace or arcpy.env.scratchGDB
+    freqRaster = os.path.join(scratchWS,"lcpFreq")
 
 ##---FUNCTIONS---
 def msg(txt): print txt; arcpy.AddMessage(txt); return
 
 ##---PROCESSES---
-# Regiongroup the patch ID to ensure they are contiguous
+# Open the stack of cost distance and back link windows and read the patch
+#  raster over the stack's extent
+msg("Reading patch raster...")
+stack = GeoHATstack.OpenStack(CostDistWS)
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0,stack.info)
+patchIDs = stack.PatchIDs()
+
+# Regiongroup the patch IDs so each contiguous part of a patch gets a path
 msg("Preprocessing the patch raster")
-patchFix = sa.RegionGroup(patchRaster,"EIGHT","WITHIN","ADD_LINK")
-# Create a list of patch IDs
-msg("Creating list of patch IDs...")
-patchIDs = []
-rows = arcpy.SearchCursor(patchRaster)
-row = rows.next()
-while row:
-    patchIDs.append(row.VALUE)
-    row = rows.next()
-del row, rows
+patchFix = sa.RegionGroup(patchRaster,"EIGHT","WITHIN","NO_LINK")
+regionArr, regionInfo = GeoHATutils.RasterToArray(patchFix,0,stack.info)
 
-# Loop through patches and and calculate least cost paths
-streamFC = "in_memory/LCPlines"
-first = True
+# Loop through patches and count the least cost paths crossing each cell
+frequency = GeoHATpaths.CorridorFrequency(rasInfo)
+iter = 0
 for patchID in patchIDs:
-    msg("Working on patch %s of %s" %(patchID,len(patchIDs)))
-    # Idenfity the cost and back link rasters
-    cdRaster = os.path.join(CostDistWS,"CD_%s.img" %patchID)
-    blRaster = os.path.join(CostDistWS,"BL_%s.img" %patchID)
-    # Calculate least cost paths from all patches to the current patch
-    lcpRaster = sa.CostPath(patchFix,cdRaster,blRaster,"EACH_ZONE")
-    if first:
-        lcpOutput = sa.Con(sa.IsNull(lcpRaster),0,1)
-        first = False
-    else:
-        lcpTemp = sa.Con(sa.IsNull(lcpRaster),0,1) + lcpOutput
-        lcpOutput = sa.Con(lcpTemp,1,0,"VALUE > 0")
-    '''
-    # Convert the backlink to a flow direction raster
-    #fdRaster = sa.Int(sa.Exp2(blRaster) / 2)
-    # Convert the LCP raster to a vector
-    if first:   # If the first patch, save the streamsFC to the output FC file
-        sa.StreamToFeature(lcpRaster,fdRaster,lcpFC,"NO_SIMPLIFY")
-        first = False
-    else:       # Otherwise, create it and append it to the original
-        sa.StreamToFeature(lcpRaster,fdRaster,streamFC,"NO_SIMPLIFY")
-        arcpy.Append_management(streamFC,lcpFC)
-    '''
+    iter = iter + 1
+    msg("Working on patch %s of %s" %(iter,len(patchIDs)))
+    # Extract the cost and back link windows from the stack
+    costDist, backLink, (row0, col0) = stack.Read(patchID)
+    nRows, nCols = costDist.shape
+    # Find the lowest cost cell of every region of the other patches in the window
+    regionIDs, minCosts, startCells = GeoHATzonal.ZonalArgMinimum(regionArr[row0:row0+nRows,col0:col0+nCols],costDist)
+    startPatches = patchArr[row0:row0+nRows,col0:col0+nCols].ravel()[startCells]
+    startCells = startCells[(startPatches != patchID) & (startPatches != 0)]
+    # Trace the paths from all patches to the current patch and count them
+    paths = GeoHATpaths.TracePaths(backLink,startCells)
+    frequency.AddPaths(paths,nCols,row0,col0)
+stack.Close()
+
+# Write the corridor frequency raster
+msg("Writing corridor frequency raster")
+freqOutput = frequency.Save(freqRaster)
 msg("preprocessing raster")
-lcpR = sa.SetNull(lcpOutput,1, "VALUE = 0")
+lcpR = sa.Con(freqOutput,1,"","VALUE > 0")
 msg("Converting raster to polyline")
 arcpy.RasterToPolyline_conversion(lcpR,lcpFC,'NODATA','','SIMPLIFY')
 
-msg("Finished")
\ No newline at end of file
+msg("Finished")
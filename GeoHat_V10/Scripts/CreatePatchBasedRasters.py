@@ -5,6 +5,9 @@
 #   include a cost-based sub-network raster, distance to habitat, distance to protected area
 #   and a distance to patch edge. 
 #
+#   Distance to patch edge is computed in NumPy with an exact, multithreaded
+#   Euclidean distance transform (GeoHATdistance.py) instead of EucDistance.
+#
 # Inputs: <Patch Raster> <Cost surface> <Subnet cost threshold> <Protected Areas Raster or Feature Class>
 # Outputs: <Dist. to Edge> <Dist. to Habitat> <Dist. to Protected Area> <Subnetwork Raster>
 #
@@ -20,6 +23,8 @@
 
 import sys, os, arcpy
 import arcpy.sa as sa
+import numpy as np
+import GeoHATutils, GeoHATdistance
 
 arcpy.CheckOutExtension("Spatial")
 arcpy.env.overwriteOutput = True
@@ -40,16 +45,17 @@ dist2protRaster = sys.argv[10]  #r'C:\WorkSpace\GBAT2012\GHAT_V011\scratch\dist2
 
 ##--Process 1: Calculate distance to patch edge--
 arcpy.AddMessage("Calculating distance to patch edge")
-arcpy.AddMessage("...inverting habitat raster")
-nonHabitatBinary = sa.Con(sa.IsNull(patchRaster), 1)
+arcpy.AddMessage("...reading habitat raster")
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0)
 arcpy.AddMessage("...calculating distances from edge into patch")
-eucDist = sa.EucDistance(nonHabitatBinary)
-eucDist.save(dist2edgeRaster)
+eucDist = GeoHATdistance.EuclideanDistance(patchArr == 0,rasInfo['cellSize'],dtype=np.float32)
+GeoHATutils.ArrayToRaster(eucDist,rasInfo,dist2edgeRaster)
 
 ##--Process 2: Extract core areas (using distance to edge)
 arcpy.AddMessage("Extracting core areas")
-core = sa.SetNull(eucDist,patchRaster,"VALUE <= %s" %edgeWidth)
-core.save(corePatches)
+core = np.where(eucDist > float(edgeWidth), patchArr, 0)
+GeoHATutils.ArrayToRaster(core,rasInfo,corePatches,0)
+del eucDist, core, patchArr
 
 ##--Process 3: Calculate cost distance away from patch
 arcpy.AddMessage("Calculating cost distance from patches")
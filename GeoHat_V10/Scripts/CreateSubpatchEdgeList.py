@@ -5,7 +5,12 @@
 #  This edge list can be used to identify other conservation zones that
 #  would benefit if a given zone is selected. 
 #
-# Inputs: <Subpatch raster> 
+#  Adjacent subpatches are found directly from the raster by comparing each
+#  cell with its neighbors (GeoHATzonal.ZoneAdjacency), tile by tile, so
+#  large rasters need not fit in memory. Each edge also records the length
+#  of boundary the two subpatches share.
+#
+# Inputs: <Subpatch raster> {tile size} {connectivity: FOUR or EIGHT}
 # Output: <EdgelistFN>
 #  
 # June 22, 2012
@@ -14,11 +19,8 @@
 
 # Import system modules
 import sys, string, os, arcpy, math
-import arcpy.sa as sa
-
-# Check out any necessary licenses
-arcpy.CheckOutExtension("spatial")
-arcpy.env.overwriteOutput = True
+import numpy as np
+import GeoHATutils, GeoHATzonal
 
 # Input variables
 subPatchRaster = sys.argv[1] #r'C:\WorkSpace\GHAT\GeoHAT_016_Squirrel\Data\SubPatches'#sys.argv[1]
@@ -27,8 +29,14 @@ subPatchRaster = sys.argv[1] #r'C:\WorkSpace\GHAT\GeoHAT_016_Squirrel\Data\SubPa
 edgeListFN = sys.argv[2] #r'C:\WorkSpace\GHAT\GeoHAT_016_Squirrel\Scratch\SubpatchEdges.csv'
 
 # Script variables
-scratchWS = arcpy.env.scratchWorkspace #"c:\\workspace\\GHAT\\geohat_016_squirrel\\Scratch"
-subpatchCov= os.path.join(scratchWS,"SubpatchPoly")
+if len(sys.argv) > 3 and sys.argv[3] not in ("#",""):
+    tileSize = int(sys.argv[3])     # Rows and columns read at a time
+else:
+    tileSize = 4096
+if len(sys.argv) > 4 and sys.argv[4] in ("EIGHT","8"):
+    connectivity = 8                # Whether diagonal neighbors are adjacent
+else:
+    connectivity = 4
 
 
 ##---FUNCTIONS---
@@ -38,48 +46,29 @@ def msg(txt):
     return
 
 ##---PROCESSES---
-# Convert raster to polygon
-msg("Converting %s to polygons" %subPatchRaster)
-tmpPoly = "in_memory/tmpPoly"
-arcpy.RasterToPolygon_conversion(subPatchRaster,tmpPoly,"NO_SIMPLIFY")
-dslvPoly =  "in_memory/dslvPoly"
-arcpy.Dissolve_management(tmpPoly,dslvPoly,"grid_code")
-
-# Convert the subpatch polygons to a coverage
-msg("Converting subpatch zones to an Arc/Info coverage")
-arcpy.FeatureclassToCoverage_conversion("%s POLYGON" %dslvPoly,subpatchCov)
-subpatchCovPoly = arcpy.SelectData_management(subpatchCov,"polygon").getOutput(0)
-subpatchCovArc = arcpy.SelectData_management(subpatchCov,"arc").getOutput(0)
-
-# Select records into tmpTable
-msg("Creating connectitivty table")
-subPatchEdgeTbl = "in_memory/subPatchEdgeTbl"
-selString = r'"$LEFTPOLYGON" > 1 AND "$RIGHTPOLYGON" > 1'
-arcpy.TableSelect_analysis(subpatchCovArc,subPatchEdgeTbl,selString)
-
-# Join ID codes to the subPatchedgeTable
-msg("Joining IDs to connecitivty table")
-arcpy.JoinField_management(subPatchEdgeTbl, "LEFTPOLYGON", subpatchCovPoly, "SUBPATCHPOLY#", "GRID_CODE")
-arcpy.JoinField_management(subPatchEdgeTbl, "RIGHTPOLYGON", subpatchCovPoly, "SUBPATCHPOLY#", "GRID_CODE")
+# Find adjacent subpatches in each tile of the raster
+msg("Finding adjacent subpatches in %s" %subPatchRaster)
+rasInfo = GeoHATutils.RasterInfo(subPatchRaster)
+pairKeys = np.zeros(0,np.int64)
+sharedEdges = np.zeros(0,np.int64)
+for tile, row0, col0 in GeoHATutils.RasterTiles(subPatchRaster,tileSize,1,0,rasInfo):
+    tileKeys, tileEdges = GeoHATzonal.ZoneAdjacency(tile,connectivity,0,1)
+    # Merge the tile's pairs with those found so far
+    pairKeys, sharedEdges = GeoHATzonal.SumByKey(np.concatenate((pairKeys,tileKeys)),
+                                                 np.concatenate((sharedEdges,tileEdges)))
 
 # Initialize output edge list
 edgeList = open(edgeListFN, 'w')
-edgeList.write("FromID, ToID\n")
+edgeList.write("FromID, ToID, SharedLength\n")
 
 # Write values to an edge list
 msg("Writing edge list to %s" %edgeListFN)
-rows = arcpy.SearchCursor(subPatchEdgeTbl,'"GRID_CODE" > 0 AND "GRID_CODE_1" > 0')
-row = rows.next()
-while row:
-    fromID = row.GRID_CODE
-    toID = row.GRID_CODE_1
-    edgeList.write("%d, %d\n" %(fromID,toID))
-    row = rows.next()
-
-
-msg("Cleaning up")
-del row, rows
+fromIDs, toIDs = GeoHATzonal.UnpackPairs(pairKeys)
+sharedLengths = sharedEdges * rasInfo['cellSize']
+lines = []
+for fromID, toID, length in zip(fromIDs, toIDs, sharedLengths):
+    lines.append("%d, %d, %s\n" %(fromID,toID,float(length)))
+edgeList.write("".join(lines))
 edgeList.close()
-arcpy.Delete_management(subpatchCov)
 
 msg("Finished")
\ No newline at end of file
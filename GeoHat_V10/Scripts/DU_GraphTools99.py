@@ -169,6 +169,9 @@ def x_eccentricity(G, v=None, sp=None, with_labels=False):
        
     If with_labels=True 
     return dict of eccentricities keyed by vertex.
+
+    Without sp, the eccentricities of the entire graph come from
+    GeoHATcentrality.ShortestPathSweep (one Dijkstra search per node).
     """
     nodes=[]
     if v is None:              # none, use entire graph 
@@ -179,7 +182,15 @@ def x_eccentricity(G, v=None, sp=None, with_labels=False):
         nodes=[v]
 
     e={}
+    if sp is None and v is None:
+        import GeoHATcentrality
+        if G.number_of_nodes() > 0 and not nx.is_connected(G):
+            raise nx.NetworkXError,\
+                  "Graph not connected: infinite path length"
+        e=GeoHATcentrality.ShortestPathSweep(G,'weight',("eccentricity",))["eccentricity"]
     for v in nodes:
+        if v in e:
+            continue
         if sp is None:
             length=nx.single_source_dijkstra_path_length(G,v)
         else:
@@ -5,8 +5,14 @@
 #  Each edge is labeled with the cost distance associated in traveling between
 #  patch pairs.
 #
-# Inputs: <Patch raster> <edge list> <maxDistance>
-# Output: <Patch connected area raster> {patch connected area table}
+#  Patch centroids are computed from the patch raster in NumPy
+#  (GeoHATspatial.ZoneCentroids). The edges within the cost threshold are
+#  matched to their centroids as arrays and the lines are written in bulk
+#  batches (GeoHATvector.py); the output can be a shapefile, GeoPackage
+#  (.gpkg) or feature class.
+#
+# Inputs: <Patch raster> <edge list> {cost threshold}
+# Output: <Edge feature class>
 #  
 # June 14, 2012
 # John.Fay@duke.edu
@@ -14,83 +20,52 @@
 
 # Import system modules
 import sys, string, os, arcpy, math
-import arcpy.sa as sa
-
-# Check out any necessary licenses
-arcpy.CheckOutExtension("spatial")
-arcpy.env.overwriteOutput = True
+import numpy as np
+import GeoHATutils, GeoHATedges, GeoHATspatial, GeoHATvector
 
 # Input variables
-patchRaster = r'O:\GeoHAT_16July\Data\CatchPatch.img'#sys.argv[1]
-edgeListFN = r'O:\GeoHAT_16July\Data\EdgeList.csv'#sys.argv[2]
-costThreshold = 0#sys.argv[3]
-if costThreshold == '#': costThreshold = 0
+patchRaster = sys.argv[1]
+edgeListFN = sys.argv[2]
+costThreshold = sys.argv[3]
+if costThreshold in ('#',''): costThreshold = 0
 
 # Output variables 
-edgeFC = r'O:\GeoHAT_16July\Data\Edges.shp'#sys.argv[4]
+edgeFC = sys.argv[4]
 
 ##---FUNCTIONS---
 def msg(txt): print txt; arcpy.AddMessage(txt); return
 
 ##---PROCESSES---
-#Create centroids from patch raster
-msg("Creating centroids from patch raster")
-centroidRaster = sa.ZonalGeometry(patchRaster,"VALUE","CENTROID")
+#Compute centroids from the patch raster
+msg("Computing patch centroids")
+patchArr, rasInfo = GeoHATutils.RasterToArray(patchRaster,0)
+patchIDs, xCoords, yCoords = GeoHATspatial.ZoneCentroids(patchArr,rasInfo)
+del patchArr
+
+#Read the edges within the cost threshold
+msg("Reading edges")
+maxCost = float(costThreshold) or None     # Read only edges within the threshold
+fromIDs, toIDs, costs = GeoHATedges.OpenEdges(edgeListFN).Read(maxCost)
+if maxCost:
+    keep = costs < maxCost
+    fromIDs, toIDs, costs = fromIDs[keep], toIDs[keep], costs[keep]
+
+#Look up the centroid of each edge's patches, dropping edges to patches not
+# in the raster
+fromIdx = np.minimum(np.searchsorted(patchIDs,fromIDs),len(patchIDs) - 1)
+toIdx = np.minimum(np.searchsorted(patchIDs,toIDs),len(patchIDs) - 1)
+found = (patchIDs[fromIdx] == fromIDs) & (patchIDs[toIdx] == toIDs)
+if not found.all():
+    msg("Skipping %d edges to patches not in the patch raster" %(len(found) - found.sum()))
+fromIDs, toIDs, costs = fromIDs[found], toIDs[found], costs[found]
+fromIdx, toIdx = fromIdx[found], toIdx[found]
 
-#Create centroid FC from patch raster
-msg("Converting centroids to features")
-centroidFC = arcpy.RasterToPoint_conversion(centroidRaster,"in_memory\\Centroids","VALUE")
+#Create the edge output and write the edges
+msg("Creating %d edge features" %len(costs))
+SR = arcpy.Describe(patchRaster).SpatialReference
+edgeWriter = GeoHATvector.OpenFeatureWriter(edgeFC,GeoHATvector.EDGE_FIELDS,SR)
+edgeWriter.AddLines(xCoords[fromIdx],yCoords[fromIdx],xCoords[toIdx],yCoords[toIdx],
+                    [fromIDs.astype(np.int64),toIDs.astype(np.int64),costs.astype(np.float64)])
+edgeWriter.Close()
 
-#Create the feature class
-msg("Creating Edge feature class")
-SR = arcpy.Describe(centroidFC).SpatialReference
-arcpy.CreateFeatureclass_management(os.path.dirname(edgeFC),os.path.basename(edgeFC),"POLYLINE","#","ENABLED","#",SR)
-arcpy.AddField_management(edgeFC,"FromID","LONG",10)
-arcpy.AddField_management(edgeFC,"ToID","LONG",10)
-arcpy.AddField_management(edgeFC,"Cost","DOUBLE",10,2)
-arcpy.DeleteField_management(edgeFC,"ID")
-# Create a dictionary of points from the centroid FC
-msg("Extracting coordinates from centroids")
-pointDict = {}
-recs = arcpy.SearchCursor(centroidFC)
-rec = recs.next()
-while rec:
-    pnt = rec.shape
-    id = int(rec.grid_code)
-    pointDict[id] = pnt.firstPoint
-    rec = recs.next()
-del rec, recs
-# Initiaize an insert cursor and line array for the Edge FC
-msg("Creating edge features. Please be patient...")
-cur = arcpy.InsertCursor(edgeFC)
-lineArray = arcpy.Array()
-# Loop through the edge list and draw lines
-edgeFile = open(edgeListFN,'r')
-header = edgeFile.readline()
-lineText = edgeFile.readline()
-while lineText:
-    # Get the data
-    lineData = lineText[:-1].split(",")
-    fromID = int(lineData[0])
-    toID = int(lineData[1])
-    cost = float(lineData[2])
-    if cost < float(costThreshold) or costThreshold == 0:
-        # Create a new feature object
-        feat = cur.newRow()
-        lineArray.add(pointDict[fromID])
-        lineArray.add(pointDict[toID])
-        polyline = arcpy.Polyline(lineArray)
-        lineArray.removeAll()
-        feat.shape = polyline
-        feat.FromID = fromID
-        feat.ToID = toID
-        feat.Cost = cost
-        # Add the feature to the cursor
-        cur.insertRow(feat)
-    # Go to the next line
-    lineText = edgeFile.readline()
-edgeFile.close()
-del feat, cur
-    
-    
-msg("Finished")
\ No newline at end of file
+msg("Finished")
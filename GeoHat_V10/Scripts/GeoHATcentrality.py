@@ -0,0 +1,279 @@
+#---------------------------------------------------------------------------------
+# GeoHATcentrality.py
+#
+# Description: Centrality measures for large patch graphs, built on the
+#  shortest path routines of the networkx package stored with the scripts.
+#
+#  SampledCentrality estimates betweenness centrality from a sample of
+#  source nodes ("pivots") rather than from every node, as in Brandes and
+#  Pich (2007). Each connected component is sampled as its own stratum:
+#  components at or below a size threshold are computed exactly, and larger
+#  ones draw pivots, without replacement, in growing batches until the
+#  confidence interval of every node's estimate is within the requested
+#  error of the component's highest estimate (or, if only the top k nodes
+#  are wanted, within the requested error of those nodes' own estimates),
+#  until a maximum number of pivots has been drawn, or until every node has
+#  been used, which makes the result exact. Values are normalized within
+#  each component, as they are when betweenness_centrality is run on each
+#  connected component subgraph. The same searches give estimates of
+#  closeness and harmonic closeness from each node's distances to the
+#  pivots (Eppstein and Wang, 2004) and a lower bound on its eccentricity,
+#  so no measure needs a search from every node.
+#
+#  ShortestPathSweep runs one single source shortest path search per node
+#  and feeds its settled order, predecessors, path counts and distances to
+#  several measures at once: betweenness, closeness, harmonic closeness and
+#  eccentricity. Computing them separately would repeat the searches once
+#  per measure.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import math, random, heapq
+import numpy as np
+import networkx as nx
+
+def _NormalQuantile(p):
+    '''Returns z such that a standard normal variable is below z with
+    probability p, found by bisection on the error function'''
+    lo, hi = -10.0, 10.0
+    for i in range(100):
+        mid = (lo + hi) / 2.0
+        if 0.5 * (1.0 + math.erf(mid / math.sqrt(2.0))) < p:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2.0
+
+def _ShortestPaths(G,s,weight='weight'):
+    '''Searches the shortest paths from s (Dijkstra's algorithm, or breadth
+    first if weight is None). Returns the nodes in the order they were
+    settled (S), the predecessors of each node on its shortest paths (P),
+    the number of shortest paths to each node (sigma) and the distance to
+    each node (D), for the nodes reachable from s.'''
+    S = []
+    P = {s:[]}
+    sigma = {s:1.0}
+    D = {}
+    seen = {s:0}
+    Q = [(0,s,s)]
+    push = heapq.heappush
+    pop = heapq.heappop
+    while Q:
+        dist, pred, v = pop(Q)
+        if v in D:
+            continue
+        S.append(v)
+        D[v] = dist
+        for w, edgedata in G[v].items():
+            if weight is None:
+                vwDist = dist + 1
+            else:
+                vwDist = dist + edgedata.get(weight,1)
+            if w not in D and (w not in seen or vwDist < seen[w]):
+                seen[w] = vwDist
+                push(Q,(vwDist,v,w))
+                sigma[w] = sigma[v]
+                P[w] = [v]
+            elif w not in D and vwDist == seen[w]:
+                sigma[w] += sigma[v]
+                P[w].append(v)
+    return S, P, sigma, D
+
+def _Accumulate(S,P,sigma,s):
+    '''Returns the dependency of s on each node in S (Brandes, 2001);
+    empties S'''
+    delta = dict.fromkeys(S,0.0)
+    while S:
+        w = S.pop()
+        coeff = (1.0 + delta[w]) / sigma[w]
+        for v in P[w]:
+            delta[v] += sigma[v] * coeff
+    delta[s] = 0.0
+    return delta
+
+SAMPLED_MEASURES = ("betweenness","betweennessLo","betweennessHi","closeness","harmonic","eccentricity")
+
+def SampledCentrality(G,relError=0.05,confidence=0.95,weight='weight',exactSize=200,
+                      minPivots=20,maxPivots=1000,topK=None,seed=None):
+    '''Estimates the shortest path centralities of every node of G from one
+    shortest path search per sampled pivot, component by component.
+    Components of exactSize nodes or fewer are computed exactly; in larger
+    ones, pivots are sampled in batches (the first of minPivots, then
+    doubling) until the half width of every node's betweenness confidence
+    interval is within relError times the component's highest estimate. If
+    topK is given, only the topK nodes with the highest estimates must meet
+    the bound, and it is relative to each of their own estimates instead.
+    Sampling also stops after maxPivots pivots (None for no limit); the
+    bounds are then wider than requested.
+
+    Returns a dictionary of dictionaries keyed by measure, then node:
+     betweenness     - normalized betweenness, estimated from the pivots'
+                       dependencies (Brandes and Pich, 2007)
+     betweennessLo,
+     betweennessHi   - the bounds of its confidence interval, from the
+                       normal approximation; nodes whose dependencies come
+                       from a few pivots fall above it more often than
+                       the confidence level suggests
+     closeness       - closeness within the component, from the estimated
+                       sum of the distances to the other nodes: the mean
+                       distance to the pivots times the number of other
+                       nodes (Eppstein and Wang, 2004)
+     harmonic        - the sum of the reciprocal distances to the other
+                       nodes, estimated the same way
+     eccentricity    - the distance to the farthest pivot, a lower bound
+    Pivots' own closeness, harmonic and eccentricity are exact, as is every
+    value in a component whose nodes were all used as pivots (bounds then
+    equal the value).'''
+    rng = random.Random(seed)
+    z = _NormalQuantile(0.5 + confidence / 2.0)
+    results = {}
+    for measure in SAMPLED_MEASURES:
+        results[measure] = {}
+    # Sample the components from largest to smallest
+    components = sorted(nx.connected_components(G),key=len,reverse=True)
+    for nodes in components:
+        n = len(nodes)
+        index = dict(zip(nodes,range(n)))
+        if n > 2:
+            scale = 1.0 / ((n - 1) * (n - 2))
+        else:
+            scale = 0.0
+        subG = G.subgraph(nodes)
+        pivots = list(nodes)
+        rng.shuffle(pivots)
+        if n <= exactSize:
+            batch = n
+        else:
+            batch = min(n,max(2,minPivots))
+        # Sum each node's scaled dependencies, and their squares, over the
+        #  pivots, along with its distances and reciprocal distances to them
+        total = np.zeros(n)
+        squares = np.zeros(n)
+        distSums = np.zeros(n)
+        inverseSums = np.zeros(n)
+        farthest = np.zeros(n)
+        isPivot = np.zeros(n,bool)
+        pivotDist = np.zeros(n)     # Exact distance sums of the pivots
+        pivotInverse = np.zeros(n)
+        pivotFarthest = np.zeros(n)
+        k = 0
+        while True:
+            for s in pivots[k:k + batch]:
+                S, P, sigma, D = _ShortestPaths(subG,s,weight)
+                dist = np.zeros(n)
+                for v, d in D.items():
+                    dist[index[v]] = d
+                inverse = np.zeros(n)
+                inverse[dist > 0] = 1.0 / dist[dist > 0]
+                i = index[s]
+                isPivot[i] = True
+                pivotDist[i] = dist.sum()
+                pivotInverse[i] = inverse.sum()
+                pivotFarthest[i] = dist.max()
+                distSums += dist
+                inverseSums += inverse
+                np.maximum(farthest,dist,farthest)
+                x = np.zeros(n)
+                for v, dependency in _Accumulate(S,P,sigma,s).items():
+                    x[index[v]] = dependency
+                x *= n * scale
+                total += x
+                squares += x * x
+            k = min(n,k + batch)
+            estimate = total / k
+            if k == n:
+                halfWidth = np.zeros(n)
+                break
+            # Variance of the sample mean, without replacement
+            variance = np.maximum(squares - k * estimate * estimate,0) / (k - 1)
+            halfWidth = z * np.sqrt(variance / k * (1.0 - float(k) / n))
+            if topK:
+                top = np.argsort(-estimate,kind='mergesort')[:topK]
+                converged = (halfWidth[top] <= relError * estimate[top]).all()
+            else:
+                converged = (halfWidth <= relError * estimate.max()).all()
+            if converged or (maxPivots and k >= maxPivots):
+                break
+            batch = min(n - k,batch * 2)
+            if maxPivots:
+                batch = min(batch,max(1,maxPivots - k))
+        # Scale the sums over the pivots other than each node up to all the
+        #  other nodes; pivots use their own searches
+        others = np.maximum(k - isPivot,1)
+        distSums = np.where(isPivot,pivotDist,distSums * (n - 1.0) / others)
+        inverseSums = np.where(isPivot,pivotInverse,inverseSums * (n - 1.0) / others)
+        farthest = np.where(isPivot,pivotFarthest,farthest)
+        closeness = np.zeros(n)
+        closeness[distSums > 0] = (n - 1.0) / distSums[distSums > 0]
+        for v, i in index.items():
+            results["betweenness"][v] = estimate[i]
+            results["betweennessLo"][v] = max(0.0,estimate[i] - halfWidth[i])
+            results["betweennessHi"][v] = estimate[i] + halfWidth[i]
+            results["closeness"][v] = closeness[i]
+            results["harmonic"][v] = inverseSums[i]
+            results["eccentricity"][v] = farthest[i]
+    return results
+
+def SampledBetweenness(G,relError=0.05,confidence=0.95,weight='weight',exactSize=200,
+                       minPivots=20,maxPivots=1000,topK=None,seed=None):
+    '''Estimates the normalized betweenness centrality of every node of G as
+    SampledCentrality does. Returns three dictionaries keyed by node: the
+    estimates and the lower and upper bounds of their confidence intervals.'''
+    results = SampledCentrality(G,relError,confidence,weight,exactSize,minPivots,maxPivots,topK,seed)
+    return results["betweenness"], results["betweennessLo"], results["betweennessHi"]
+
+SWEEP_MEASURES = ("betweenness","closeness","harmonic","eccentricity")
+
+def ShortestPathSweep(G,weight='weight',measures=SWEEP_MEASURES,normalized=True):
+    '''Computes several shortest path measures of every node of G from a
+    single shortest path search per node. measures is any of:
+     betweenness  - as networkx betweenness_centrality (normalized by
+                    1/((n-1)(n-2)) if normalized, else halved)
+     closeness    - as networkx closeness_centrality: (r-1) / (sum of the
+                    distances to the r nodes reached), times (r-1)/(n-1)
+                    if normalized
+     harmonic     - the sum of the reciprocal distances to the other nodes
+     eccentricity - the distance to the farthest node reached
+    where n is the number of nodes in G. Returns a dictionary of
+    dictionaries keyed by measure, then node.'''
+    n = len(G)
+    results = {}
+    for measure in measures:
+        results[measure] = {}
+    if "betweenness" in measures:
+        betweenness = results["betweenness"] = dict.fromkeys(G,0.0)
+    for s in G:
+        S, P, sigma, D = _ShortestPaths(G,s,weight)
+        if "closeness" in measures:
+            total = sum(D.values())
+            if total > 0.0 and n > 1:
+                closeness = (len(D) - 1.0) / total
+                if normalized:
+                    closeness *= (len(D) - 1.0) / (n - 1)
+            else:
+                closeness = 0.0
+            results["closeness"][s] = closeness
+        if "harmonic" in measures:
+            harmonic = 0.0
+            for v, dist in D.items():
+                if dist > 0:
+                    harmonic += 1.0 / dist
+            results["harmonic"][s] = harmonic
+        if "eccentricity" in measures:
+            results["eccentricity"][s] = max(D.values())
+        # Betweenness uses (and empties) the settled order, so it goes last
+        if "betweenness" in measures:
+            for v, dependency in _Accumulate(S,P,sigma,s).items():
+                betweenness[v] += dependency
+    if "betweenness" in measures:
+        if normalized:
+            scale = None
+            if n > 2:
+                scale = 1.0 / ((n - 1) * (n - 2))
+        else:
+            scale = 0.5
+        if scale is not None:
+            for v in betweenness:
+                betweenness[v] *= scale
+    return results
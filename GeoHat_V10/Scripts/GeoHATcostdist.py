@@ -0,0 +1,239 @@
+#---------------------------------------------------------------------------------
+# GeoHATcostdist.py
+#
+# Description: A windowed cost distance engine built on NumPy and a heap. It
+#  mimics sa.CostDistance (8 neighbor moves, the average of the two cell costs
+#  times the move length) but only visits cells whose accumulated cost is
+#  within the cost cutoff. Results are returned for a window cropped to the
+#  cells that were reached, rather than for the entire extent.
+#
+#  Back link values follow the ArcGIS convention: 0 marks a source cell and
+#  1 through 8 point to the neighbor to travel to next, clockwise from the
+#  right (1 = E, 2 = SE, 3 = S, 4 = SW, 5 = W, 6 = NW, 7 = N, 8 = NE).
+#
+#  The tentative costs and settled flags are kept in flat float64 and byte
+#  arrays the size of the cost array (9 bytes per cell), which index faster
+#  than NumPy arrays one cell at a time. They are allocated once per thread
+#  and reused by later runs, and only the cells a run touched are reset
+#  afterwards, so a small windowed run does not pay for the whole extent.
+#
+#  ParallelEdges spreads the per patch runs over a pool of worker processes.
+#  The patch, cost and patch cell arrays are saved once as .npy files, in a
+#  temporary folder of the call's own under the scratch folder, and each
+#  worker opens them read-only as memory maps, so the rasters are
+#  shared through the operating system's file cache instead of being copied
+#  to each process.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import sys, os, heapq, math, array, shutil, tempfile, threading, multiprocessing
+import numpy as np
+import GeoHATzonal
+
+BL_NODATA = 255     # Back link value of cells that were not reached
+
+# Row and column offsets for each back link direction (index = back link value)
+BL_ROWS = (0, 0, 1, 1, 1, 0, -1, -1, -1)
+BL_COLS = (0, 1, 1, 0, -1, -1, -1, 0, 1)
+
+_workspace = threading.local()  # Reusable best and settled arrays per thread
+
+def _Workspace(size):
+    '''Returns the calling thread's best cost (array of doubles) and settled
+    flag (bytearray) arrays, allocating them when there are none yet or they
+    are too small for size cells. They are handed out with every best cost
+    inf and every flag 0.'''
+    best = getattr(_workspace,'best',None)
+    if best is None or len(best) < size:
+        _workspace.best = best = array.array('d',[float('inf')]) * size
+        _workspace.settled = bytearray(size)
+    return best, _workspace.settled
+
+def CostDistance(costArr,sourceCells,cellSize=1.0,maxDist=None):
+    '''Calculates accumulated cost distance from the source cells (flat
+    indices into costArr) across the cost array. Cost cells that are negative
+    or NaN are treated as NoData and cannot be crossed. If maxDist is given,
+    cells beyond that cost are not visited.
+
+    Returns (costDist, backLink, (row0, col0)) where costDist (float32, inf
+    where not reached) and backLink (uint8, BL_NODATA where not reached) cover
+    the smallest window holding every reached cell, and row0, col0 locate the
+    window's upper left cell in costArr.'''
+    nRows, nCols = costArr.shape
+    cost = costArr.ravel()
+    if maxDist is None:
+        maxDist = float('inf')
+
+    # Build the list of moves: row, col, flat offset, length factor, and the
+    #  back link value that points from the new cell back to the current one.
+    moves = []
+    for bl in range(1,9):
+        dr = -BL_ROWS[bl]
+        dc = -BL_COLS[bl]
+        factor = cellSize / 2.0
+        if dr and dc:
+            factor = factor * math.sqrt(2)
+        moves.append((dr, dc, dr * nCols + dc, factor, bl))
+
+    # Seed the heap with the sources (skipping any on NoData cost cells)
+    heap = []
+    for cell in sourceCells:
+        cell = int(cell)
+        if cost.item(cell) >= 0:
+            heap.append((0.0, cell, 0))
+    heapq.heapify(heap)
+
+    # Run Dijkstra's algorithm, settling each cell once
+    best, settled = _Workspace(nRows * nCols)
+    touched = [cell for d, cell, bl in heap]
+    settledCells = []
+    settledDists = []
+    settledLinks = []
+    push = heapq.heappush
+    pop = heapq.heappop
+    try:
+        while heap:
+            d, cell, bl = pop(heap)
+            if settled[cell]:
+                continue
+            settled[cell] = 1
+            settledCells.append(cell)
+            settledDists.append(d)
+            settledLinks.append(bl)
+            row, col = divmod(cell, nCols)
+            cellCost = cost.item(cell)
+            for dr, dc, offset, factor, moveBL in moves:
+                r = row + dr
+                c = col + dc
+                if r < 0 or r >= nRows or c < 0 or c >= nCols:
+                    continue
+                nbr = cell + offset
+                if settled[nbr]:
+                    continue
+                nbrCost = cost.item(nbr)
+                if not nbrCost >= 0:
+                    continue
+                nd = d + factor * (cellCost + nbrCost)
+                if nd > maxDist or nd >= best[nbr]:
+                    continue
+                best[nbr] = nd
+                touched.append(nbr)
+                push(heap, (nd, nbr, moveBL))
+    finally:
+        # Reset only the cells this run touched
+        touched = np.array(touched, np.int64)
+        np.frombuffer(best,np.float64)[touched] = np.inf
+        np.frombuffer(settled,np.uint8)[touched] = 0
+
+    # Crop the results to the window of reached cells
+    if not settledCells:
+        return (np.empty((0,0),np.float32), np.empty((0,0),np.uint8), (0, 0))
+    cells = np.array(settledCells, np.int64)
+    dists = np.array(settledDists, np.float64)
+    links = np.array(settledLinks, np.uint8)
+    rows = cells // nCols
+    cols = cells % nCols
+    row0 = rows.min()
+    col0 = cols.min()
+    shape = (rows.max() - row0 + 1, cols.max() - col0 + 1)
+    costDist = np.empty(shape, np.float32)
+    costDist.fill(np.inf)
+    costDist[rows - row0, cols - col0] = dists
+    backLink = np.empty(shape, np.uint8)
+    backLink.fill(BL_NODATA)
+    backLink[rows - row0, cols - col0] = links
+    return costDist, backLink, (int(row0), int(col0))
+
+def PatchEdges(patchArr,costArr,sourceCells,patchID,cellSize=1.0,maxDist=None):
+    '''Runs CostDistance from a patch's cells and tabulates the minimum cost
+    to every patch with a higher ID inside the resulting window. Returns the
+    to-patch IDs, their costs, and the (costDist, backLink, (row0, col0))
+    window from CostDistance.'''
+    window = CostDistance(costArr,sourceCells,cellSize,maxDist)
+    costDist, backLink, (row0, col0) = window
+    nRows, nCols = costDist.shape
+    toIDs, minCosts = GeoHATzonal.ZonalMinimum(patchArr[row0:row0+nRows,col0:col0+nCols],costDist)
+    keep = toIDs > patchID
+    return toIDs[keep], minCosts[keep], window
+
+##--PARALLEL PROCESSING--
+_shared = {}    # Arrays and settings opened by each worker process
+
+def _InitWorker(arrayFiles,cellSize,maxDist):
+    '''Opens the shared arrays in a worker process as read-only memory maps'''
+    for name, arrayFile in arrayFiles.items():
+        _shared[name] = np.load(arrayFile,mmap_mode='r')
+    _shared['cellSize'] = cellSize
+    _shared['maxDist'] = maxDist
+
+def _EdgeChunk(indices):
+    '''Creates the edges for the patches in one slice of the patch index and
+    returns them as FromID, ToID, Cost arrays sorted by FromID then ToID'''
+    patchArr = _shared['patches']
+    costArr = _shared['cost']
+    patchIDs = _shared['ids']
+    offsets = _shared['offsets']
+    cells = _shared['cells']
+    fromIDs = []
+    toIDs = []
+    costs = []
+    for i in indices:
+        patchID = patchIDs[i]
+        sourceCells = cells[offsets[i]:offsets[i+1]]
+        ids, minCosts, window = PatchEdges(patchArr,costArr,sourceCells,patchID,
+                                           _shared['cellSize'],_shared['maxDist'])
+        fromIDs.append(np.repeat(patchID,len(ids)))
+        toIDs.append(ids)
+        costs.append(minCosts)
+    if not fromIDs:
+        return (np.zeros(0,np.int64), np.zeros(0,np.int64), np.zeros(0,np.float32))
+    fromIDs = np.concatenate(fromIDs)
+    toIDs = np.concatenate(toIDs)
+    costs = np.concatenate(costs)
+    order = np.lexsort((toIDs,fromIDs))
+    return fromIDs[order], toIDs[order], costs[order]
+
+def ParallelEdges(patchArr,costArr,zoneIndex,cellSize,maxDist,workers,scratchFolder,chunkSize=None,indices=None):
+    '''Generator that creates edges for all patches with a pool of worker
+    processes. zoneIndex is the (ids, offsets, cells) tuple returned by
+    GeoHATzonal.ZoneIndex. If indices is given, only those positions in the
+    zone index are processed. Each worker handles contiguous slices of the patch
+    IDs; results are yielded slice by slice, in patch ID order, as the slice's
+    patch IDs followed by its FromID, ToID, Cost arrays, so the merged edge
+    list is sorted and deterministic.'''
+    patchIDs, offsets, cells = zoneIndex
+    # Save the shared arrays where the workers can map them, in a folder of
+    #  this call's own so simultaneous runs cannot overwrite each other's files
+    arrayFolder = tempfile.mkdtemp(prefix="GeoHAT_",dir=scratchFolder)
+    pool = None
+    try:
+        arrayFiles = {}
+        for name, arr in (('patches',patchArr),('cost',costArr),('ids',patchIDs),
+                          ('offsets',offsets),('cells',cells)):
+            arrayFiles[name] = os.path.join(arrayFolder,"%s.npy" %name)
+            np.save(arrayFiles[name],np.ascontiguousarray(arr))
+        # Slice the patch index so each worker gets several slices to balance load
+        if indices is None:
+            indices = np.arange(len(patchIDs))
+        if chunkSize is None:
+            chunkSize = max(1, len(indices) // (workers * 8))
+        chunks = []
+        for i0 in range(0,len(indices),chunkSize):
+            chunks.append(indices[i0:i0 + chunkSize])
+        # When run inside ArcGIS, sys.executable is the host application; the
+        #  workers need to be started with the Python interpreter instead.
+        pythonExe = os.path.join(sys.exec_prefix,"pythonw.exe")
+        if os.name == 'nt' and os.path.exists(pythonExe) and \
+           not os.path.basename(sys.executable).lower().startswith("python"):
+            multiprocessing.set_executable(pythonExe)
+        pool = multiprocessing.Pool(workers,_InitWorker,(arrayFiles,cellSize,maxDist))
+        results = pool.imap(_EdgeChunk,chunks)
+        for chunk in chunks:
+            yield (patchIDs[chunk],) + next(results)
+        pool.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        shutil.rmtree(arrayFolder,ignore_errors=True)
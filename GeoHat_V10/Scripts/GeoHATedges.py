@@ -0,0 +1,426 @@
+#---------------------------------------------------------------------------------
+# GeoHATedges.py
+#
+# Description: A binary, columnar edge list format and a reader shared by the
+#  scripts that use edge lists. An edge file (.edg) holds:
+#   - a 24 byte header: the format tag, the number of edges and the size of
+#     the pair lookup table (as a power of 2)
+#   - the FromID (uint32), ToID (uint32) and Cost (float32) columns, each
+#     stored contiguously, with the edges sorted by cost
+#   - a pair lookup table (an open addressing hash of the unordered ID pairs)
+#
+#  Because the edges are sorted by cost, reading only the edges with cost <=
+#  a threshold reads only the start of each column. The file is memory mapped,
+#  so nothing else is read. The lookup table gives the cost of any patch pair
+#  in constant time.
+#
+#  Costs in an edge file are float32, so thresholds are compared against the
+#  rounded costs: a CSV cost a little above a threshold (by less than float32
+#  rounding, about 1 part in 16 million) is read from the edge file as within
+#  it. CSV edge lists read directly keep float64 costs and compare exactly.
+#
+#  OpenEdges also accepts the CSV edge lists written by the edge list
+#  scripts (with either "FromID,ToID,Cost" or "FromID, ToID, Distance" style
+#  headers), so consumers can take either format. The edge list scripts also
+#  write an edge file alongside each CSV, which OpenEdges opens in its place.
+#
+#  Adjacency holds an edge list as a symmetric sparse (CSR) adjacency over a
+#  set of node IDs, so per node sums over neighbors are computed as sparse
+#  matrix-vector products in NumPy rather than by walking a graph.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import os, struct
+import numpy as np
+
+FORMAT_TAG = b"GHEDGES1"
+HEADER = struct.Struct("<8sqq")
+_HASH_MULT = 0x9E3779B97F4A7C15     # Fibonacci hashing multiplier
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+##--PAIR LOOKUP--
+def _PairKeys(fromIDs,toIDs):
+    '''Packs unordered ID pairs into uint64 keys'''
+    fromIDs = np.asarray(fromIDs).astype(np.uint64)
+    toIDs = np.asarray(toIDs).astype(np.uint64)
+    return (np.minimum(fromIDs,toIDs) << np.uint64(32)) | np.maximum(fromIDs,toIDs)
+
+def _Slots(keys,bits):
+    '''Returns the home slot of each key in a table of 2**bits slots'''
+    return ((keys * np.uint64(_HASH_MULT)) >> np.uint64(64 - bits)).astype(np.int64)
+
+def _BuildTable(keys):
+    '''Builds a linear probing hash table of the keys. Slots hold the index
+    of the key's edge plus one (0 = empty). Where a pair appears more than
+    once, the first (lowest cost) edge is used.'''
+    bits = 1
+    while (1 << bits) < 2 * len(keys):
+        bits += 1
+    table = np.zeros(1 << bits,np.uint32)
+    mask = (1 << bits) - 1
+    uniqueKeys, pending = np.unique(keys,return_index=True)
+    home = _Slots(uniqueKeys,bits)
+    probe = 0
+    # Each round, the unplaced keys try the next slot along from their home
+    #  slot; one key is placed in each empty slot tried
+    while len(pending):
+        slots = (home + probe) & mask
+        free = table[slots] == 0
+        table[slots[free]] = pending[free] + 1
+        placed = np.zeros(len(pending),bool)
+        placed[free] = table[slots[free]] == pending[free] + 1
+        pending = pending[~placed]
+        home = home[~placed]
+        probe += 1
+    return table, bits
+
+##--EDGE STORE--
+class EdgeStore(object):
+    '''Edges held as FromID, ToID and Cost columns sorted by cost, with a pair
+    lookup table. Use OpenEdges to open an edge file or CSV edge list.'''
+    def __init__(self,fromIDs,toIDs,costs,table,bits):
+        self.fromIDs = fromIDs
+        self.toIDs = toIDs
+        self.costs = costs
+        self.table = table
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+
+    def __len__(self):
+        return len(self.costs)
+
+    def Count(self,maxCost=None):
+        '''Returns the number of edges with cost <= maxCost (all if None)'''
+        if maxCost is None:
+            return len(self.costs)
+        # Compare in the costs' own type, rounding the threshold down so no
+        #  stored cost above maxCost is counted
+        threshold = self.costs.dtype.type(maxCost)
+        if float(threshold) > float(maxCost):
+            threshold = np.nextafter(threshold,self.costs.dtype.type(-np.inf))
+        return int(np.searchsorted(self.costs,threshold,'right'))
+
+    def Read(self,maxCost=None):
+        '''Returns FromID, ToID and Cost arrays of the edges with cost <=
+        maxCost (all edges if maxCost is None), sorted by cost'''
+        n = self.Count(maxCost)
+        return np.array(self.fromIDs[:n]), np.array(self.toIDs[:n]), np.array(self.costs[:n])
+
+    def Graph(self,maxCost=None):
+        '''Returns a networkx Graph of the edges with cost <= maxCost, with
+        costs as the "weight" edge attribute'''
+        import networkx as nx
+        fromIDs, toIDs, costs = self.Read(maxCost)
+        G = nx.Graph()
+        G.add_weighted_edges_from(zip(fromIDs.tolist(),toIDs.tolist(),costs.tolist()))
+        return G
+
+    def Cost(self,fromID,toID,default=None):
+        '''Returns the cost of the edge between two patches (in either order),
+        or default if there is no such edge'''
+        lo = min(int(fromID),int(toID))
+        hi = max(int(fromID),int(toID))
+        slot = (((lo << 32 | hi) * _HASH_MULT) & _MASK64) >> (64 - self.bits)
+        while True:
+            entry = int(self.table[slot])
+            if entry == 0:
+                return default
+            a = int(self.fromIDs[entry - 1])
+            b = int(self.toIDs[entry - 1])
+            if min(a,b) == lo and max(a,b) == hi:
+                return float(self.costs[entry - 1])
+            slot = (slot + 1) & self.mask
+
+    def Costs(self,fromIDs,toIDs,default=np.nan):
+        '''Vectorized Cost: returns the costs of many pairs as an array'''
+        keys = _PairKeys(fromIDs,toIDs)
+        result = np.empty(len(keys),self.costs.dtype)
+        result.fill(default)
+        pending = np.arange(len(keys))
+        slots = _Slots(keys,self.bits)
+        while len(pending):
+            entries = self.table[slots].astype(np.int64)
+            found = entries > 0
+            edges = entries[found] - 1
+            match = np.zeros(len(pending),bool)
+            match[found] = _PairKeys(self.fromIDs[edges],self.toIDs[edges]) == keys[pending[found]]
+            result[pending[match]] = self.costs[entries[match] - 1]
+            more = found & ~match
+            pending = pending[more]
+            slots = (slots[more] + 1) & self.mask
+        return result
+
+def BuildStore(fromIDs,toIDs,costs):
+    '''Returns an in-memory EdgeStore of the supplied edge columns. Edges
+    are sorted by cost; edges of equal cost keep their input order. float64
+    costs (e.g., from ReadCSV) are kept as float64; others become float32.'''
+    fromIDs = np.asarray(fromIDs).astype(np.uint32)
+    toIDs = np.asarray(toIDs).astype(np.uint32)
+    costs = np.asarray(costs)
+    if costs.dtype != np.float64:
+        costs = costs.astype(np.float32)
+    order = np.argsort(costs,kind='mergesort')
+    fromIDs, toIDs, costs = fromIDs[order], toIDs[order], costs[order]
+    table, bits = _BuildTable(_PairKeys(fromIDs,toIDs))
+    return EdgeStore(fromIDs,toIDs,costs,table,bits)
+
+def WriteEdges(fileName,fromIDs,toIDs,costs):
+    '''Writes edge columns to a binary edge file, sorted by cost'''
+    store = BuildStore(fromIDs,toIDs,costs)
+    outFile = open(fileName,'wb')
+    outFile.write(HEADER.pack(FORMAT_TAG,len(store),store.bits))
+    store.fromIDs.astype('<u4').tofile(outFile)
+    store.toIDs.astype('<u4').tofile(outFile)
+    store.costs.astype('<f4').tofile(outFile)
+    store.table.astype('<u4').tofile(outFile)
+    outFile.close()
+    return store
+
+def IsEdgeFile(fileName):
+    '''Returns True if the file is a binary edge file'''
+    inFile = open(fileName,'rb')
+    tag = inFile.read(len(FORMAT_TAG))
+    inFile.close()
+    return tag == FORMAT_TAG
+
+def _MapColumn(fileName,dtype,offset,count):
+    if count == 0:
+        return np.zeros(0,dtype)
+    return np.memmap(fileName,dtype,'r',offset,(count,))
+
+def _ParseLines(text,nFields):
+    '''Parses comma separated lines of nFields numbers into an array with
+    one row per line'''
+    text = text.replace("\r","").strip()
+    if not text:
+        return np.zeros((0,nFields))
+    nLines = text.count("\n") + 1
+    values = np.fromstring(text.replace("\n",","),np.float64,sep=",")
+    if len(values) != nLines * nFields:
+        raise ValueError("Edge list lines must each hold %d numbers" %nFields)
+    return values.reshape(nLines,nFields)
+
+def ReadCSV(fileName,blockSize=1 << 24):
+    '''Reads the FromID, ToID and Cost columns of a CSV edge list. A header
+    line, if present, is skipped; other columns are ignored. The file is
+    read in blocks of about blockSize bytes, each parsed in one call.'''
+    inFile = open(fileName,'r')
+    firstLine = inFile.readline()
+    dataLine = firstLine
+    start = 0
+    if not firstLine.split(",")[0].strip().isdigit():
+        start = inFile.tell()
+        dataLine = inFile.readline()
+    inFile.seek(start)
+    # Return empty columns if there are no lines after the header
+    if not dataLine.strip():
+        inFile.close()
+        return np.zeros(0,np.uint32), np.zeros(0,np.uint32), np.zeros(0,np.float32)
+    nFields = len(dataLine.split(","))
+    fromList = []
+    toList = []
+    costList = []
+    remainder = ""
+    while True:
+        block = inFile.read(blockSize)
+        if not block:
+            text = remainder
+        else:
+            # Parse up to the last complete line; keep the rest for the next block
+            block = remainder + block
+            cut = block.rfind("\n") + 1
+            text, remainder = block[:cut], block[cut:]
+        rows = _ParseLines(text,nFields)
+        fromList.append(rows[:,0])
+        toList.append(rows[:,1])
+        costList.append(rows[:,2])
+        if not block:
+            break
+    inFile.close()
+    return np.concatenate(fromList), np.concatenate(toList), np.concatenate(costList)
+
+def EdgeFileName(csvFN):
+    '''Returns the name of the binary edge file written alongside a CSV edge
+    list'''
+    return os.path.splitext(csvFN)[0] + ".edg"
+
+def OpenEdges(fileName):
+    '''Opens a binary edge file (memory mapped) or reads a CSV edge list,
+    returning an EdgeStore. If a CSV edge list has an edge file alongside it
+    (see EdgeFileName) that is at least as new, the edge file is opened
+    instead.'''
+    if not IsEdgeFile(fileName):
+        edgeFN = EdgeFileName(fileName)
+        if edgeFN != fileName and os.path.exists(edgeFN) and IsEdgeFile(edgeFN) and \
+           os.path.getmtime(edgeFN) >= os.path.getmtime(fileName):
+            fileName = edgeFN
+        else:
+            return BuildStore(*ReadCSV(fileName))
+    inFile = open(fileName,'rb')
+    tag, count, bits = HEADER.unpack(inFile.read(HEADER.size))
+    inFile.close()
+    offset = HEADER.size
+    fromIDs = _MapColumn(fileName,'<u4',offset,count)
+    toIDs = _MapColumn(fileName,'<u4',offset + 4 * count,count)
+    costs = _MapColumn(fileName,'<f4',offset + 8 * count,count)
+    table = _MapColumn(fileName,'<u4',offset + 12 * count,1 << bits)
+    return EdgeStore(fromIDs,toIDs,costs,table,bits)
+
+def ConvertCSV(csvFN,edgeFN=None):
+    '''Converts a CSV edge list to a binary edge file (by default, the one
+    named by EdgeFileName)'''
+    if edgeFN is None:
+        edgeFN = EdgeFileName(csvFN)
+    return WriteEdges(edgeFN,*ReadCSV(csvFN))
+
+##--SPARSE ADJACENCY--
+class Adjacency(object):
+    '''A symmetric adjacency matrix in compressed sparse row (CSR) form. Row
+    i holds the neighbors of node ids[i]: their positions in ids (indices)
+    and the edge costs (data) in indptr[i]:indptr[i+1]. Edges whose ends are
+    not in ids are dropped.'''
+    def __init__(self,fromIDs,toIDs,costs,ids=None):
+        fromIDs = np.asarray(fromIDs)
+        toIDs = np.asarray(toIDs)
+        costs = np.asarray(costs,np.float64)
+        if ids is None:
+            ids = np.unique(np.concatenate((fromIDs,toIDs)))
+        self.ids = np.asarray(ids)
+        n = len(self.ids)
+        # Find each end's row, dropping edges to unknown nodes
+        a = np.minimum(np.searchsorted(self.ids,fromIDs),max(n - 1,0))
+        b = np.minimum(np.searchsorted(self.ids,toIDs),max(n - 1,0))
+        if n:
+            known = (self.ids[a] == fromIDs) & (self.ids[b] == toIDs)
+        else:
+            known = np.zeros(len(fromIDs),bool)
+        a, b, costs = a[known], b[known], costs[known]
+        rows = np.concatenate((a,b))
+        cols = np.concatenate((b,a))
+        order = np.argsort(rows,kind='mergesort')
+        self.rows = rows[order]
+        self.indices = cols[order]
+        self.data = np.concatenate((costs,costs))[order]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.rows,minlength=n))))
+
+    def Degree(self):
+        '''Returns the number of neighbors of each node'''
+        return np.diff(self.indptr)
+
+    def RowSums(self,values):
+        '''Sums a value given for each stored entry (e.g., a function of
+        self.data) over each row'''
+        return np.bincount(self.rows,values,len(self.ids))
+
+    def MatVec(self,x,weights=None):
+        '''Returns the product of the matrix and a vector x with one value
+        per node. Each entry counts as 1, or as its value in weights (one per
+        stored entry) if given.'''
+        values = np.asarray(x,np.float64)[self.indices]
+        if weights is not None:
+            values = values * weights
+        return self.RowSums(values)
+
+##--EDGE SELECTION--
+SELECTIONS = ("ALL","THRESHOLD","MST","GABRIEL","RNG")
+
+def UniqueEdges(fromIDs,toIDs,costs):
+    '''Drops self loops and repeated pairs (keeping the lowest cost of each)'''
+    keep = fromIDs != toIDs
+    fromIDs, toIDs, costs = fromIDs[keep], toIDs[keep], costs[keep]
+    order = np.argsort(costs,kind='mergesort')
+    fromIDs, toIDs, costs = fromIDs[order], toIDs[order], costs[order]
+    keys, first = np.unique(_PairKeys(fromIDs,toIDs),return_index=True)
+    first = np.sort(first)
+    return fromIDs[first], toIDs[first], costs[first]
+
+def MinimumSpanningEdges(fromIDs,toIDs,costs):
+    '''Returns a mask of the edges (sorted by cost) that form a minimum
+    spanning forest, found with Kruskal's algorithm'''
+    ids, nodes = np.unique(np.concatenate((fromIDs,toIDs)),return_inverse=True)
+    n = len(fromIDs)
+    parent = list(range(len(ids)))
+    inTree = np.zeros(n,bool)
+    needed = len(ids) - 1
+    for e, (a, b) in enumerate(zip(nodes[:n].tolist(),nodes[n:].tolist())):
+        # Find the root of each endpoint, halving paths as we go
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a != b:
+            parent[a] = b
+            inTree[e] = True
+            needed -= 1
+            if needed == 0:
+                break
+    return inTree
+
+def ProximityEdges(store,fromIDs,toIDs,costs,rule="RNG",blockSize=200000):
+    '''Returns a mask of the edges kept by a proximity graph rule, using edge
+    costs as distances. An edge u-v is dropped if some patch w linked to both
+    is closer to each of them: for "RNG" (relative neighborhood graph) if
+    max(cost(u,w), cost(w,v)) < cost(u,v); for "GABRIEL" if
+    cost(u,w)**2 + cost(w,v)**2 < cost(u,v)**2. store is the EdgeStore used
+    to look up cost(w,v); pairs missing from it have no cost.'''
+    n = len(fromIDs)
+    ids, nodes = np.unique(np.concatenate((fromIDs,toIDs)),return_inverse=True)
+    # Build the adjacency lists, each sorted by cost, with both directions of
+    #  each edge; directed edge d and d + n are the two directions of edge d
+    src = nodes
+    dst = np.concatenate((nodes[n:],nodes[:n]))
+    cst = np.concatenate((costs,costs)).astype(np.float64)
+    order = np.lexsort((cst,src))
+    position = np.empty(2 * n,np.int64)
+    position[order] = np.arange(2 * n)
+    rowStart = np.searchsorted(src[order],np.arange(len(ids)),'left')
+    dstSorted = ids[dst[order]]
+    cstSorted = cst[order]
+    # The only possible witnesses w for an edge are the neighbors of one end
+    #  that are closer than the other end; use whichever end has fewer
+    prefixA = position[:n] - rowStart[nodes[:n]]
+    prefixB = position[n:] - rowStart[nodes[n:]]
+    useA = prefixA <= prefixB
+    starts = np.where(useA, rowStart[nodes[:n]], rowStart[nodes[n:]])
+    lengths = np.where(useA, prefixA, prefixB)
+    others = np.where(useA, toIDs, fromIDs)
+    keep = np.ones(n,bool)
+    for e0 in range(0,n,blockSize):
+        block = np.arange(e0,min(n,e0 + blockSize))
+        blockLengths = lengths[block]
+        if blockLengths.sum() == 0:
+            continue
+        runStarts = np.concatenate(([0], np.cumsum(blockLengths)[:-1]))
+        gather = np.arange(blockLengths.sum()) + np.repeat(starts[block] - runStarts,blockLengths)
+        edge = np.repeat(block,blockLengths)
+        c2 = store.Costs(dstSorted[gather],others[edge]).astype(np.float64)
+        # Pairs with no edge (NaN cost) cannot be witnesses; drop them before
+        #  comparing so NaNs don't raise invalid value warnings
+        linked = ~np.isnan(c2)
+        edge, gather, c2 = edge[linked], gather[linked], c2[linked]
+        c1 = cstSorted[gather]
+        c = costs[edge].astype(np.float64)
+        if rule == "GABRIEL":
+            witness = c1 * c1 + c2 * c2 < c * c
+        else:
+            witness = np.maximum(c1,c2) < c
+        keep[np.unique(edge[witness])] = False
+    return keep
+
+def SelectEdges(store,selection="ALL",maxCost=None):
+    '''Returns FromID, ToID and Cost arrays of the edges in an EdgeStore
+    chosen by a selection rule (see SELECTIONS): all edges, those with cost
+    <= maxCost, the minimum spanning tree, or the Gabriel or relative
+    neighborhood graph edges. maxCost, if given, also limits the other rules.'''
+    fromIDs, toIDs, costs = UniqueEdges(*store.Read(maxCost))
+    selection = selection.upper()
+    if selection == "MST":
+        keep = MinimumSpanningEdges(fromIDs,toIDs,costs)
+    elif selection in ("GABRIEL","RNG"):
+        keep = ProximityEdges(store,fromIDs,toIDs,costs,selection)
+    else:
+        keep = np.ones(len(costs),bool)
+    return fromIDs[keep], toIDs[keep], costs[keep]
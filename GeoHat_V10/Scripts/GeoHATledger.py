@@ -0,0 +1,119 @@
+#---------------------------------------------------------------------------------
+# GeoHATledger.py
+#
+# Description: A completion ledger for long patch-by-patch runs. After the
+#  output rows for a patch are flushed to disk, the patch ID is appended to a
+#  ledger file along with a marker (e.g., the byte length of the output CSV at
+#  that point). If a run dies, it can be restarted with --resume: patches in
+#  the ledger are skipped, the output is cut back to the last recorded marker
+#  (removing rows from a patch that was only partly written) and new rows are
+#  appended.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import os
+
+def ResumeRequested(argv):
+    '''Returns True if --resume was passed on the command line and removes it
+    from argv so the remaining arguments keep their positions.'''
+    if '--resume' in argv:
+        argv.remove('--resume')
+        return True
+    return False
+
+def LedgerName(outputName):
+    '''Returns the ledger file name for an output file or feature class. Ledgers
+    for outputs inside a geodatabase are written next to the geodatabase.'''
+    folder = os.path.dirname(outputName)
+    while folder and os.path.dirname(folder) != folder:
+        if os.path.splitext(folder)[1].lower() in (".gdb",".mdb"):
+            return "%s_%s.ledger" %(os.path.splitext(folder)[0],os.path.basename(outputName))
+        folder = os.path.dirname(folder)
+    return outputName + ".ledger"
+
+class CompletionLedger(object):
+    '''Records which patch IDs have been completed. Each entry is written as
+    "patchID,marker" and flushed to disk before Commit returns.'''
+    def __init__(self,outputName,resume=False):
+        self.ledgerFN = LedgerName(outputName)
+        self.completed = {}     # patchID: marker
+        self.marker = 0         # marker of the most recent commit
+        validLength = 0
+        if resume and os.path.exists(self.ledgerFN):
+            ledgerFile = open(self.ledgerFN,'r')
+            line = ledgerFile.readline()
+            # A line without a newline was cut off mid-write; ignore it
+            while line.endswith("\n"):
+                patchID, marker = line.split(",")
+                self.completed[int(patchID)] = int(marker)
+                self.marker = int(marker)
+                validLength = ledgerFile.tell()
+                line = ledgerFile.readline()
+            ledgerFile.close()
+        if self.completed:
+            self.ledgerFile = open(self.ledgerFN,'r+')
+            self.ledgerFile.truncate(validLength)
+            self.ledgerFile.seek(0,2)
+        else:
+            self.ledgerFile = open(self.ledgerFN,'w')
+
+    def IsComplete(self,patchID):
+        return int(patchID) in self.completed
+
+    def Commit(self,patchIDs,marker=0):
+        '''Adds one or more patch IDs to the ledger. The caller should flush its
+        own outputs first and pass a marker that describes their extent.'''
+        if not hasattr(patchIDs,'__iter__'):
+            patchIDs = [patchIDs]
+        lines = []
+        for patchID in patchIDs:
+            lines.append("%d,%d\n" %(patchID, marker))
+            self.completed[int(patchID)] = marker
+        self.marker = marker
+        self.ledgerFile.write("".join(lines))
+        self.ledgerFile.flush()
+        os.fsync(self.ledgerFile.fileno())
+
+    def Reset(self):
+        '''Clears the ledger, e.g. when the output it describes is missing'''
+        self.completed = {}
+        self.marker = 0
+        self.ledgerFile.seek(0)
+        self.ledgerFile.truncate()
+
+    def Close(self):
+        self.ledgerFile.close()
+
+def OpenCSV(csvFN,header,ledger):
+    '''Opens an output CSV file for a ledgered run. When resuming, the file is
+    cut back to the ledger's last marker and opened for appending; otherwise
+    a new file is created with the supplied header line.'''
+    if ledger.completed and os.path.exists(csvFN):
+        csvFile = open(csvFN,'r+')
+        csvFile.truncate(ledger.marker)
+        csvFile.seek(0,2)
+    else:
+        ledger.Reset()
+        csvFile = open(csvFN,'w')
+        csvFile.write(header)
+    return csvFile
+
+def CommitCSV(csvFile,ledger,patchIDs):
+    '''Flushes the rows written to csvFile to disk, then records the patch
+    IDs in the ledger with the file's current length as the marker.'''
+    csvFile.flush()
+    os.fsync(csvFile.fileno())
+    ledger.Commit(patchIDs,csvFile.tell())
+
+def DiscardUncommittedFeatures(featureClass,idField,ledger):
+    '''Deletes features whose idField value is not a completed patch, i.e.
+    features left behind by a patch that was interrupted.'''
+    import arcpy
+    rows = arcpy.UpdateCursor(featureClass)
+    row = rows.next()
+    while row:
+        if not ledger.IsComplete(row.getValue(idField)):
+            rows.deleteRow(row)
+        row = rows.next()
+    del rows
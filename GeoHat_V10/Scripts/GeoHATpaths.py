@@ -0,0 +1,300 @@
+#---------------------------------------------------------------------------------
+# GeoHATpaths.py
+#
+# Description: Routines for tracing least cost paths through back link windows
+#  (see GeoHATcostdist.py and GeoHATstack.py) in NumPy rather than with
+#  sa.CostPath. All the paths to one source patch are traced from its back link
+#  window in a single pass: each path follows the back links from its start
+#  cell until it reaches the source or a cell already on an earlier path, and
+#  the rest of that earlier path is reused, so shared segments are only
+#  traced once.
+#
+#  PathPolylines turns traced paths straight into polyline vertices in map
+#  coordinates, keeping only the cells where a path changes direction, and
+#  can simplify them further with a Douglas-Peucker pass run over a whole
+#  batch of paths at once (SimplifyLines).
+#
+#  PathProfiles summarizes each traced path from the windows it was traced
+#  through: its length, accumulated cost, highest single cell cost and,
+#  given a land cover window, the share of its length through developed
+#  NLCD classes. These become extra attributes of the path features.
+#
+#  CorridorFrequency counts how many paths cross each cell of the full extent
+#  in tiles of uint16 counts, so a corridor usage surface can be built from
+#  many patches' paths without full extent raster algebra.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import os
+import numpy as np
+from GeoHATcostdist import BL_ROWS, BL_COLS
+
+def TracePaths(backLink,startCells):
+    '''Follows the back links from each start cell (flat indices into the back
+    link window) to a source cell. Returns a list holding, for each start
+    cell, an array of the flat indices of the cells on its path, from the
+    start cell to the source, or None if the start cell was not reached.'''
+    nCols = backLink.shape[1]
+    links = backLink.ravel()
+    offsets = []
+    for bl in range(9):
+        offsets.append(BL_ROWS[bl] * nCols + BL_COLS[bl])
+    traced = {}     # cell: (index of the path it was first traced on, position)
+    paths = []
+    for k in range(len(startCells)):
+        cell = int(startCells[k])
+        if links.item(cell) > 8:
+            paths.append(None)
+            continue
+        segment = []
+        joined = None
+        while True:
+            if cell in traced:
+                joined = traced[cell]
+                break
+            bl = links.item(cell)
+            segment.append(cell)
+            if bl == 0:
+                break
+            cell += offsets[bl]
+        for position in range(len(segment)):
+            traced[segment[position]] = (k, position)
+        path = np.array(segment,np.int64)
+        if joined is not None:
+            j, position = joined
+            path = np.concatenate((path, paths[j][position:]))
+        paths.append(path)
+    return paths
+
+def PathCoordinates(path,nCols,row0,col0,info):
+    '''Converts a path of flat indices into a window (with nCols columns,
+    whose upper left cell is at row0, col0 of the raster described by info)
+    into x, y arrays of cell center coordinates.'''
+    cellSize = info['cellSize']
+    rows = path // nCols + row0
+    cols = path % nCols + col0
+    x = info['xmin'] + (cols + 0.5) * cellSize
+    y = info['ymax'] - (rows + 0.5) * cellSize
+    return x, y
+
+def PathPolylines(paths,nCols,row0,col0,info,tolerance=0):
+    '''Converts paths returned by TracePaths into polylines. Returns a list of
+    (x, y) vertex arrays (None for unreached paths) holding the cell centers
+    where each path starts, ends or changes direction. If tolerance is
+    greater than zero the lines are also simplified (see SimplifyLines).'''
+    lines = []
+    for path in paths:
+        if path is None:
+            lines.append(None)
+            continue
+        x, y = PathCoordinates(path,nCols,row0,col0,info)
+        if len(path) > 2:
+            # Keep the ends and the cells where the step to the next cell
+            #  changes (compared as row and column steps, since flat index
+            #  steps can coincide in narrow windows)
+            rowSteps = np.diff(path // nCols)
+            colSteps = np.diff(path % nCols)
+            changed = (rowSteps[1:] != rowSteps[:-1]) | (colSteps[1:] != colSteps[:-1])
+            turns = np.concatenate(([True], changed, [True]))
+            x, y = x[turns], y[turns]
+        lines.append((x, y))
+    if tolerance > 0:
+        lines = SimplifyLines(lines,tolerance)
+    return lines
+
+def SimplifyLines(lines,tolerance):
+    '''Simplifies a list of (x, y) vertex arrays with the Douglas-Peucker
+    algorithm, keeping the vertices needed to stay within tolerance of the
+    original lines. All the lines are processed together: each pass finds the
+    farthest vertex of every unresolved span of every line at once and splits
+    the spans whose farthest vertex is beyond the tolerance.'''
+    present = [k for k in range(len(lines)) if lines[k] is not None]
+    if not present:
+        return list(lines)
+    x = np.concatenate([lines[k][0] for k in present]).astype(np.float64)
+    y = np.concatenate([lines[k][1] for k in present]).astype(np.float64)
+    counts = np.array([len(lines[k][0]) for k in present],np.int64)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    keep = np.zeros(len(x),bool)
+    keep[starts] = True
+    keep[ends - 1] = True
+    # Spans are (first, last) vertex pairs with vertices between them
+    spanStarts = starts[counts > 2]
+    spanEnds = ends[counts > 2] - 1
+    while len(spanStarts):
+        lengths = spanEnds - spanStarts - 1
+        span = np.repeat(np.arange(len(spanStarts)),lengths)
+        vertex = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths,lengths) + \
+                 np.repeat(spanStarts + 1,lengths)
+        # Distance from each vertex to the chord of its span (or to the span's
+        #  first vertex if the chord has no length)
+        ax, ay = x[spanStarts][span], y[spanStarts][span]
+        dx, dy = x[spanEnds][span] - ax, y[spanEnds][span] - ay
+        chord = np.hypot(dx,dy)
+        px, py = x[vertex] - ax, y[vertex] - ay
+        dist = np.where(chord > 0, np.abs(dx * py - dy * px) / np.where(chord > 0, chord, 1), np.hypot(px,py))
+        # Find the farthest vertex of each span
+        order = np.lexsort((dist,span))
+        last = np.concatenate((np.flatnonzero(span[order][1:] != span[order][:-1]), [len(order) - 1]))
+        farthest = order[last]
+        split = dist[farthest] > tolerance
+        cut = vertex[farthest][split]
+        keep[cut] = True
+        # Split those spans at their farthest vertex and keep the parts that
+        #  still have vertices between their ends
+        newStarts = np.concatenate((spanStarts[split], cut))
+        newEnds = np.concatenate((cut, spanEnds[split]))
+        more = newEnds - newStarts > 1
+        spanStarts, spanEnds = newStarts[more], newEnds[more]
+    simplified = list(lines)
+    for k, start, end in zip(present, starts, ends):
+        kept = keep[start:end]
+        simplified[k] = (x[start:end][kept], y[start:end][kept])
+    return simplified
+
+PROFILE_FIELDS = [("Length","DOUBLE"),("AccCost","DOUBLE"),("MaxResist","DOUBLE")]
+DEVELOPED_FIELD = ("DevShare","DOUBLE")
+DEVELOPED_CLASSES = (22,23,24)  # NLCD developed, low to high intensity
+
+def ProfileFields(landCover=False):
+    '''Returns the (name, type) fields written by PathProfiles'''
+    if landCover:
+        return PROFILE_FIELDS + [DEVELOPED_FIELD]
+    return list(PROFILE_FIELDS)
+
+def PathProfiles(paths,nCols,cellSize,costDist,costs,landCover=None,classes=DEVELOPED_CLASSES):
+    '''Summarizes paths returned by TracePaths using windows of the same
+    shape as the back link window: costDist (the accumulated cost distance),
+    costs (the cost raster) and, optionally, landCover. Returns a list of
+    arrays, one per ProfileFields column, with a value for each path:
+     Length    - the length of the path in map units, from cell center to
+                 cell center
+     AccCost   - the accumulated cost at the path's start cell
+     MaxResist - the highest cost of any cell on the path
+     DevShare  - the share of the path's length through cells of the
+                 developed land cover classes (if landCover is given); each
+                 cell is credited with half of the steps on either side of it
+    Paths that are None get NaN values.'''
+    nPaths = len(paths)
+    present = [k for k in range(nPaths) if paths[k] is not None]
+    columns = [np.empty(nPaths) for field in ProfileFields(landCover is not None)]
+    for column in columns:
+        column.fill(np.nan)
+    if not present:
+        return columns
+    cells = np.concatenate([paths[k] for k in present])
+    counts = np.array([len(paths[k]) for k in present],np.int64)
+    starts = np.cumsum(counts) - counts
+    pathIndex = np.repeat(np.arange(len(present)),counts)
+    # Steps between consecutive cells are one cell long, or root 2 cells long
+    #  on diagonals; steps across the boundary between two paths are dropped
+    steps = np.hypot(np.diff(cells // nCols),np.diff(cells % nCols)) * cellSize
+    steps[pathIndex[1:] != pathIndex[:-1]] = 0
+    weights = np.zeros(len(cells))
+    weights[1:] += steps / 2
+    weights[:-1] += steps / 2
+    length = np.bincount(pathIndex,weights,len(present))
+    present = np.array(present,np.int64)
+    columns[0][present] = length
+    columns[1][present] = costDist.ravel()[cells[starts]]
+    columns[2][present] = np.maximum.reduceat(costs.ravel()[cells].astype(np.float64),starts)
+    if landCover is not None:
+        developed = np.zeros(len(cells),bool)
+        cover = landCover.ravel()[cells]
+        for landClass in classes:
+            developed |= cover == landClass
+        devLength = np.bincount(pathIndex,weights * developed,len(present))
+        # A single cell path has no length; its share is that of its one cell
+        devCells = np.bincount(pathIndex,developed.astype(np.float64),len(present))
+        columns[3][present] = np.where(length > 0, devLength / np.where(length > 0, length, 1), devCells / counts)
+    return columns
+
+COUNT_MAX = 65535               # Largest uint16 path count; counts saturate here
+
+class CorridorFrequency(object):
+    '''Counts the paths that cross each cell of a raster extent (described by
+    info, see GeoHATutils.RasterToArray). Counts are held in square uint16
+    tiles that are only created once a path enters them.'''
+    def __init__(self,info,tileSize=1024):
+        self.info = info
+        self.nRows = int(info['nRows'])
+        self.nCols = int(info['nCols'])
+        self.tileSize = int(tileSize)
+        self.nTileCols = (self.nCols + self.tileSize - 1) // self.tileSize
+        self.tiles = {}
+
+    def _Tile(self,key):
+        '''Returns the counts of a tile, creating it if needed'''
+        tile = self.tiles.get(key)
+        if tile is None:
+            row0 = (key // self.nTileCols) * self.tileSize
+            col0 = (key % self.nTileCols) * self.tileSize
+            shape = (min(self.tileSize,self.nRows - row0), min(self.tileSize,self.nCols - col0))
+            tile = np.zeros(shape,np.uint16)
+            self.tiles[key] = tile
+        return tile
+
+    def AddPaths(self,paths,nCols,row0,col0):
+        '''Adds paths returned by TracePaths (flat indices into a window with
+        nCols columns whose upper left cell is at row0, col0) to the counts.
+        Each path adds one to every cell it crosses.'''
+        paths = [path for path in paths if path is not None]
+        if not paths:
+            return
+        cells = np.concatenate(paths)
+        rows = cells // nCols + row0
+        cols = cells % nCols + col0
+        # Order the cells by tile, then by cell within the tile, and count
+        #  the runs of repeated cells
+        size = self.tileSize
+        keys = (rows // size) * self.nTileCols + cols // size
+        local = (rows % size) * size + cols % size
+        packed = np.sort(keys * (size * size) + local)
+        starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+        counts = np.diff(np.concatenate((starts, [len(packed)])))
+        packed = packed[starts]
+        keys = packed // (size * size)
+        local = packed % (size * size)
+        tileStarts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        tileEnds = np.concatenate((tileStarts[1:], [len(keys)]))
+        for start, end in zip(tileStarts, tileEnds):
+            tile = self._Tile(int(keys[start]))
+            tileCols = tile.shape[1]
+            index = (local[start:end] // size) * tileCols + local[start:end] % size
+            flat = tile.ravel()
+            total = flat[index].astype(np.int64) + counts[start:end]
+            flat[index] = np.minimum(total, COUNT_MAX)
+
+    def Tiles(self):
+        '''Generator that yields (counts, row0, col0) for each tile that any
+        path entered, in row major order'''
+        for key in sorted(self.tiles.keys()):
+            row0 = (key // self.nTileCols) * self.tileSize
+            col0 = (key % self.nTileCols) * self.tileSize
+            yield self.tiles[key], row0, col0
+
+    def Save(self,outRaster):
+        '''Writes the counts to a raster; cells no path crossed are NoData.
+        Each tile is written on its own and the tiles are then mosaicked,
+        so the full extent is never held in memory at once.'''
+        import arcpy, GeoHATutils
+        tiles = list(self.Tiles())
+        if len(tiles) <= 1:
+            if tiles:
+                counts, row0, col0 = tiles[0]
+            else:
+                counts, row0, col0 = np.zeros((1,1),np.uint16), 0, 0
+            return GeoHATutils.ArrayToRaster(counts,self.info,outRaster,0,row0,col0)
+        tileNames = []
+        for counts, row0, col0 in tiles:
+            tileName = arcpy.CreateScratchName("lcp","","RasterDataset",arcpy.env.scratchFolder) + ".tif"
+            GeoHATutils.ArrayToRaster(counts,self.info,tileName,0,row0,col0)
+            tileNames.append(tileName)
+        arcpy.MosaicToNewRaster_management(";".join(tileNames),os.path.dirname(outRaster),
+                                           os.path.basename(outRaster),"#","16_BIT_UNSIGNED",
+                                           self.info['cellSize'],1)
+        for tileName in tileNames:
+            arcpy.Delete_management(tileName)
+        return arcpy.Raster(outRaster)
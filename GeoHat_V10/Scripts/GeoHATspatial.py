@@ -0,0 +1,334 @@
+#---------------------------------------------------------------------------------
+# GeoHATspatial.py
+#
+# Description: Spatial indexing routines for Euclidean edge lists. Points are
+#  hashed into a grid of square bins; the candidate neighbors of a point are
+#  the points in the bins around its own, so pairs within a search radius, or
+#  each point's k nearest neighbors, are found without comparing every pair.
+#  Queries are vectorized over blocks of points with NumPy.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import math
+import numpy as np
+
+class PointGrid(object):
+    '''A grid hash of point coordinates. Points are sorted by bin so the points
+    in any bin occupy one run of the sorted order.'''
+    def __init__(self,x,y,binSize):
+        self.x = np.asarray(x,np.float64)
+        self.y = np.asarray(y,np.float64)
+        self.binSize = float(binSize)
+        self.x0 = self.x.min()
+        self.y0 = self.y.min()
+        self.binCols = ((self.x - self.x0) // self.binSize).astype(np.int64)
+        self.binRows = ((self.y - self.y0) // self.binSize).astype(np.int64)
+        self.nBinCols = int(self.binCols.max()) + 1
+        self.nBinRows = int(self.binRows.max()) + 1
+        keys = self.binRows * self.nBinCols + self.binCols
+        self.order = np.argsort(keys,kind='mergesort')
+        self.sortedKeys = keys[self.order]
+
+    def Candidates(self,points,ring=1):
+        '''Returns (i, j) arrays pairing each point in points with every other
+        point in the bins within ring bins of its own. Every pair of points
+        closer than ring * binSize is included.'''
+        points = np.asarray(points,np.int64)
+        iList = []
+        jList = []
+        for dr in range(-ring,ring + 1):
+            for dc in range(-ring,ring + 1):
+                rows = self.binRows[points] + dr
+                cols = self.binCols[points] + dc
+                valid = (rows >= 0) & (rows < self.nBinRows) & (cols >= 0) & (cols < self.nBinCols)
+                src = points[valid]
+                keys = rows[valid] * self.nBinCols + cols[valid]
+                starts = np.searchsorted(self.sortedKeys,keys,'left')
+                lengths = np.searchsorted(self.sortedKeys,keys,'right') - starts
+                has = lengths > 0
+                src, starts, lengths = src[has], starts[has], lengths[has]
+                if len(src) == 0:
+                    continue
+                # Expand each point's bin run into one candidate per point in the bin
+                runStarts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                gather = np.arange(lengths.sum()) + np.repeat(starts - runStarts,lengths)
+                iList.append(np.repeat(src,lengths))
+                jList.append(self.order[gather])
+        if not iList:
+            return np.zeros(0,np.int64), np.zeros(0,np.int64)
+        i = np.concatenate(iList)
+        j = np.concatenate(jList)
+        other = i != j
+        return i[other], j[other]
+
+    def Distances(self,i,j):
+        return np.hypot(self.x[i] - self.x[j], self.y[i] - self.y[j])
+
+def RadiusPairs(x,y,radius=None,blockSize=20000):
+    '''Generator that yields (i, j, distance) arrays for every pair of points
+    (i < j) within radius of each other, one block of i values at a time,
+    sorted by i then j. If radius is None, every pair is yielded.'''
+    n = len(x)
+    x = np.asarray(x,np.float64)
+    y = np.asarray(y,np.float64)
+    if radius is None:
+        # No radius; pair each block of points with all the points after it
+        step = max(1, blockSize * 50 // max(1,n))
+        for i0 in range(0,n,step):
+            rows = np.arange(i0,min(n,i0 + step))
+            counts = n - 1 - rows
+            i = np.repeat(rows,counts)
+            j = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts,counts) + i + 1
+            yield i, j, np.hypot(x[i] - x[j], y[i] - y[j])
+        return
+    grid = PointGrid(x,y,radius)
+    for i0 in range(0,n,blockSize):
+        i, j = grid.Candidates(np.arange(i0,min(n,i0 + blockSize)))
+        keep = i < j
+        i, j = i[keep], j[keep]
+        dist = grid.Distances(i,j)
+        keep = dist <= radius
+        i, j, dist = i[keep], j[keep], dist[keep]
+        order = np.lexsort((j,i))
+        yield i[order], j[order], dist[order]
+
+def NearestPairs(x,y,k,radius=None):
+    '''Returns (i, j, distance) arrays for the undirected edges linking each
+    point to its k nearest neighbors (optionally only those within radius),
+    with i < j and each edge listed once, sorted by i then j.'''
+    n = len(x)
+    x = np.asarray(x,np.float64)
+    y = np.asarray(y,np.float64)
+    k = min(k,n - 1)
+    if k < 1:
+        return np.zeros(0,np.int64), np.zeros(0,np.int64), np.zeros(0)
+    # Size the bins to hold about k points each, so a ring of bins usually
+    #  holds the k nearest
+    area = max((x.max() - x.min()) * (y.max() - y.min()), 1e-12)
+    binSize = math.sqrt(area * k / float(n))
+    if radius is not None:
+        binSize = min(binSize,radius)
+    binSize = max(binSize,1e-6)
+    grid = PointGrid(x,y,binSize)
+    maxRing = max(grid.nBinRows,grid.nBinCols)
+    iList = []
+    jList = []
+    dList = []
+    pending = np.arange(n)
+    ring = 1
+    while len(pending):
+        i, j = grid.Candidates(pending,ring)
+        dist = grid.Distances(i,j)
+        # Rank each point's candidates by distance and keep the first k
+        order = np.lexsort((j,dist,i))
+        i, j, dist = i[order], j[order], dist[order]
+        starts = np.searchsorted(i,pending,'left')
+        counts = np.searchsorted(i,pending,'right') - starts
+        rank = np.arange(len(i)) - np.repeat(starts,counts)
+        # The k nearest are certain if the kth is no farther than the ring reaches
+        reach = ring * binSize
+        kth = np.empty(len(pending))
+        kth.fill(np.inf)
+        full = counts >= k
+        kth[full] = dist[starts[full] + k - 1]
+        done = (kth <= reach) | (ring >= maxRing)
+        if radius is not None:
+            done = done | (reach >= radius)
+        doneMask = np.repeat(done,counts) & (rank < k)
+        if radius is not None:
+            doneMask = doneMask & (dist <= radius)
+        iList.append(i[doneMask])
+        jList.append(j[doneMask])
+        dList.append(dist[doneMask])
+        pending = pending[~done]
+        ring = ring * 2
+    i = np.concatenate(iList)
+    j = np.concatenate(jList)
+    dist = np.concatenate(dList)
+    # Make the edges undirected and drop duplicates
+    lo = np.minimum(i,j)
+    hi = np.maximum(i,j)
+    order = np.lexsort((hi,lo))
+    lo, hi, dist = lo[order], hi[order], dist[order]
+    first = np.concatenate(([True], (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])))
+    return lo[first], hi[first], dist[first]
+
+def ZoneCentroids(zoneArr,info,nodata=0,blockRows=1024):
+    '''Returns the zone IDs of a zone array and the x, y coordinates of the
+    centroid of each zone's cells, using the georeference in info (see
+    GeoHATutils.RasterToArray). Cell counts and row and column sums are
+    tallied with bincount a block of rows at a time, so no per cell sort or
+    index arrays for the whole extent are needed.'''
+    nRows, nCols = zoneArr.shape
+    size = 1
+    if zoneArr.size:
+        size = int(zoneArr.max()) + 1
+    counts = np.zeros(size)
+    rowSums = np.zeros(size)
+    colSums = np.zeros(size)
+    cols = np.arange(nCols,dtype=np.float64)
+    for row0 in range(0,nRows,blockRows):
+        block = zoneArr[row0:row0 + blockRows]
+        rows, blockCols = np.nonzero(block != nodata)
+        zones = block[rows,blockCols].astype(np.int64)
+        counts += np.bincount(zones,minlength=size)
+        rowSums += np.bincount(zones,rows + float(row0),size)
+        colSums += np.bincount(zones,cols[blockCols],size)
+    if 0 <= nodata < size:
+        counts[nodata] = 0
+    ids = np.flatnonzero(counts)
+    rows = rowSums[ids] / counts[ids]
+    cols = colSums[ids] / counts[ids]
+    cellSize = info['cellSize']
+    x = info['xmin'] + (cols + 0.5) * cellSize
+    y = info['ymax'] - (rows + 0.5) * cellSize
+    return ids.astype(zoneArr.dtype), x, y
+
+def PointZones(zoneArr,info,x,y,nodata=0):
+    '''Returns the value of the zone array cell containing each point (x, y),
+    found from the georeference in info, or nodata for points outside the
+    array'''
+    cellSize = float(info['cellSize'])
+    cols = np.floor((np.asarray(x,np.float64) - info['xmin']) / cellSize).astype(np.int64)
+    rows = np.floor((info['ymax'] - np.asarray(y,np.float64)) / cellSize).astype(np.int64)
+    inside = (rows >= 0) & (rows < zoneArr.shape[0]) & (cols >= 0) & (cols < zoneArr.shape[1])
+    zones = np.empty(len(rows),zoneArr.dtype)
+    zones.fill(nodata)
+    zones[inside] = zoneArr[rows[inside],cols[inside]]
+    return zones
+
+def BoundaryCells(zoneArr,nodata=0):
+    '''Returns the zone values, rows and columns of the cells on the boundary
+    of each zone (cells with a 4-neighbor in another zone or off the array),
+    grouped by zone value.'''
+    padded = np.empty((zoneArr.shape[0] + 2, zoneArr.shape[1] + 2),zoneArr.dtype)
+    padded.fill(nodata)
+    padded[1:-1,1:-1] = zoneArr
+    center = padded[1:-1,1:-1]
+    boundary = (center != padded[:-2,1:-1]) | (center != padded[2:,1:-1]) | \
+               (center != padded[1:-1,:-2]) | (center != padded[1:-1,2:])
+    boundary &= center != nodata
+    rows, cols = np.nonzero(boundary)
+    zones = zoneArr[rows,cols]
+    order = np.argsort(zones,kind='mergesort')
+    return zones[order], rows[order], cols[order]
+
+def _ClosestPerKey(key,i,j,gap):
+    '''Keeps the closest cell pair (smallest gap) for each zone pair key,
+    sorted by key'''
+    order = np.argsort(key)
+    key, gap = key[order], gap[order]
+    starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    counts = np.diff(np.append(starts,len(key)))
+    # The first position in each run of a key holding the run's smallest gap
+    closest = np.flatnonzero(gap == np.repeat(np.minimum.reduceat(gap,starts),counts))
+    closest = closest[np.searchsorted(closest,starts)]
+    order = order[closest]
+    return key[closest], i[order], j[order], gap[closest]
+
+def _BoundaryPairsWithin(zones,x,y,cells,cellSize,maxZone,radius,minGap=-1.0,maxPairs=4000000):
+    '''Returns (key, i, j, gap) for the closest pair of boundary cells i < j
+    (indices into zones, x and y) of each pair of zones whose edge-to-edge gap
+    is more than minGap and no more than radius, searching only the cells
+    given, sorted by key = from zone * maxZone + to zone. Candidate cells are
+    taken from a point grid in blocks of about maxPairs candidate pairs.'''
+    empty = np.zeros(0,np.int64)
+    if len(cells) < 2:
+        return empty, empty, empty, np.zeros(0)
+    # Cells whose edges are within radius have centers within this distance
+    centerRadius = math.hypot(radius + cellSize, radius + cellSize)
+    grid = PointGrid(x[cells],y[cells],centerRadius)
+    perCell = 9.0 * len(cells) / (grid.nBinRows * grid.nBinCols)
+    blockSize = max(64, int(maxPairs / min(perCell,len(cells))))
+    keyList = []
+    iList = []
+    jList = []
+    gapList = []
+    for i0 in range(0,len(cells),blockSize):
+        i, j = grid.Candidates(np.arange(i0,min(len(cells),i0 + blockSize)))
+        # Cells are grouped by zone, so i < j gives from zone <= to zone
+        keep = i < j
+        i, j = cells[i[keep]], cells[j[keep]]
+        keep = zones[i] != zones[j]
+        i, j = i[keep], j[keep]
+        gap = np.hypot(np.maximum(np.abs(x[i] - x[j]) - cellSize, 0),
+                       np.maximum(np.abs(y[i] - y[j]) - cellSize, 0))
+        keep = (gap <= radius) & (gap > minGap)
+        i, j, gap = i[keep], j[keep], gap[keep]
+        if len(i) == 0:
+            continue
+        key = zones[i].astype(np.int64) * maxZone + zones[j]
+        # Keep the closest cell pair for each zone pair in the block
+        key, i, j, gap = _ClosestPerKey(key,i,j,gap)
+        keyList.append(key)
+        iList.append(i)
+        jList.append(j)
+        gapList.append(gap)
+    if not keyList:
+        return empty, empty, empty, np.zeros(0)
+    # Combine the blocks, again keeping the closest pair for each zone pair
+    return _ClosestPerKey(np.concatenate(keyList),np.concatenate(iList),
+                          np.concatenate(jList),np.concatenate(gapList))
+
+def NearestBoundaryPairs(zoneArr,info,radius=None,nodata=0):
+    '''Finds the edge-to-edge (boundary) distance between each pair of zones
+    within radius of each other, treating each zone as the union of its
+    square cells, as GenerateNearTable does for polygons made from the
+    raster.
+
+    If radius is None, every pair of zones is found with an expanding search:
+    the radius starts near the typical spacing of the zones and doubles each
+    round, each round keeping the zone pairs first found within it and
+    searching only the cells of zones that still lack a partner, so nearby
+    pairs are settled by the cheap early rounds.
+
+    Returns arrays of the from zone, to zone (from < to), distance and the x, y
+    coordinates of the closest points on the from and to zones, sorted by
+    from zone then to zone.'''
+    cellSize = float(info['cellSize'])
+    half = cellSize / 2.0
+    zones, rows, cols = BoundaryCells(zoneArr,nodata)
+    x = info['xmin'] + (cols + 0.5) * cellSize
+    y = info['ymax'] - (rows + 0.5) * cellSize
+    maxZone = int(zones.max()) + 1 if len(zones) else 1
+    cells = np.arange(len(zones))
+    if radius is not None:
+        key, i, j, gap = _BoundaryPairsWithin(zones,x,y,cells,cellSize,maxZone,radius)
+    else:
+        zoneIDs = np.unique(zones)
+        nZones = len(zoneIDs)
+        nRows, nCols = zoneArr.shape
+        diagonal = math.hypot(nRows,nCols) * cellSize
+        radius = max(cellSize, math.sqrt(nRows * nCols / float(max(nZones,1))) * cellSize)
+        partners = np.zeros(maxZone,np.int64)   # Pairs found so far for each zone
+        keyList = []
+        iList = []
+        jList = []
+        gapList = []
+        minGap = -1.0
+        while True:
+            key, i, j, gap = _BoundaryPairsWithin(zones,x,y,cells,cellSize,maxZone,radius,minGap)
+            keyList.append(key)
+            iList.append(i)
+            jList.append(j)
+            gapList.append(gap)
+            partners += np.bincount(zones[i],minlength=maxZone) + np.bincount(zones[j],minlength=maxZone)
+            # Zones paired with every other zone drop out of later rounds
+            cells = cells[partners[zones[cells]] < nZones - 1]
+            if radius >= diagonal or len(cells) == 0:
+                break
+            minGap = radius
+            radius = radius * 2
+        key = np.concatenate(keyList)
+        i = np.concatenate(iList)
+        j = np.concatenate(jList)
+        gap = np.concatenate(gapList)
+        order = np.argsort(key,kind='mergesort')
+        key, i, j, gap = key[order], i[order], j[order], gap[order]
+    # Locate the closest points on the two cells' edges
+    fromX = np.clip(x[j], x[i] - half, x[i] + half)
+    fromY = np.clip(y[j], y[i] - half, y[i] + half)
+    toX = np.clip(fromX, x[j] - half, x[j] + half)
+    toY = np.clip(fromY, y[j] - half, y[j] + half)
+    return zones[i], zones[j], gap, fromX, fromY, toX, toY
@@ -0,0 +1,251 @@
+#---------------------------------------------------------------------------------
+# GeoHATstack.py
+#
+# Description: A compact store for the cost distance and back link windows
+#  created for each patch by CreateEdgeList_CostDistance.py. It replaces the
+#  full extent CD_<id>.img and BL_<id>.img rasters with three files:
+#   <name>.cds - the data file; one zlib compressed entry per patch
+#   <name>.cdx - the index; a fixed size record per entry giving the patch ID,
+#                the entry's byte range in the data file, and its window
+#   <name>.cdh - a small JSON header with the georeference of the full extent
+#                and the cost encoding
+#
+#  Each entry holds only the patch's window of reached cells (see
+#  GeoHATcostdist.CostDistance). Costs are stored as float32 or, when a cost
+#  threshold is known, quantized to uint16. Back links are packed 3 bits per
+#  cell; source and unreached cells are recovered from the cost values.
+#  The data file is memory mapped when read, so any patch can be read
+#  directly by its ID.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import os, mmap, zlib, json, threading
+import numpy as np
+
+STACK_NAME = "CostDistStack"    # Name of the stack within a cost raster folder
+
+UINT16_NODATA = 65535           # Quantized value of unreached cells
+UINT16_MAX = 65534              # Largest quantized cost
+
+INDEX_DTYPE = np.dtype([('patchID','<i8'),('offset','<i8'),('cdBytes','<i8'),('blBytes','<i8'),
+                        ('row0','<i4'),('col0','<i4'),('nRows','<i4'),('nCols','<i4')])
+
+##--ENCODING--
+def _PackBackLinks(backLink):
+    '''Packs back links 1 through 8 into 3 bits per cell (8 cells in 3 bytes).
+    Source (0) and unreached cells are packed as 0.'''
+    codes = backLink.ravel().astype(np.uint32)
+    codes = np.where((codes >= 1) & (codes <= 8), codes - 1, 0)
+    padding = (-len(codes)) % 8
+    if padding:
+        codes = np.concatenate((codes, np.zeros(padding,np.uint32)))
+    codes = codes.reshape(-1,8)
+    packed = np.zeros(len(codes),np.uint32)
+    for k in range(8):
+        packed |= codes[:,k] << (3 * k)
+    packedBytes = np.column_stack((packed & 0xFF, (packed >> 8) & 0xFF, packed >> 16))
+    return packedBytes.astype(np.uint8)
+
+def _UnpackBackLinks(packedBytes,nCells):
+    '''Reverses _PackBackLinks, returning codes 1 through 8 for every cell'''
+    packedBytes = packedBytes.reshape(-1,3).astype(np.uint32)
+    packed = packedBytes[:,0] | (packedBytes[:,1] << 8) | (packedBytes[:,2] << 16)
+    codes = np.empty((len(packed),8),np.uint8)
+    for k in range(8):
+        codes[:,k] = (packed >> (3 * k)) & 7
+    return codes.ravel()[:nCells] + 1
+
+def _EncodeCosts(costDist,backLink,encoding,scale):
+    '''Converts a cost distance window to its stored form'''
+    source = backLink == 0
+    reached = np.isfinite(costDist)
+    if encoding == 'uint16':
+        codes = np.floor(costDist[reached] / scale + 0.5)
+        codes = np.clip(codes, 1, UINT16_MAX)
+        stored = np.empty(costDist.shape,np.uint16)
+        stored.fill(UINT16_NODATA)
+        stored[reached] = codes
+        stored[source] = 0
+    else:
+        # Zero marks a source cell, so other zero costs are nudged above zero
+        stored = costDist.astype(np.float32)
+        stored[(stored == 0) & ~source] = np.finfo(np.float32).tiny
+        stored[source] = 0
+    return stored
+
+def _DecodeCosts(stored,encoding,scale):
+    '''Converts stored costs back to a float32 window (inf = unreached)'''
+    if encoding == 'uint16':
+        costDist = stored.astype(np.float32) * np.float32(scale)
+        costDist[stored == UINT16_NODATA] = np.inf
+    else:
+        costDist = stored.copy()
+    return costDist
+
+class CostDistanceStack(object):
+    '''A store of cost distance and back link windows keyed by patch ID.
+
+    mode is 'r' to read, 'w' to create a new stack, or 'a' to add entries to
+    an existing stack (e.g., when resuming an interrupted run). When creating
+    a stack, info is the raster info dictionary from GeoHATutils.RasterToArray
+    and maxDist, if given, lets costs be stored as uint16.'''
+    def __init__(self,stackName,mode='r',info=None,maxDist=None):
+        self.stackName = stackName
+        self.mode = mode
+        self.dataFN = stackName + ".cds"
+        self.indexFN = stackName + ".cdx"
+        self.headerFN = stackName + ".cdh"
+        if mode == 'w':
+            self.header = {'xmin':info['xmin'],'ymax':info['ymax'],'cellSize':info['cellSize'],
+                           'nRows':info['nRows'],'nCols':info['nCols'],
+                           'spatialReference':_SpatialReferenceString(info.get('spatialReference'))}
+            if maxDist:
+                self.header['encoding'] = 'uint16'
+                self.header['scale'] = float(maxDist) / UINT16_MAX
+            else:
+                self.header['encoding'] = 'float32'
+                self.header['scale'] = 1.0
+            headerFile = open(self.headerFN,'w')
+            json.dump(self.header,headerFile)
+            headerFile.close()
+            index = np.zeros(0,INDEX_DTYPE)
+            self.dataFile = open(self.dataFN,'wb')
+            self.indexFile = open(self.indexFN,'wb')
+        else:
+            headerFile = open(self.headerFN,'r')
+            self.header = json.load(headerFile)
+            headerFile.close()
+            index = _ReadIndex(self.indexFN,self.dataFN)
+            if mode == 'a':
+                # Drop any data or index bytes past the last complete entry
+                dataLength = 0
+                if len(index):
+                    last = index[-1]
+                    dataLength = last['offset'] + last['cdBytes'] + last['blBytes']
+                self.dataFile = open(self.dataFN,'r+b')
+                self.dataFile.truncate(dataLength)
+                self.dataFile.seek(0,2)
+                self.indexFile = open(self.indexFN,'r+b')
+                self.indexFile.truncate(len(index) * INDEX_DTYPE.itemsize)
+                self.indexFile.seek(0,2)
+        # Later entries for a patch replace earlier ones
+        self.entries = {}
+        for record in index:
+            self.entries[int(record['patchID'])] = record
+        self.dataMap = None
+        self.mapLock = threading.Lock()
+        self.info = dict(self.header)
+
+    def __contains__(self,patchID):
+        return int(patchID) in self.entries
+
+    def PatchIDs(self):
+        '''Returns a sorted list of the patch IDs in the stack'''
+        return sorted(self.entries.keys())
+
+    def Write(self,patchID,costDist,backLink,row0,col0):
+        '''Adds a patch's cost distance (inf = unreached) and back link windows.
+        row0, col0 locate the window's upper left cell in the full extent.'''
+        stored = _EncodeCosts(costDist,backLink,self.header['encoding'],self.header['scale'])
+        cdData = zlib.compress(np.ascontiguousarray(stored),1)
+        blData = zlib.compress(_PackBackLinks(backLink),1)
+        record = np.zeros(1,INDEX_DTYPE)
+        record['patchID'] = patchID
+        record['offset'] = self.dataFile.tell()
+        record['cdBytes'] = len(cdData)
+        record['blBytes'] = len(blData)
+        record['row0'] = row0
+        record['col0'] = col0
+        record['nRows'], record['nCols'] = costDist.shape
+        # Write the data before the index record that points to it
+        self.dataFile.write(cdData)
+        self.dataFile.write(blData)
+        self.dataFile.flush()
+        record.tofile(self.indexFile)
+        self.indexFile.flush()
+        self.entries[int(patchID)] = record[0]
+        # Any open map of the data file no longer covers all of it
+        if self.dataMap is not None:
+            self.dataMap.close()
+            self.dataMap = None
+
+    def Flush(self):
+        '''Forces written entries to disk'''
+        if self.mode != 'r':
+            os.fsync(self.dataFile.fileno())
+            os.fsync(self.indexFile.fileno())
+
+    def Read(self,patchID):
+        '''Returns (costDist, backLink, (row0, col0)) for a patch. costDist is
+        float32 with inf where not reached; backLink uint8 with 255 where not
+        reached, as returned by GeoHATcostdist.CostDistance. Entries may be
+        read from several threads at once.'''
+        record = self.entries[int(patchID)]
+        self.mapLock.acquire()
+        try:
+            if self.dataMap is None:
+                dataFile = open(self.dataFN,'rb')
+                self.dataMap = mmap.mmap(dataFile.fileno(),0,access=mmap.ACCESS_READ)
+                dataFile.close()
+            dataMap = self.dataMap
+        finally:
+            self.mapLock.release()
+        shape = (int(record['nRows']), int(record['nCols']))
+        start = int(record['offset'])
+        middle = start + int(record['cdBytes'])
+        end = middle + int(record['blBytes'])
+        if self.header['encoding'] == 'uint16':
+            dtype = np.uint16
+        else:
+            dtype = np.float32
+        stored = np.frombuffer(zlib.decompress(dataMap[start:middle]),dtype).reshape(shape)
+        costDist = _DecodeCosts(stored,self.header['encoding'],self.header['scale'])
+        packed = np.frombuffer(zlib.decompress(dataMap[middle:end]),np.uint8)
+        backLink = _UnpackBackLinks(packed,costDist.size).reshape(shape)
+        backLink[stored == 0] = 0
+        backLink[~np.isfinite(costDist)] = 255
+        return costDist, backLink, (int(record['row0']), int(record['col0']))
+
+    def Close(self):
+        if self.dataMap is not None:
+            self.dataMap.close()
+            self.dataMap = None
+        if self.mode != 'r':
+            self.Flush()
+            self.dataFile.close()
+            self.indexFile.close()
+
+def _ReadIndex(indexFN,dataFN):
+    '''Reads the complete index records whose data lies within the data file'''
+    indexFile = open(indexFN,'rb')
+    nRecords = os.path.getsize(indexFN) // INDEX_DTYPE.itemsize
+    index = np.fromfile(indexFile,INDEX_DTYPE,nRecords)
+    indexFile.close()
+    dataLength = os.path.getsize(dataFN)
+    valid = index['offset'] + index['cdBytes'] + index['blBytes'] <= dataLength
+    if not valid.all():
+        index = index[:np.argmin(valid)]
+    return index
+
+def _SpatialReferenceString(spatialReference):
+    '''Returns a spatial reference as a string that can be stored in the header'''
+    if spatialReference is None:
+        return ""
+    if hasattr(spatialReference,'exportToString'):
+        return spatialReference.exportToString()
+    return str(spatialReference)
+
+def OpenStack(folder,mode='r',info=None,maxDist=None):
+    '''Opens the cost distance stack stored in a folder'''
+    return CostDistanceStack(os.path.join(folder,STACK_NAME),mode,info,maxDist)
+
+def ReadRasters(stack,patchID):
+    '''Returns a patch's cost distance and back link windows as arcpy Raster
+    objects, for use with tools such as sa.CostPath'''
+    import GeoHATutils
+    costDist, backLink, (row0, col0) = stack.Read(patchID)
+    costDist = np.where(np.isfinite(costDist), costDist, -1).astype(np.float32)
+    cdRaster = GeoHATutils.ArrayToRaster(costDist,stack.info,'',-1,row0,col0)
+    blRaster = GeoHATutils.ArrayToRaster(backLink,stack.info,'',255,row0,col0)
+    return cdRaster, blRaster
@@ -1,7 +1,9 @@
 #GeoHATutils.py
 #
 # Utilities for Geospatial Habiat Assessment Tools. These include a
-#  reporting function (msg) and a function for renaming fields.
+#  reporting function (msg), a function for renaming fields, functions
+#  for moving rasters in and out of NumPy arrays, whole or in tiles, and a
+#  function for writing columns of values to a table in one step.
 #
 # June 2012
 # John Fay
@@ -38,4 +40,138 @@ def RenameField(inputFC,inFldName,outFldName,outFldAlias=''):
     arcpy.CalculateField_management(inputFC, outFldName, "!%s!" %inFldName,"PYTHON")
     # Delete the old field
     arcpy.DeleteField_management(inputFC,inFldName)
-    return 
\ No newline at end of file
+    return 
+
+def RasterInfo(inRaster):
+    '''Returns a dictionary describing a raster's georeference (xmin, ymax,
+    cellSize, nRows, nCols and spatialReference)'''
+    import arcpy
+    desc = arcpy.Describe(inRaster)
+    info = {'xmin':desc.extent.XMin,
+            'ymax':desc.extent.YMax,
+            'cellSize':desc.meanCellWidth,
+            'nRows':desc.height,
+            'nCols':desc.width,
+            'spatialReference':desc.spatialReference}
+    return info
+
+def RasterToArray(inRaster,nodata=0,info=None):
+    '''Reads a raster into a NumPy array. Returns the array and a dictionary
+    describing its georeference (xmin, ymax, cellSize, nRows, nCols and
+    spatialReference). If info is supplied, the raster is read over that
+    extent instead of its own, so rasters can be aligned to a template.'''
+    import arcpy
+    if info is None:
+        info = RasterInfo(inRaster)
+    lowerLeft = arcpy.Point(info['xmin'], info['ymax'] - info['nRows'] * info['cellSize'])
+    arr = arcpy.RasterToNumPyArray(inRaster,lowerLeft,info['nCols'],info['nRows'],nodata)
+    return arr, info
+
+def CostRasterToArray(inRaster,info=None):
+    '''Reads a cost raster into a float32 array in which NoData cells, and
+    cells outside the raster's extent, are -1 (the NoData marker used by
+    GeoHATcostdist). NoData cells are found from the raster's own NoData
+    value rather than by reading them as -1, which would wrap to a large,
+    crossable cost in unsigned integer rasters.'''
+    import arcpy, numpy as np
+    raster = arcpy.Raster(inRaster)
+    noData = raster.noDataValue
+    arr, info = RasterToArray(inRaster,0 if noData is None else noData,info)
+    if noData is None:
+        noDataMask = np.zeros(arr.shape,bool)
+    else:
+        noDataMask = arr == noData
+    arr = arr.astype(np.float32)
+    noDataMask |= np.isnan(arr)
+    # Cells of the output extent whose centers are outside the raster's extent
+    cellSize = info['cellSize']
+    x = info['xmin'] + (np.arange(info['nCols']) + 0.5) * cellSize
+    y = info['ymax'] - (np.arange(info['nRows']) + 0.5) * cellSize
+    extent = raster.extent
+    noDataMask[(y < extent.YMin) | (y > extent.YMax),:] = True
+    noDataMask[:,(x < extent.XMin) | (x > extent.XMax)] = True
+    arr[noDataMask] = -1
+    return arr, info
+
+def ArrayToRaster(arr,info,outRaster='',nodata=None,row0=0,col0=0):
+    '''Converts a NumPy array to a raster using the georeference in info.
+    row0 and col0 locate the array's upper left cell in the info extent,
+    which allows windows of a larger array to be written in place. The
+    raster is saved if an output name is supplied.'''
+    import arcpy
+    cellSize = info['cellSize']
+    lowerLeft = arcpy.Point(info['xmin'] + col0 * cellSize,
+                            info['ymax'] - (row0 + arr.shape[0]) * cellSize)
+    if nodata is None:
+        outRas = arcpy.NumPyArrayToRaster(arr,lowerLeft,cellSize,cellSize)
+    else:
+        outRas = arcpy.NumPyArrayToRaster(arr,lowerLeft,cellSize,cellSize,nodata)
+    if outRaster:
+        outRas.save(outRaster)
+        spatialRef = info['spatialReference']
+        if isinstance(spatialRef,basestring) and spatialRef:   # e.g., from a GeoHATstack header
+            wkt = spatialRef
+            spatialRef = arcpy.SpatialReference()
+            spatialRef.loadFromString(wkt)
+        if spatialRef:
+            arcpy.DefineProjection_management(outRaster,spatialRef)
+    return outRas
+
+def RasterTiles(inRaster,tileSize=4096,halo=0,nodata=0,info=None):
+    '''Generator that reads a raster in square tiles so rasters too large for
+    memory can be processed piece by piece. Yields (tile, row0, col0) where
+    row0, col0 locate the tile's core in the raster. Each tile is padded
+    with a halo of neighboring cells on every side (nodata beyond the edge
+    of the raster), so tile[halo:-halo,halo:-halo] is the core when halo > 0.'''
+    import arcpy, numpy as np
+    if info is None:
+        info = RasterInfo(inRaster)
+    cellSize = info['cellSize']
+    nRows = info['nRows']
+    nCols = info['nCols']
+    for row0 in range(0,nRows,tileSize):
+        for col0 in range(0,nCols,tileSize):
+            coreRows = min(tileSize,nRows - row0)
+            coreCols = min(tileSize,nCols - col0)
+            # Read the part of the haloed tile that lies within the raster
+            r0 = max(row0 - halo,0)
+            c0 = max(col0 - halo,0)
+            r1 = min(row0 + coreRows + halo,nRows)
+            c1 = min(col0 + coreCols + halo,nCols)
+            lowerLeft = arcpy.Point(info['xmin'] + c0 * cellSize, info['ymax'] - r1 * cellSize)
+            arr = arcpy.RasterToNumPyArray(inRaster,lowerLeft,c1 - c0,r1 - r0,nodata)
+            tile = np.empty((coreRows + 2 * halo, coreCols + 2 * halo),arr.dtype)
+            tile.fill(nodata)
+            tile[r0 - row0 + halo:r1 - row0 + halo, c0 - col0 + halo:c1 - col0 + halo] = arr
+            yield tile, row0, col0
+
+def WriteTable(outTable,fields,columns,csvNames=None):
+    '''Writes columns of values (arrays or lists, one per field) to a table in
+    one step. fields is a list of (name, format) pairs, e.g. ("PatchID","%d").
+    CSV files (*.csv, *.txt) are written directly, with csvNames, if given,
+    as the header; other tables (e.g., dbf or geodatabase tables) are
+    written with arcpy.da.NumPyArrayToTable.'''
+    import numpy as np
+    names = [name for name, fmt in fields]
+    if outTable[-4:].lower() in (".csv",".txt"):
+        outFile = open(outTable,'w')
+        outFile.write(",".join(csvNames or names) + "\n")
+        rowFormat = ",".join([fmt for name, fmt in fields]) + "\n"
+        rows = zip(*[list(column) for column in columns])
+        outFile.write("".join([rowFormat %tuple(row) for row in rows]))
+        outFile.close()
+        return outTable
+    import arcpy
+    dtypes = []
+    for (name, fmt), column in zip(fields, columns):
+        if fmt.endswith("d"):
+            dtypes.append((str(name),'<i4'))
+        else:
+            dtypes.append((str(name),'<f8'))
+    table = np.zeros(len(columns[0]) if columns else 0,dtypes)
+    for name, column in zip(names, columns):
+        table[name] = column
+    if arcpy.Exists(outTable):
+        arcpy.Delete_management(outTable)
+    arcpy.da.NumPyArrayToTable(table,outTable)
+    return outTable
@@ -0,0 +1,535 @@
+#---------------------------------------------------------------------------------
+# GeoHATvector.py
+#
+# Description: A streaming writer for polyline features (e.g., least cost
+#  paths or edge lines). Geometries and attributes are buffered in memory and written in
+#  large batches, with no geoprocessing call per feature. The output format is
+#  chosen from the output name:
+#   *.shp  - a shapefile, written directly
+#   *.gpkg - a GeoPackage, written with sqlite3 (the table takes the file's name)
+#   other  - a geodatabase feature class (or other arcpy output), written with
+#            an insert cursor
+#
+#  Features are always appended, so when a ledgered run (see GeoHATledger.py)
+#  is resumed, the writer can cut the output back to the features written
+#  before the first feature whose ID is not in the ledger. Callers should
+#  record patches in the ledger only after Flush, e.g. at the first patch
+#  boundary where Ready() is True, so that batches stay large.
+#
+#  Straight two point lines (e.g., edges drawn between patch centroids) can
+#  be added in bulk from coordinate and attribute arrays with AddLines;
+#  shapefile and GeoPackage records for them are built with NumPy rather
+#  than one feature at a time.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import os, struct, datetime, sqlite3
+import numpy as np
+
+LCP_FIELDS = [("FromID","LONG"),("ToID","LONG"),("Cost","DOUBLE")]
+EDGE_FIELDS = LCP_FIELDS
+
+def OpenFeatureWriter(outName,fields,spatialReference=None,ledger=None,idField=None,batchSize=5000):
+    '''Opens a writer for polyline features with the given (name, type)
+    fields, where type is "LONG" or "DOUBLE". If a ledger with completed
+    patches is given and the output exists, the output is reopened and cut
+    back to the features before the first one whose idField value is not in
+    the ledger (and writer.resumed is True); otherwise a new output is
+    created.'''
+    resume = ledger is not None and bool(ledger.completed)
+    ext = os.path.splitext(outName)[1].lower()
+    folder = os.path.dirname(outName).lower()
+    if ext == ".shp" and not (".gdb" in folder or ".mdb" in folder):
+        writerClass = ShapefileWriter
+    elif ext == ".gpkg":
+        writerClass = GeoPackageWriter
+    else:
+        writerClass = FeatureClassWriter
+    writer = writerClass(outName,fields,spatialReference,batchSize)
+    writer.resumed = resume and writer.Exists()
+    if writer.resumed:
+        writer.Reopen(idField,ledger)
+    else:
+        writer.Create()
+    return writer
+
+def _WKT(spatialReference):
+    '''Returns the well known text of an arcpy spatial reference (or a string)'''
+    if spatialReference is None:
+        return ""
+    if hasattr(spatialReference,'exportToString'):
+        return spatialReference.exportToString().split(";")[0]
+    return str(spatialReference).split(";")[0]
+
+class _BufferedWriter(object):
+    '''Buffers features until a batch is full; subclasses write the batches'''
+    def __init__(self,outName,fields,spatialReference=None,batchSize=5000):
+        self.outName = outName
+        self.fields = fields
+        self.spatialReference = spatialReference
+        self.batchSize = batchSize
+        self.maxVertices = batchSize * 200   # Bounds the memory held by the buffer
+        self.count = 0                      # Features written to the output
+        self.buffer = []
+        self.bufferVertices = 0
+        self.partial = False                # Whether a batch was written since the last Flush
+
+    def Add(self,xCoords,yCoords,values):
+        '''Adds a polyline with vertices xCoords, yCoords and attribute values
+        (in field order). The buffer is written when it is full.'''
+        xy = np.column_stack((np.asarray(xCoords,np.float64),np.asarray(yCoords,np.float64)))
+        self.buffer.append((xy,tuple(values)))
+        self.bufferVertices += len(xy)
+        if self.Full():
+            self._Write()
+            self.partial = True
+
+    def AddLines(self,x0,y0,x1,y1,columns):
+        '''Adds straight lines from x0, y0 to x1, y1 (arrays) with attribute
+        value arrays (columns, in field order), writing them in batches'''
+        self._Write()
+        x0, y0, x1, y1 = [np.asarray(v,np.float64) for v in (x0,y0,x1,y1)]
+        for start in range(0,len(x0),self.batchSize):
+            end = start + self.batchSize
+            self._WriteLines(x0[start:end],y0[start:end],x1[start:end],y1[start:end],
+                             [np.asarray(column)[start:end] for column in columns])
+            self.count += len(x0[start:end])
+            self.partial = True
+
+    def _WriteLines(self,x0,y0,x1,y1,columns):
+        '''Writes a batch of lines as polyline features; subclasses may write
+        them in bulk'''
+        features = []
+        xy = np.column_stack((x0,y0,x1,y1)).reshape(-1,2,2)
+        columns = [column.tolist() for column in columns]
+        for i in range(len(xy)):
+            features.append((xy[i],tuple([column[i] for column in columns])))
+        self._WriteBatch(features)
+
+    def Full(self):
+        return len(self.buffer) >= self.batchSize or self.bufferVertices >= self.maxVertices
+
+    def Ready(self):
+        '''Returns True if the buffer is full or part of it has already been
+        written; at a patch boundary, the caller should then Flush and
+        record the patches added since the last Flush as complete.'''
+        return self.partial or self.Full()
+
+    def Pending(self):
+        '''Returns the number of features not yet written'''
+        return len(self.buffer)
+
+    def Count(self):
+        '''Returns the number of features written to the output'''
+        return self.count
+
+    def Flush(self):
+        '''Writes the buffered features to the output and forces them to disk'''
+        self._Write()
+        self._Sync()
+        self.partial = False
+
+    def _Write(self):
+        if self.buffer:
+            self._WriteBatch(self.buffer)
+            self.count += len(self.buffer)
+        self.buffer = []
+        self.bufferVertices = 0
+
+    def Close(self):
+        self.Flush()
+        self._Close()
+
+    def _Sync(self):
+        pass
+
+    def _Close(self):
+        pass
+
+    def _KeepCount(self,ids,ledger):
+        '''Returns the number of leading features whose IDs are in the ledger'''
+        for i in range(len(ids)):
+            if not ledger.IsComplete(ids[i]):
+                return i
+        return len(ids)
+
+##--SHAPEFILE--
+# Record header and content of a one part, two point polyline, and its index entry
+SHP_LINE_DTYPE = np.dtype([('number','>i4'),('length','>i4'),('shapeType','<i4'),('box','<f8',(4,)),
+                           ('nParts','<i4'),('nPoints','<i4'),('part','<i4'),('points','<f8',(4,))])
+SHX_DTYPE = np.dtype([('offset','>i4'),('length','>i4')])
+
+def _DBFRecord(dbfFields,values):
+    '''Formats one dbf record; numbers too wide for their field lose decimals'''
+    record = [" "]
+    for (name, fieldType, width, decimals), value in zip(dbfFields, values):
+        if decimals:
+            text = "%*.*f" %(width,decimals,value)
+            if len(text) > width:
+                text = "%*.*f" %(width,max(0,decimals - (len(text) - width)),value)
+        else:
+            text = "%*d" %(width,value)
+        record.append(text[-width:])
+    return "".join(record).encode('ascii')
+
+class ShapefileWriter(_BufferedWriter):
+    '''Writes polylines to a shapefile (.shp, .shx and .dbf, plus .prj)'''
+    def _Names(self):
+        base = os.path.splitext(self.outName)[0]
+        return base + ".shp", base + ".shx", base + ".dbf", base + ".prj"
+
+    def Exists(self):
+        shpFN, shxFN, dbfFN, prjFN = self._Names()
+        return os.path.exists(shpFN) and os.path.exists(shxFN) and os.path.exists(dbfFN)
+
+    def _DBFFields(self):
+        '''Returns the dbf (name, type, width, decimals) of each field'''
+        dbfFields = []
+        for name, fieldType in self.fields:
+            if fieldType == "LONG":
+                dbfFields.append((name[:10],"N",10,0))
+            else:
+                dbfFields.append((name[:10],"N",19,11))
+        return dbfFields
+
+    def Create(self):
+        shpFN, shxFN, dbfFN, prjFN = self._Names()
+        self.bbox = [np.inf, np.inf, -np.inf, -np.inf]
+        self.shpFile = open(shpFN,'w+b')
+        self.shxFile = open(shxFN,'w+b')
+        self.dbfFile = open(dbfFN,'w+b')
+        self.shpFile.write(b"\0" * 100)
+        self.shxFile.write(b"\0" * 100)
+        # Write the dbf header and field descriptors
+        dbfFields = self._DBFFields()
+        self.headerLength = 32 + 32 * len(dbfFields) + 1
+        self.recordLength = 1
+        for name, fieldType, width, decimals in dbfFields:
+            self.recordLength += width
+        self.dbfFile.write(b"\0" * 32)
+        for name, fieldType, width, decimals in dbfFields:
+            self.dbfFile.write(struct.pack("<11sc4xBB14x",name.encode('ascii'),fieldType.encode('ascii'),width,decimals))
+        self.dbfFile.write(b"\r")
+        self._WriteHeaders()
+        wkt = _WKT(self.spatialReference)
+        if wkt:
+            prjFile = open(prjFN,'w')
+            prjFile.write(wkt)
+            prjFile.close()
+
+    def Reopen(self,idField,ledger):
+        shpFN, shxFN, dbfFN, prjFN = self._Names()
+        self.shpFile = open(shpFN,'r+b')
+        self.shxFile = open(shxFN,'r+b')
+        self.dbfFile = open(dbfFN,'r+b')
+        self.shpFile.seek(36)
+        self.bbox = list(struct.unpack("<4d",self.shpFile.read(32)))
+        self.dbfFile.seek(4)
+        nRecords, self.headerLength, self.recordLength = struct.unpack("<IHH",self.dbfFile.read(8))
+        # Only records present in all three files are complete
+        nRecords = min(nRecords,
+                       (os.path.getsize(dbfFN) - self.headerLength) // self.recordLength,
+                       (os.path.getsize(shxFN) - 100) // 8)
+        # Read the ID field of each record and find the first uncommitted one
+        offset = 1
+        for name, fieldType, width, decimals in self._DBFFields():
+            if name == idField[:10]:
+                break
+            offset += width
+        self.dbfFile.seek(self.headerLength)
+        records = self.dbfFile.read(nRecords * self.recordLength)
+        ids = []
+        for i in range(nRecords):
+            start = i * self.recordLength + offset
+            ids.append(int(records[start:start + width].strip() or 0))
+        self.count = self._KeepCount(ids,ledger)
+        if self.count == 0:
+            self.bbox = [np.inf, np.inf, -np.inf, -np.inf]
+        # Cut the files back to the kept records
+        shpLength = 100
+        if self.count:
+            self.shxFile.seek(100 + 8 * (self.count - 1))
+            lastOffset, lastLength = struct.unpack(">ii",self.shxFile.read(8))
+            shpLength = (lastOffset + 4 + lastLength) * 2
+        self.shpFile.truncate(shpLength)
+        self.shxFile.truncate(100 + 8 * self.count)
+        self.dbfFile.truncate(self.headerLength + self.count * self.recordLength)
+        self.shpFile.seek(0,2)
+        self.shxFile.seek(0,2)
+        self.dbfFile.seek(0,2)
+        self._WriteHeaders()
+
+    def _WriteBatch(self,features):
+        shpParts = []
+        shxParts = []
+        dbfParts = []
+        offset = self.shpFile.tell() // 2
+        recordNumber = self.count
+        dbfFields = self._DBFFields()
+        for xy, values in features:
+            recordNumber += 1
+            xmin, ymin = xy.min(0)
+            xmax, ymax = xy.max(0)
+            self.bbox = [min(self.bbox[0],xmin), min(self.bbox[1],ymin),
+                         max(self.bbox[2],xmax), max(self.bbox[3],ymax)]
+            # Polyline record: type, bounding box, one part, and its points
+            content = struct.pack("<i4dii",3,xmin,ymin,xmax,ymax,1,len(xy)) + struct.pack("<i",0) + \
+                      bytes(np.ascontiguousarray(xy,'<f8').data)
+            contentLength = len(content) // 2
+            shpParts.append(struct.pack(">ii",recordNumber,contentLength))
+            shpParts.append(content)
+            shxParts.append(struct.pack(">ii",offset,contentLength))
+            offset += 4 + contentLength
+            dbfParts.append(_DBFRecord(dbfFields,values))
+        self.shpFile.write(b"".join(shpParts))
+        self.shxFile.write(b"".join(shxParts))
+        self.dbfFile.write(b"".join(dbfParts))
+
+    def _WriteLines(self,x0,y0,x1,y1,columns):
+        n = len(x0)
+        xmin, xmax = np.minimum(x0,x1), np.maximum(x0,x1)
+        ymin, ymax = np.minimum(y0,y1), np.maximum(y0,y1)
+        if n:
+            self.bbox = [min(self.bbox[0],xmin.min()), min(self.bbox[1],ymin.min()),
+                         max(self.bbox[2],xmax.max()), max(self.bbox[3],ymax.max())]
+        # Every record is a one part, two point polyline of the same length
+        records = np.zeros(n,SHP_LINE_DTYPE)
+        records['number'] = np.arange(self.count + 1,self.count + n + 1)
+        records['length'] = (SHP_LINE_DTYPE.itemsize - 8) // 2
+        records['shapeType'] = 3
+        records['box'] = np.column_stack((xmin,ymin,xmax,ymax))
+        records['nParts'] = 1
+        records['nPoints'] = 2
+        records['points'] = np.column_stack((x0,y0,x1,y1))
+        index = np.zeros(n,SHX_DTYPE)
+        index['offset'] = self.shpFile.tell() // 2 + np.arange(n) * (SHP_LINE_DTYPE.itemsize // 2)
+        index['length'] = records['length']
+        # Format the attributes with one format string per record
+        dbfFields = self._DBFFields()
+        formats = [" "]
+        for name, fieldType, width, decimals in dbfFields:
+            if decimals:
+                formats.append("%%%d.%df" %(width,decimals))
+            else:
+                formats.append("%%%dd" %width)
+        recordFormat = "".join(formats)
+        dbfParts = []
+        for values in zip(*[column.tolist() for column in columns]):
+            record = recordFormat %values
+            if len(record) != self.recordLength:
+                record = _DBFRecord(dbfFields,values).decode('ascii')
+            dbfParts.append(record)
+        self.shpFile.write(bytes(records.data))
+        self.shxFile.write(bytes(index.data))
+        self.dbfFile.write("".join(dbfParts).encode('ascii'))
+
+    def _WriteHeaders(self):
+        '''Updates the file headers to describe the records written so far'''
+        bbox = self.bbox
+        if not np.isfinite(bbox[0]):
+            bbox = [0.0, 0.0, 0.0, 0.0]
+        for shapeFile in (self.shpFile, self.shxFile):
+            position = shapeFile.tell()
+            shapeFile.seek(0,2)
+            fileLength = shapeFile.tell() // 2
+            shapeFile.seek(0)
+            shapeFile.write(struct.pack(">6ii",9994,0,0,0,0,0,fileLength))
+            shapeFile.write(struct.pack("<ii4d4d",1000,3,bbox[0],bbox[1],bbox[2],bbox[3],0,0,0,0))
+            shapeFile.seek(position)
+        position = self.dbfFile.tell()
+        today = datetime.date.today()
+        self.dbfFile.seek(0)
+        self.dbfFile.write(struct.pack("<BBBBIHH",3,today.year - 1900,today.month,today.day,
+                                       self.count,self.headerLength,self.recordLength))
+        self.dbfFile.seek(position)
+
+    def _Sync(self):
+        self._WriteHeaders()
+        for outFile in (self.shpFile, self.shxFile, self.dbfFile):
+            outFile.flush()
+            os.fsync(outFile.fileno())
+
+    def _Close(self):
+        self.dbfFile.write(b"\x1a")
+        for outFile in (self.shpFile, self.shxFile, self.dbfFile):
+            outFile.close()
+
+##--GEOPACKAGE--
+# GeoPackage geometry blob of a two point LineString
+GPKG_LINE_DTYPE = np.dtype([('magic','S2'),('version','u1'),('flags','u1'),('srsID','<i4'),
+                            ('envelope','<f8',(4,)),('byteOrder','u1'),('geometryType','<u4'),
+                            ('nPoints','<u4'),('points','<f8',(4,))])
+
+class GeoPackageWriter(_BufferedWriter):
+    '''Writes polylines (as LINESTRINGs) to a table in a GeoPackage'''
+    def __init__(self,outName,fields,spatialReference=None,batchSize=5000):
+        _BufferedWriter.__init__(self,outName,fields,spatialReference,batchSize)
+        self.tableName = os.path.splitext(os.path.basename(outName))[0]
+        self.srsID = -1
+        if spatialReference is not None and getattr(spatialReference,'factoryCode',0):
+            self.srsID = int(spatialReference.factoryCode)
+
+    def Exists(self):
+        if not os.path.exists(self.outName):
+            return False
+        connection = sqlite3.connect(self.outName)
+        found = connection.execute("SELECT count(*) FROM sqlite_master WHERE type='table' AND name=?",
+                                   (self.tableName,)).fetchone()[0]
+        connection.close()
+        return found > 0
+
+    def Create(self):
+        self.bbox = [np.inf, np.inf, -np.inf, -np.inf]
+        if os.path.exists(self.outName):
+            os.remove(self.outName)
+        self.connection = sqlite3.connect(self.outName)
+        db = self.connection
+        db.execute("PRAGMA application_id = 1196444487")
+        db.execute("PRAGMA user_version = 10200")
+        db.execute("CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, "
+                   "organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, "
+                   "definition TEXT NOT NULL, description TEXT)")
+        db.execute("INSERT INTO gpkg_spatial_ref_sys VALUES ('Undefined cartesian SRS',-1,'NONE',-1,'undefined',NULL)")
+        db.execute("INSERT INTO gpkg_spatial_ref_sys VALUES ('Undefined geographic SRS',0,'NONE',0,'undefined',NULL)")
+        if self.srsID > 0:
+            name = getattr(self.spatialReference,'name','') or "EPSG:%d" %self.srsID
+            db.execute("INSERT INTO gpkg_spatial_ref_sys VALUES (?,?,'EPSG',?,?,NULL)",
+                       (name,self.srsID,self.srsID,_WKT(self.spatialReference) or 'undefined'))
+        db.execute("CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, "
+                   "identifier TEXT UNIQUE, description TEXT DEFAULT '', "
+                   "last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+                   "min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER)")
+        db.execute("CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, "
+                   "geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, "
+                   "m TINYINT NOT NULL, CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name))")
+        columns = ["fid INTEGER PRIMARY KEY", "geom LINESTRING"]
+        for name, fieldType in self.fields:
+            if fieldType == "LONG":
+                columns.append('"%s" INTEGER' %name)
+            else:
+                columns.append('"%s" DOUBLE' %name)
+        db.execute('CREATE TABLE "%s" (%s)' %(self.tableName,", ".join(columns)))
+        db.execute("INSERT INTO gpkg_contents (table_name,data_type,identifier,srs_id) VALUES (?,'features',?,?)",
+                   (self.tableName,self.tableName,self.srsID))
+        db.execute("INSERT INTO gpkg_geometry_columns VALUES (?,'geom','LINESTRING',?,0,0)",
+                   (self.tableName,self.srsID))
+        db.commit()
+
+    def Reopen(self,idField,ledger):
+        self.connection = sqlite3.connect(self.outName)
+        self.bbox = list(self.connection.execute("SELECT min_x, min_y, max_x, max_y FROM gpkg_contents "
+                                                 "WHERE table_name=?",(self.tableName,)).fetchone())
+        if self.bbox[0] is None:
+            self.bbox = [np.inf, np.inf, -np.inf, -np.inf]
+        rows = self.connection.execute('SELECT fid, "%s" FROM "%s" ORDER BY fid' %(idField,self.tableName)).fetchall()
+        ids = []
+        for fid, value in rows:
+            ids.append(value)
+        self.count = self._KeepCount(ids,ledger)
+        if self.count < len(rows):
+            self.connection.execute('DELETE FROM "%s" WHERE fid >= ?' %self.tableName,(rows[self.count][0],))
+            self.connection.commit()
+
+    def _WriteBatch(self,features):
+        rows = []
+        for xy, values in features:
+            xmin, ymin = xy.min(0)
+            xmax, ymax = xy.max(0)
+            # GeoPackage binary header (with an xy envelope) and a WKB LineString
+            self.bbox = [min(self.bbox[0],xmin), min(self.bbox[1],ymin),
+                         max(self.bbox[2],xmax), max(self.bbox[3],ymax)]
+            blob = struct.pack("<2sBBi4d",b"GP",0,3,self.srsID,xmin,xmax,ymin,ymax) + \
+                   struct.pack("<BII",1,2,len(xy)) + bytes(np.ascontiguousarray(xy,'<f8').data)
+            rows.append((sqlite3.Binary(blob),) + values)
+        marks = ",".join(["?"] * (len(self.fields) + 1))
+        names = ",".join(['"%s"' %name for name, fieldType in self.fields])
+        self.connection.executemany('INSERT INTO "%s" (geom,%s) VALUES (%s)' %(self.tableName,names,marks),rows)
+
+    def _WriteLines(self,x0,y0,x1,y1,columns):
+        n = len(x0)
+        xmin, xmax = np.minimum(x0,x1), np.maximum(x0,x1)
+        ymin, ymax = np.minimum(y0,y1), np.maximum(y0,y1)
+        if n:
+            self.bbox = [min(self.bbox[0],xmin.min()), min(self.bbox[1],ymin.min()),
+                         max(self.bbox[2],xmax.max()), max(self.bbox[3],ymax.max())]
+        # Build every geometry blob (GeoPackage header and WKB LineString) at once
+        blobs = np.zeros(n,GPKG_LINE_DTYPE)
+        blobs['magic'] = b"GP"
+        blobs['flags'] = 3
+        blobs['srsID'] = self.srsID
+        blobs['envelope'] = np.column_stack((xmin,xmax,ymin,ymax))
+        blobs['byteOrder'] = 1
+        blobs['geometryType'] = 2
+        blobs['nPoints'] = 2
+        blobs['points'] = np.column_stack((x0,y0,x1,y1))
+        data = bytes(blobs.data)
+        size = GPKG_LINE_DTYPE.itemsize
+        rows = []
+        for i, values in enumerate(zip(*[column.tolist() for column in columns])):
+            rows.append((sqlite3.Binary(data[i * size:(i + 1) * size]),) + values)
+        marks = ",".join(["?"] * (len(self.fields) + 1))
+        names = ",".join(['"%s"' %name for name, fieldType in self.fields])
+        self.connection.executemany('INSERT INTO "%s" (geom,%s) VALUES (%s)' %(self.tableName,names,marks),rows)
+
+    def _Sync(self):
+        if np.isfinite(self.bbox[0]):
+            self.connection.execute("UPDATE gpkg_contents SET min_x=?, min_y=?, max_x=?, max_y=?, "
+                                    "last_change=strftime('%Y-%m-%dT%H:%M:%fZ','now') WHERE table_name=?",
+                                    tuple(self.bbox) + (self.tableName,))
+        self.connection.commit()
+
+    def _Close(self):
+        self.connection.close()
+
+##--FEATURE CLASS--
+class FeatureClassWriter(_BufferedWriter):
+    '''Writes polylines to a feature class with an arcpy insert cursor'''
+    def Exists(self):
+        import arcpy
+        return arcpy.Exists(self.outName)
+
+    def Create(self):
+        import arcpy
+        if arcpy.Exists(self.outName):
+            arcpy.Delete_management(self.outName)
+        arcpy.CreateFeatureclass_management(os.path.dirname(self.outName),os.path.basename(self.outName),
+                                            "POLYLINE","#","#","#",self.spatialReference)
+        for name, fieldType in self.fields:
+            if fieldType == "LONG":
+                arcpy.AddField_management(self.outName,name,"LONG",10)
+            else:
+                arcpy.AddField_management(self.outName,name,"DOUBLE",10,2)
+
+    def Reopen(self,idField,ledger):
+        import GeoHATledger
+        GeoHATledger.DiscardUncommittedFeatures(self.outName,idField,ledger)
+        import arcpy
+        self.count = int(arcpy.GetCount_management(self.outName).getOutput(0))
+
+    def _WriteBatch(self,features):
+        import arcpy
+        names = []
+        for name, fieldType in self.fields:
+            names.append(name)
+        if hasattr(arcpy,'da'):
+            cur = arcpy.da.InsertCursor(self.outName,["SHAPE@"] + names)
+            for xy, values in features:
+                cur.insertRow((_Polyline(xy),) + values)
+            del cur
+        else:
+            cur = arcpy.InsertCursor(self.outName)
+            for xy, values in features:
+                feat = cur.newRow()
+                feat.shape = _Polyline(xy)
+                for name, value in zip(names, values):
+                    feat.setValue(name,value)
+                cur.insertRow(feat)
+            del cur
+
+def _Polyline(xy):
+    import arcpy
+    lineArray = arcpy.Array()
+    for x, y in xy.tolist():
+        lineArray.add(arcpy.Point(x, y))
+    return arcpy.Polyline(lineArray)
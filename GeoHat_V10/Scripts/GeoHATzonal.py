@@ -0,0 +1,323 @@
+#---------------------------------------------------------------------------------
+# GeoHATzonal.py
+#
+# Description: NumPy routines for summarizing values over zone (patch) arrays.
+#  These stand in for ZonalStatisticsAsTable when the zone and value rasters
+#  have already been read into memory with GeoHATutils.RasterToArray.
+#
+#  ZonePixelIndex precomputes, once, the cells of every zone (grouped by zone)
+#  and each zone's bounding rows and columns. The minimum of a value window
+#  within each zone is then a gather of the zones' cells followed by one
+#  np.minimum.reduceat, with no sorting or raster tool calls per window.
+#
+#  ZoneAdjacency finds the pairs of zones that touch by comparing the array
+#  with copies of itself shifted one cell. Each pair is packed into an int64
+#  key (from zone in the high 32 bits) so pairs can be counted with a sort.
+#
+#  PatchGeometry computes the area, core area, perimeter based shape index
+#  and mean distance to edge of every zone in one pass of bincounts over the
+#  zone array and its distance transform (GeoHATdistance.py).
+#
+#  EdgeEfficiency summarizes a patch to zone edge list (e.g., patches to
+#  protected areas) for every patch at once: the edges within a threshold
+#  are selected with a mask, each target zone's cell count is looked up in
+#  its raster's value/count table with searchsorted, and the per patch
+#  counts and sums are taken with bincount.
+#
+#  ZoneCrosstab counts the cells of every combination of zone and class
+#  (e.g., patch and zipcode) in one pass over the two arrays, as packed pair
+#  keys, so a sparse zone by class count matrix is built without a zonal
+#  statistics pass per measure. CrosstabSummary derives each zone's cell
+#  count, class richness, Shannon evenness and cell weighted mean of a class
+#  attribute from it.
+#
+# October 2026
+#---------------------------------------------------------------------------------
+
+import numpy as np
+
+def ZoneIndex(zoneArr,nodata=0):
+    '''Groups the cells of a zone array by zone value. Returns the sorted zone
+    IDs, the offsets of each zone's cells in the cell index (zone i occupies
+    cells[offsets[i]:offsets[i+1]]), and the flat indices of all zone cells,
+    grouped by zone.'''
+    flat = zoneArr.ravel()
+    cells = np.flatnonzero(flat != nodata)
+    zones = flat[cells]
+    order = np.argsort(zones,kind='mergesort')
+    cells = cells[order]
+    zones = zones[order]
+    if len(zones) == 0:
+        return zones, np.zeros(1,np.int64), cells
+    starts = np.flatnonzero(np.concatenate(([True], zones[1:] != zones[:-1])))
+    ids = zones[starts]
+    offsets = np.append(starts,len(cells))
+    return ids, offsets, cells
+
+def ZonalMinimum(zoneArr,valueArr,nodata=0):
+    '''Returns the zone IDs and the minimum value found in each zone. Cells
+    with NoData zones or non-finite values are ignored, so zones without any
+    finite values are omitted from the result.'''
+    zones = zoneArr.ravel()
+    values = valueArr.ravel()
+    mask = (zones != nodata) & np.isfinite(values)
+    zones = zones[mask]
+    values = values[mask]
+    if len(zones) == 0:
+        return zones, values
+    order = np.argsort(zones,kind='mergesort')
+    zones = zones[order]
+    values = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], zones[1:] != zones[:-1])))
+    return zones[starts], np.minimum.reduceat(values,starts)
+
+class ZonePixelIndex(object):
+    '''A precomputed index of the cells in each zone of a zone array, used to
+    summarize many value windows (e.g., the cost distance windows in a
+    GeoHATstack) over the same zones.'''
+    def __init__(self,zoneArr,nodata=0):
+        self.shape = zoneArr.shape
+        self.ids, self.offsets, self.cells = ZoneIndex(zoneArr,nodata)
+        nCols = zoneArr.shape[1]
+        self.rows = (self.cells // nCols).astype(np.int32)
+        self.cols = (self.cells % nCols).astype(np.int32)
+        # Bounding rows and columns of each zone
+        if len(self.ids):
+            starts = self.offsets[:-1]
+            self.rowMin = np.minimum.reduceat(self.rows,starts)
+            self.rowMax = np.maximum.reduceat(self.rows,starts)
+            self.colMin = np.minimum.reduceat(self.cols,starts)
+            self.colMax = np.maximum.reduceat(self.cols,starts)
+        else:
+            self.rowMin = self.rowMax = self.colMin = self.colMax = np.zeros(0,np.int32)
+
+    def WindowMinimum(self,valueArr,row0=0,col0=0,minID=None):
+        '''Returns the zone IDs and minimum values of a value window whose upper
+        left cell is at row0, col0 of the zone array. Non-finite values are
+        ignored and zones without a finite value in the window are omitted.
+        If minID is given, only zones with IDs greater than minID are summarized.'''
+        nRows, nCols = valueArr.shape
+        first = 0
+        if minID is not None:
+            first = np.searchsorted(self.ids,minID,'right')
+        # Select the zones whose bounds overlap the window
+        sel = first + np.flatnonzero((self.rowMax[first:] >= row0) & (self.rowMin[first:] < row0 + nRows) &
+                                     (self.colMax[first:] >= col0) & (self.colMin[first:] < col0 + nCols))
+        if len(sel) == 0:
+            return self.ids[:0], np.zeros(0,valueArr.dtype)
+        # Gather the selected zones' cells into one run per zone
+        starts = self.offsets[sel]
+        lengths = self.offsets[sel + 1] - starts
+        runStarts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        gather = np.arange(lengths.sum()) + np.repeat(starts - runStarts,lengths)
+        rows = self.rows[gather] - row0
+        cols = self.cols[gather] - col0
+        # Look up the value of each cell inside the window (inf outside it)
+        inside = (rows >= 0) & (rows < nRows) & (cols >= 0) & (cols < nCols)
+        values = np.empty(len(gather),np.float64)
+        values.fill(np.inf)
+        values[inside] = valueArr[rows[inside],cols[inside]]
+        values[~np.isfinite(values)] = np.inf
+        mins = np.minimum.reduceat(values,runStarts)
+        keep = np.isfinite(mins)
+        return self.ids[sel[keep]], mins[keep].astype(valueArr.dtype)
+
+def PackPairs(fromIDs,toIDs):
+    '''Packs pairs of (non-negative, 32 bit) IDs into int64 keys'''
+    return (np.asarray(fromIDs).astype(np.int64) << 32) | np.asarray(toIDs).astype(np.int64)
+
+def UnpackPairs(keys):
+    '''Reverses PackPairs, returning the from and to ID arrays'''
+    return keys >> 32, keys & 0xFFFFFFFF
+
+def SumByKey(keys,values):
+    '''Returns the unique keys (sorted) and the sum of the values for each'''
+    if len(keys) == 0:
+        return keys, values
+    order = np.argsort(keys,kind='mergesort')
+    keys = keys[order]
+    values = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(values,starts)
+
+def ZoneAdjacency(zoneArr,connectivity=4,nodata=0,halo=0):
+    '''Finds the pairs of different zones whose cells are neighbors. With
+    connectivity 8, cells that touch only at a corner are also neighbors.
+    Returns packed pair keys (see PackPairs; from zone < to zone) and the
+    number of cell edges each pair shares (0 for pairs that touch only at
+    corners).
+
+    If the array is a tile with a halo of cells around its core (see
+    GeoHATutils.RasterTiles), halo should be at least 1; only neighbor pairs
+    whose first cell (in row major order) is in the core are counted, so each
+    pair of cells is counted once across all the tiles of a raster.'''
+    if halo == 0:
+        padded = np.empty((zoneArr.shape[0] + 2, zoneArr.shape[1] + 2),zoneArr.dtype)
+        padded.fill(nodata)
+        padded[1:-1,1:-1] = zoneArr
+        zoneArr = padded
+        halo = 1
+    nRows = zoneArr.shape[0] - 2 * halo
+    nCols = zoneArr.shape[1] - 2 * halo
+    first = zoneArr[halo:halo + nRows, halo:halo + nCols]
+    # Neighbor offsets (E, S, then SE, SW) and the cell edges each shares
+    shifts = [(0,1,1),(1,0,1)]
+    if connectivity == 8:
+        shifts = shifts + [(1,1,0),(1,-1,0)]
+    keyList = []
+    edgeList = []
+    for dr, dc, edges in shifts:
+        second = zoneArr[halo + dr:halo + dr + nRows, halo + dc:halo + dc + nCols]
+        pair = (first != second) & (first != nodata) & (second != nodata)
+        a = first[pair]
+        b = second[pair]
+        keyList.append(PackPairs(np.minimum(a,b),np.maximum(a,b)))
+        edgeList.append(np.repeat(edges,len(a)).astype(np.int64))
+    return SumByKey(np.concatenate(keyList),np.concatenate(edgeList))
+
+def ZonalArgMinimum(zoneArr,valueArr,nodata=0):
+    '''Like ZonalMinimum, but also returns the flat index of the cell holding
+    each zone's minimum (the first in row major order where there are ties).'''
+    zones = zoneArr.ravel()
+    values = valueArr.ravel()
+    cells = np.flatnonzero((zones != nodata) & np.isfinite(values))
+    zones = zones[cells]
+    values = values[cells]
+    if len(zones) == 0:
+        return zones, values, cells
+    order = np.lexsort((cells,values,zones))
+    zones = zones[order]
+    starts = np.flatnonzero(np.concatenate(([True], zones[1:] != zones[:-1])))
+    first = order[starts]
+    return zones[starts], values[first], cells[first]
+
+def ZonePerimeters(zoneArr,nodata=0):
+    '''Returns, for each zone value up to the array's maximum, the number of
+    cell edges on the zone's boundary: edges shared with another zone, with
+    nodata, or lying on the edge of the array.'''
+    size = int(zoneArr.max()) + 1 if zoneArr.size else 1
+    edges = np.zeros(size)
+    # Edges between horizontally and vertically adjacent cells that differ
+    for a, b in ((zoneArr[:,:-1], zoneArr[:,1:]), (zoneArr[:-1,:], zoneArr[1:,:])):
+        differ = a != b
+        for side in (a, b):
+            values = side[differ & (side != nodata)]
+            edges += np.bincount(values.astype(np.int64),minlength=size)
+    # Edges on the border of the array
+    for side in (zoneArr[0,:], zoneArr[-1,:], zoneArr[:,0], zoneArr[:,-1]):
+        values = side[side != nodata]
+        edges += np.bincount(values.astype(np.int64),minlength=size)
+    return edges
+
+def PatchGeometry(zoneArr,cellSize,edgeWidth,nodata=0):
+    '''Computes geometry attributes of every zone (patch) in a zone array.
+    Distances to edge are measured from each cell center to the nearest
+    nodata cell center, as sa.EucDistance of the non-habitat cells does, and
+    core cells are those more than edgeWidth from an edge. Returns the zone
+    IDs, a dictionary of attribute arrays (PatchArea and CoreArea in
+    hectares, CAratio, ShapeIdx = 4 * sqrt(area) / perimeter, and
+    DistToEdge, the mean distance to edge) and the distance array.'''
+    import GeoHATdistance
+    dist = GeoHATdistance.EuclideanDistance(zoneArr == nodata,cellSize,dtype=np.float32)
+    zones = zoneArr.ravel().astype(np.int64)
+    size = int(zones.max()) + 1 if zones.size else 1
+    cells = np.bincount(zones,minlength=size).astype(np.float64)
+    distSums = np.bincount(zones,dist.ravel().astype(np.float64),size)
+    coreCells = np.bincount(zones,(dist.ravel() > float(edgeWidth)).astype(np.float64),size)
+    edges = ZonePerimeters(zoneArr,nodata)
+    if 0 <= nodata < size:
+        cells[nodata] = 0
+    ids = np.flatnonzero(cells)
+    cellArea = float(cellSize) ** 2
+    area = cells[ids] * cellArea
+    attributes = {'PatchArea':area / 10000.0,
+                  'CoreArea':coreCells[ids] * cellArea / 10000.0,
+                  'CAratio':coreCells[ids] / cells[ids],
+                  'ShapeIdx':4.0 * np.sqrt(area) / (edges[ids] * cellSize),
+                  'DistToEdge':distSums[ids] / cells[ids]}
+    return ids.astype(zoneArr.dtype), attributes, dist
+
+def RasterAttribute(inRaster,field,nullValue=-1):
+    '''Returns the VALUE column and another field of an integer raster's
+    attribute table, sorted by value. Null attributes are set to nullValue.'''
+    import arcpy
+    table = arcpy.da.TableToNumPyArray(inRaster,["VALUE",field],null_value=nullValue)
+    order = np.argsort(table["VALUE"],kind='mergesort')
+    return table["VALUE"][order], table[field][order]
+
+def RasterValueCounts(inRaster):
+    '''Returns the VALUE and COUNT columns of an integer raster's attribute
+    table, sorted by value'''
+    return RasterAttribute(inRaster,"COUNT",0)
+
+def EdgeEfficiency(patchIDs,targetIDs,costs,values,counts,maxDistance,cellArea=1.0):
+    '''Summarizes the edges from patches to target zones with cost below
+    maxDistance. values and counts (sorted by value) give the number of
+    cells in each target zone, whose area is counts * cellArea; targets
+    missing from values have no area. Returns the IDs of the patches with at
+    least one such edge and, for each, the number of edges, the sum of the
+    target areas and the sum of the target areas discounted by distance,
+    exp(ln(0.1) * cost / maxDistance).'''
+    costs = np.asarray(costs,np.float64)
+    keep = costs < maxDistance
+    patchIDs = np.asarray(patchIDs)[keep]
+    targetIDs = np.asarray(targetIDs)[keep]
+    costs = costs[keep]
+    # Look up each target's cell count
+    values = np.asarray(values)
+    areas = np.zeros(len(targetIDs))
+    if len(values):
+        pos = np.minimum(np.searchsorted(values,targetIDs),len(values) - 1)
+        found = values[pos] == targetIDs
+        areas[found] = np.asarray(counts,np.float64)[pos[found]] * cellArea
+    idwAreas = areas * np.exp(np.log(0.1) / maxDistance * costs)
+    ids, patches = np.unique(patchIDs,return_inverse=True)
+    nEdges = np.bincount(patches,minlength=len(ids))
+    return ids, nEdges, np.bincount(patches,areas,len(ids)), np.bincount(patches,idwAreas,len(ids))
+
+def ZoneCrosstab(zoneArr,classArr,nodata=0,classNodata=0,blockRows=1024):
+    '''Counts the cells of each combination of zone and class in two aligned
+    arrays, skipping nodata in either. Returns packed pair keys (zone in the
+    high bits; see PackPairs), sorted, and the number of cells of each.
+    The arrays are read a block of rows at a time.'''
+    keyList = [np.zeros(0,np.int64)]
+    countList = [np.zeros(0,np.int64)]
+    for row0 in range(0,zoneArr.shape[0],blockRows):
+        zones = zoneArr[row0:row0 + blockRows].ravel()
+        classes = classArr[row0:row0 + blockRows].ravel()
+        valid = (zones != nodata) & (classes != classNodata)
+        keys, counts = SumByKey(PackPairs(zones[valid],classes[valid]),np.ones(valid.sum(),np.int64))
+        keyList.append(keys)
+        countList.append(counts)
+    return SumByKey(np.concatenate(keyList),np.concatenate(countList))
+
+def CrosstabSummary(keys,counts,classValues=None,attributes=None):
+    '''Summarizes a zone by class crosstab (see ZoneCrosstab). Returns the
+    zone IDs and, for each zone, the number of cells, the number of classes
+    (richness), the Shannon evenness of the classes' cell counts (H / ln(S),
+    0 for zones with one class) and, if classValues and attributes are given
+    (sorted by class value), the cell weighted mean of the class attribute.
+    Classes missing from classValues or with a negative attribute are left
+    out of the mean; zones with none of them get 0.'''
+    zones, classes = UnpackPairs(np.asarray(keys,np.int64))
+    counts = np.asarray(counts,np.float64)
+    ids, inverse = np.unique(zones,return_inverse=True)
+    cells = np.bincount(inverse,counts,len(ids))
+    richness = np.bincount(inverse,minlength=len(ids))
+    share = counts / cells[inverse]
+    shannon = np.bincount(inverse,-share * np.log(share),len(ids))
+    evenness = np.where(richness > 1, shannon / np.log(np.maximum(richness,2)), 0.0)
+    meanAttribute = None
+    if classValues is not None:
+        classValues = np.asarray(classValues)
+        values = np.zeros(len(classes))
+        have = np.zeros(len(classes),bool)
+        if len(classValues):
+            pos = np.minimum(np.searchsorted(classValues,classes),len(classValues) - 1)
+            values = np.asarray(attributes,np.float64)[pos]
+            have = (classValues[pos] == classes) & (values >= 0)
+        weights = np.where(have,counts,0.0)
+        totals = np.bincount(inverse,weights,len(ids))
+        sums = np.bincount(inverse,weights * values,len(ids))
+        meanAttribute = sums / np.maximum(totals,1)
+    return ids, cells, richness, evenness, meanAttribute
@@ -7,13 +7,14 @@
 #
 # Requires: DU_GraphTools99.py script in same folder as this one
 #
-# Usage: SummarizeGraph.py <LCP edge list> <Min Threshold> <Max Threshold> <interval> <output>
+# Usage: SummarizeGraph.py <LCP edge list (CSV or .edg)> <Min Threshold> <Max Threshold> <interval> <output>
 #
 #-------------------------------------------------------------------------------------------
 
 import sys, os, arcgisscripting
 import networkx as nx
 import DU_GraphTools99 as gt
+import GeoHATedges
 gp = arcgisscripting.create()
 
 def msg(msgText): print msgText; gp.AddMessage(msgText); return
@@ -27,21 +28,7 @@ outFile = sys.argv[5]
 
 # Build graph from edgelist
 msg("Building graph from %s" %edgeFile)
-G = nx.Graph()
-edgeList = open(edgeFile, 'r')
-lineText = edgeList.readline()
-# Check whether the first line is a header line
-if (lineText.split(",")[0]).isalpha:
-    lineText = edgeList.readline()
-while lineText:
-    lineData = lineText.split(",")
-    u = int(lineData[0])
-    v = int(lineData[1])
-    w = float(lineData[2][:-1])
-    if w <= maxThresh:
-        G.add_edge(u,v,weight = w)
-    lineText = edgeList.readline()
-edgeList.close()
+G = GeoHATedges.OpenEdges(edgeFile).Graph(maxThresh)
 
 msg("Creating thresholded graphs")
 gts = gt.edge_threshold_sequence(G,minThresh,maxThresh,threshInt)
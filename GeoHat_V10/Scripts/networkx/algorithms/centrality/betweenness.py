@@ -18,7 +18,7 @@ __all__ = ['betweenness_centrality',
 
 def betweenness_centrality(G, k=None, normalized=True, weight=None, 
                            endpoints=False, 
-                           seed=None):
+                           seed=None, processes=None):
     r"""Compute the shortest-path betweenness centrality for nodes.
 
     Betweenness centrality of a node `v` is the sum of the
@@ -56,6 +56,10 @@ def betweenness_centrality(G, k=None, normalized=True, weight=None,
     endpoints : bool, optional  
       If True include the endpoints in the shortest path counts.
 
+    processes : int, optional (default=None)
+      If greater than 1, split the sources into chunks and search them
+      in that many worker processes.
+
     Returns
     -------
     nodes : dictionary
@@ -79,6 +83,13 @@ def betweenness_centrality(G, k=None, normalized=True, weight=None,
     Zero edge weights can produce an infinite number of equal length 
     paths between pairs of nodes.
 
+    With processes, the graph is sent to each worker process once, the
+    workers compute the contribution of each source in their chunks of
+    sources, and the contributions are added in source order, so the
+    result is identical to the serial one. NumPy is required. On Windows
+    the calling script must guard its main code with
+    ``if __name__ == '__main__':``.
+
     References
     ----------
     .. [1]  A Faster Algorithm for Betweenness Centrality.
@@ -100,17 +111,12 @@ def betweenness_centrality(G, k=None, normalized=True, weight=None,
     else:
         random.seed(seed)
         nodes = random.sample(G.nodes(), k)
-    for s in nodes:
-        # single source shortest paths
-        if weight is None:  # use BFS
-            S,P,sigma=_single_source_shortest_path_basic(G,s)
-        else:  # use Dijkstra's algorithm
-            S,P,sigma=_single_source_dijkstra_path_basic(G,s,weight)
-        # accumulation
-        if endpoints:
-            betweenness=_accumulate_endpoints(betweenness,S,P,sigma,s)
-        else:
-            betweenness=_accumulate_basic(betweenness,S,P,sigma,s)
+    if endpoints:
+        accumulate=_accumulate_endpoints
+    else:
+        accumulate=_accumulate_basic
+    betweenness=_betweenness_sources(G,nodes,weight,accumulate,
+                                     betweenness,processes)
     # rescaling
     betweenness=_rescale(betweenness, len(G),
                          normalized=normalized,
@@ -119,7 +125,8 @@ def betweenness_centrality(G, k=None, normalized=True, weight=None,
     return betweenness
 
 
-def edge_betweenness_centrality(G,normalized=True,weight=None):
+def edge_betweenness_centrality(G,normalized=True,weight=None,
+                                processes=None):
     r"""Compute betweenness centrality for edges.
 
     Betweenness centrality of an edge `e` is the sum of the
@@ -147,6 +154,10 @@ def edge_betweenness_centrality(G,normalized=True,weight=None):
       If None, all edge weights are considered equal.
       Otherwise holds the name of the edge attribute used as weight.
 
+    processes : int, optional (default=None)
+      If greater than 1, split the sources into chunks and search them
+      in that many worker processes (see betweenness_centrality).
+
     Returns
     -------
     edges : dictionary
@@ -178,14 +189,8 @@ def edge_betweenness_centrality(G,normalized=True,weight=None):
     betweenness=dict.fromkeys(G,0.0) # b[v]=0 for v in G
     # b[e]=0 for e in G.edges()
     betweenness.update(dict.fromkeys(G.edges(),0.0))
-    for s in G:
-        # single source shortest paths
-        if weight is None:  # use BFS
-            S,P,sigma=_single_source_shortest_path_basic(G,s)
-        else:  # use Dijkstra's algorithm
-            S,P,sigma=_single_source_dijkstra_path_basic(G,s,weight)
-        # accumulation
-        betweenness=_accumulate_edges(betweenness,S,P,sigma,s)
+    betweenness=_betweenness_sources(G,G,weight,_accumulate_edges,
+                                     betweenness,processes)
     # rescaling
     for n in G: # remove nodes to only return edges 
         del betweenness[n]
@@ -201,6 +206,69 @@ def edge_betweenness(G,normalized=True,weight=None):
 
 # helpers for betweenness centrality
 
+def _betweenness_sources(G,nodes,weight,accumulate,betweenness,
+                         processes=None):
+    # sum the betweenness from each source in nodes, in worker processes
+    # if processes > 1
+    nodes=list(nodes)
+    if processes is None or processes <= 1 or len(nodes) < 2:
+        for s in nodes:
+            # single source shortest paths
+            if weight is None:  # use BFS
+                S,P,sigma=_single_source_shortest_path_basic(G,s)
+            else:  # use Dijkstra's algorithm
+                S,P,sigma=_single_source_dijkstra_path_basic(G,s,weight)
+            # accumulation
+            betweenness=accumulate(betweenness,S,P,sigma,s)
+        return betweenness
+    import multiprocessing
+    import numpy as np
+    keys=list(betweenness)
+    # contiguous chunks of sources, small enough that a chunk's per source
+    # contributions (one float per key) stay around 32 MB
+    size=max(1,min(-(-len(nodes)//(4*processes)),4000000//max(1,len(keys))))
+    chunks=[nodes[i:i+size] for i in range(0,len(nodes),size)]
+    # the graph and keys go to each worker once, when it starts
+    pool=multiprocessing.Pool(processes,_pool_init,
+                              (G,weight,accumulate,keys))
+    try:
+        # each key gets at most one increment per source, so adding the
+        # sources' contributions in source order repeats the serial sums
+        # exactly
+        totals=np.array([betweenness[key] for key in keys],dtype=float)
+        for contributions in pool.imap(_pool_betweenness,chunks):
+            for row in contributions:
+                totals+=row
+    finally:
+        pool.close()
+        pool.join()
+    for key,value in zip(keys,totals.tolist()):
+        betweenness[key]=value
+    return betweenness
+
+_pool_state={}
+
+def _pool_init(G,weight,accumulate,keys):
+    _pool_state['G']=G
+    _pool_state['weight']=weight
+    _pool_state['accumulate']=accumulate
+    _pool_state['keys']=keys
+
+def _pool_betweenness(nodes):
+    # worker: the contribution of each source in a chunk to each key, one
+    # row per source
+    import numpy as np
+    keys=_pool_state['keys']
+    contributions=np.zeros((len(nodes),len(keys)))
+    for i,s in enumerate(nodes):
+        betweenness=dict.fromkeys(keys,0.0)
+        betweenness=_betweenness_sources(_pool_state['G'],[s],
+                                         _pool_state['weight'],
+                                         _pool_state['accumulate'],
+                                         betweenness)
+        contributions[i]=[betweenness[key] for key in keys]
+    return contributions
+
 def _single_source_shortest_path_basic(G,s):
     S=[]
     P={}
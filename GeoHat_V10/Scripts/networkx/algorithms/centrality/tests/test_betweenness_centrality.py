@@ -460,3 +460,63 @@ class TestWeightedEdgeBetweennessCentrality(object):
         for n in sorted(G.edges()):
             assert_almost_equal(b[n],b_answer[n]/norm)
 
+
+class TestParallelBetweennessCentrality(object):
+
+    def test_krackhardt_kite_graph(self):
+        """Betweenness centrality: Krackhardt kite graph, 2 processes"""
+        G=nx.krackhardt_kite_graph()
+        b=nx.betweenness_centrality(G, weight=None, normalized=False,
+                                    processes=2)
+        b_answer=nx.betweenness_centrality(G, weight=None, normalized=False)
+        for n in sorted(G):
+            assert_equal(b[n],b_answer[n])
+
+    def test_disconnected_path_endpoints(self):
+        """Betweenness centrality: disconnected path endpoints, 2 processes"""
+        G=nx.Graph()
+        G.add_path([0,1,2])
+        G.add_path([3,4,5,6])
+        b=nx.betweenness_centrality(G, weight=None, normalized=False,
+                                    endpoints=True, processes=2)
+        b_answer=nx.betweenness_centrality(G, weight=None, normalized=False,
+                                           endpoints=True)
+        for n in sorted(G):
+            assert_equal(b[n],b_answer[n])
+
+    def test_weighted_G(self):
+        """Weighted betweenness centrality: G, 3 processes"""
+        G=weighted_G()
+        b=nx.betweenness_centrality(G, weight='weight', normalized=True,
+                                    processes=3)
+        b_answer=nx.betweenness_centrality(G, weight='weight', normalized=True)
+        for n in sorted(G):
+            assert_equal(b[n],b_answer[n])
+
+    def test_edge_weighted_graph(self):
+        """Edge betweenness centrality: weighted graph, 2 processes"""
+        G=weighted_G()
+        b=nx.edge_betweenness_centrality(G, weight='weight', normalized=False,
+                                         processes=2)
+        b_answer=nx.edge_betweenness_centrality(G, weight='weight',
+                                                normalized=False)
+        assert_equal(sorted(b),sorted(b_answer))
+        for n in sorted(G.edges()):
+            assert_equal(b[n],b_answer[n])
+
+    def test_random_weighted_identical(self):
+        """Betweenness centrality: random weights, identical to serial"""
+        import random
+        rng=random.Random(7)
+        G=nx.gnm_random_graph(60,180,seed=7)
+        for u,v in G.edges():
+            G[u][v]['weight']=rng.random()
+        for processes in (2,3):
+            b=nx.betweenness_centrality(G, weight='weight',
+                                        processes=processes)
+            b_answer=nx.betweenness_centrality(G, weight='weight')
+            assert_equal(b,b_answer)
+            b=nx.edge_betweenness_centrality(G, weight='weight',
+                                             processes=processes)
+            b_answer=nx.edge_betweenness_centrality(G, weight='weight')
+            assert_equal(b,b_answer)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Tests of GeoHATcentrality against networkx: sampled centralities on each
+# component, and the shortest path sweep
+import os, sys, random
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import networkx as nx
+import GeoHATcentrality
+
+def _Graph(sizes,degree,seed):
+    '''Returns a graph with one random component per size, joined by a chain
+    so each is connected, with small integer weights so paths tie'''
+    rng = random.Random(seed)
+    G = nx.Graph()
+    start = 0
+    for n in sizes:
+        nodes = range(start,start + n)
+        for a, b in zip(nodes[:-1],nodes[1:]):
+            G.add_edge(a,b,weight=rng.randint(1,3))
+        for i in range(n * (degree - 2) // 2):
+            a, b = rng.sample(nodes,2)
+            G.add_edge(a,b,weight=rng.randint(1,3))
+        start += n
+    G.add_node(start)  # An isolated node
+    return G
+
+def _Exact(G):
+    '''Returns networkx betweenness, closeness and eccentricity, each
+    computed on the connected component subgraphs'''
+    b, c, x = {}, {}, {}
+    for subG in nx.connected_component_subgraphs(G):
+        b.update(nx.betweenness_centrality(subG,weight='weight'))
+        c.update(nx.closeness_centrality(subG,distance='weight'))
+        for v in subG:
+            x[v] = max(nx.single_source_dijkstra_path_length(subG,v).values())
+    return b, c, x
+
+def test_exact_components():
+    """Components no larger than exactSize match networkx exactly"""
+    G = _Graph([40,25,3,2],4,1)
+    b, c, x = _Exact(G)
+    results = GeoHATcentrality.SampledCentrality(G,0.05,0.95,'weight',exactSize=40,seed=2)
+    for v in G:
+        assert abs(results["betweenness"][v] - b[v]) < 1e-9
+        assert results["betweennessLo"][v] == results["betweennessHi"][v] == results["betweenness"][v]
+        assert abs(results["closeness"][v] - c[v]) < 1e-9
+        assert results["eccentricity"][v] == x[v]
+        harmonic = sum(1.0 / d for d in nx.single_source_dijkstra_path_length(G,v).values() if d > 0)
+        assert abs(results["harmonic"][v] - harmonic) < 1e-9
+
+def test_sampled_intervals():
+    """Sampled betweenness meets the error bound and its intervals cover most exact values"""
+    G = _Graph([300,30],5,3)
+    b, c, x = _Exact(G)
+    relError = 0.3
+    bS, bLo, bHi = GeoHATcentrality.SampledBetweenness(G,relError,0.95,'weight',exactSize=50,
+                                                        maxPivots=None,seed=4)
+    big = [v for v in G if v < 300]
+    estimate = np.array([bS[v] for v in big])
+    lo = np.array([bLo[v] for v in big])
+    hi = np.array([bHi[v] for v in big])
+    exact = np.array([b[v] for v in big])
+    # Sampling stopped on the bound, before every node was a pivot
+    assert (hi > lo).any()
+    assert (hi - estimate <= relError * estimate.max() + 1e-12).all()
+    assert np.abs(estimate - exact).max() <= relError * exact.max()
+    # The normal intervals are approximate: nodes whose dependencies come
+    #  from a few pivots are underestimated more often than 5% of the time
+    covered = ((exact >= lo) & (exact <= hi)).mean()
+    assert covered >= 0.8, covered
+    # The small component is still exact
+    for v in G:
+        if v >= 300:
+            assert abs(bS[v] - b[v]) < 1e-9
+            assert bLo[v] == bHi[v] == bS[v]
+
+def test_sampled_distances():
+    """Sampled eccentricity is a lower bound, and closeness and harmonic are close"""
+    G = _Graph([300],5,3)
+    b, c, x = _Exact(G)
+    results = GeoHATcentrality.SampledCentrality(G,0.3,0.95,'weight',exactSize=50,
+                                                 maxPivots=None,seed=4)
+    connected = range(300)  # Leaves out the isolated node
+    closeness = np.array([results["closeness"][v] for v in connected])
+    exactCloseness = np.array([c[v] for v in connected])
+    assert np.abs(closeness / exactCloseness - 1).max() < 0.1
+    for v in connected:
+        assert results["eccentricity"][v] <= x[v]
+        harmonic = sum(1.0 / d for d in nx.single_source_dijkstra_path_length(G,v).values() if d > 0)
+        assert abs(results["harmonic"][v] / harmonic - 1) < 0.1
+
+def test_wrapper():
+    """SampledBetweenness returns the sampled betweenness and its bounds"""
+    G = _Graph([60],4,5)
+    results = GeoHATcentrality.SampledCentrality(G,0.1,exactSize=10,seed=6)
+    b, lo, hi = GeoHATcentrality.SampledBetweenness(G,0.1,exactSize=10,seed=6)
+    assert b == results["betweenness"]
+    assert lo == results["betweennessLo"]
+    assert hi == results["betweennessHi"]
+
+def test_sweep_ties():
+    """ShortestPathSweep matches networkx on a weighted graph with tied paths"""
+    G = _Graph([60,12],4,7)
+    G.add_edge(0,1,weight=2)   # Two paths of length 2 from 0 to 2,
+    G.add_edge(1,2,weight=1)   #  via 1 or 3
+    G.add_edge(0,3,weight=1)
+    G.add_edge(3,2,weight=1)
+    sweep = GeoHATcentrality.ShortestPathSweep(G,'weight')
+    b = nx.betweenness_centrality(G,weight='weight')
+    c = nx.closeness_centrality(G,distance='weight')
+    for v in G:
+        assert abs(sweep["betweenness"][v] - b[v]) < 1e-9
+        assert abs(sweep["closeness"][v] - c[v]) < 1e-9
+        length = nx.single_source_dijkstra_path_length(G,v)
+        assert sweep["eccentricity"][v] == max(length.values())
+        harmonic = sum(1.0 / d for d in length.values() if d > 0)
+        assert abs(sweep["harmonic"][v] - harmonic) < 1e-9
+
+def test_x_eccentricity():
+    """DU_GraphTools99.x_eccentricity and x_diameter use the sweep's eccentricities"""
+    import DU_GraphTools99
+    G = _Graph([40],4,8)
+    G.remove_node(40)  # The isolated node
+    e = DU_GraphTools99.x_eccentricity(G,with_labels=True)
+    for v in G:
+        assert e[v] == max(nx.single_source_dijkstra_path_length(G,v).values())
+    assert DU_GraphTools99.x_eccentricity(G,v=5) == e[5]
+    assert DU_GraphTools99.x_diameter(G) == max(e.values())
+    G.add_node(99)
+    try:
+        DU_GraphTools99.x_eccentricity(G)
+    except nx.NetworkXError:
+        pass
+    else:
+        assert False, "a disconnected graph has no eccentricity"
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Tests of GeoHATcostdist.CostDistance against networkx's Dijkstra on the 8
+#  neighbor grid graph
+import os, sys, math
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import networkx as nx
+import GeoHATcostdist
+from GeoHATcostdist import BL_ROWS, BL_COLS, BL_NODATA
+
+def GridGraph(costArr,cellSize=1.0):
+    '''8 neighbor graph of the crossable cells, weighted like sa.CostDistance'''
+    nRows, nCols = costArr.shape
+    G = nx.Graph()
+    for r in range(nRows):
+        for c in range(nCols):
+            if not costArr[r,c] >= 0:
+                continue
+            G.add_node(r * nCols + c)
+            for dr, dc in ((0,1), (1,-1), (1,0), (1,1)):
+                rr = r + dr
+                cc = c + dc
+                if rr >= nRows or cc < 0 or cc >= nCols or not costArr[rr,cc] >= 0:
+                    continue
+                length = cellSize * (math.sqrt(2) if dr and dc else 1.0)
+                G.add_edge(r * nCols + c,rr * nCols + cc,
+                           weight=length * (float(costArr[r,c]) + float(costArr[rr,cc])) / 2.0)
+    return G
+
+def BruteForce(costArr,sources,cellSize=1.0):
+    G = GridGraph(costArr,cellSize)
+    G.add_node('s')
+    for cell in sources:
+        if costArr.flat[cell] >= 0:
+            G.add_edge('s',cell,weight=0.0)
+    dist = np.empty(costArr.size)
+    dist.fill(np.inf)
+    for cell, d in nx.single_source_dijkstra_path_length(G,'s').items():
+        if cell != 's':
+            dist[cell] = d
+    return dist.reshape(costArr.shape), G
+
+def RandomCosts(rng,shape,noData=0.1):
+    costArr = rng.uniform(0.5,5,shape).astype(np.float32)
+    costArr[rng.rand(*shape) < noData] = -1
+    costArr[rng.rand(*shape) < noData / 2] = np.nan
+    return costArr
+
+def CheckWindow(costArr,sources,cellSize,maxDist=None):
+    costDist, backLink, (row0, col0) = GeoHATcostdist.CostDistance(costArr,sources,cellSize,maxDist)
+    expected, G = BruteForce(costArr,sources,cellSize)
+    if maxDist is not None:
+        expected[expected > maxDist] = np.inf
+    full = np.empty(costArr.shape)
+    full.fill(np.inf)
+    full[row0:row0 + costDist.shape[0],col0:col0 + costDist.shape[1]] = costDist
+    assert np.allclose(full,expected,rtol=1e-5)
+    assert ((backLink == BL_NODATA) == np.isinf(costDist)).all()
+    # Each back link points to a neighbor the cell's cost was reached from
+    nCols = costArr.shape[1]
+    sourceSet = set(int(cell) for cell in sources)
+    for r, c in zip(*np.nonzero(backLink != BL_NODATA)):
+        bl = backLink[r,c]
+        cell = (r + row0) * nCols + c + col0
+        if bl == 0:
+            assert cell in sourceSet
+            continue
+        nbr = (r + row0 + BL_ROWS[bl]) * nCols + c + col0 + BL_COLS[bl]
+        weight = G[cell][nbr]['weight']
+        assert abs(full.flat[nbr] + weight - full.flat[cell]) <= 1e-4 * full.flat[cell]
+
+def test_against_dijkstra():
+    """Costs and back links agree with networkx on random grids"""
+    rng = np.random.RandomState(0)
+    for shape in [(12,15), (1,20), (20,1), (25,25)]:
+        costArr = RandomCosts(rng,shape)
+        sources = rng.randint(0,costArr.size,3)
+        CheckWindow(costArr,sources,2.0)
+
+def test_max_distance():
+    """Only cells within the cutoff are reached, in a cropped window"""
+    rng = np.random.RandomState(1)
+    costArr = RandomCosts(rng,(30,30),0.05)
+    for maxDist in [0.0, 3.0, 12.0]:
+        CheckWindow(costArr,[15 * 30 + 15],1.0,maxDist)
+
+def test_workspace_reuse():
+    """Runs on arrays of different sizes do not see each other's state"""
+    rng = np.random.RandomState(2)
+    big = RandomCosts(rng,(40,40))
+    small = RandomCosts(rng,(6,7))
+    first = GeoHATcostdist.CostDistance(small,[3])
+    GeoHATcostdist.CostDistance(big,[800],1.0,5.0)
+    second = GeoHATcostdist.CostDistance(small,[3])
+    assert np.array_equal(first[0],second[0]) and np.array_equal(first[1],second[1])
+    CheckWindow(big,[0, 1599],1.0)
+
+def test_no_sources():
+    """Sources on NoData cells reach nothing"""
+    costArr = np.ones((4,4),np.float32)
+    costArr[0,0] = -1
+    costDist, backLink, origin = GeoHATcostdist.CostDistance(costArr,[0])
+    assert costDist.shape == (0,0) and backLink.shape == (0,0)
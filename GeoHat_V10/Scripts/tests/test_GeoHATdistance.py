@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# Tests of GeoHATdistance.EuclideanDistance against brute force distances
+import os, sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATdistance
+
+def BruteForce(source,cellSize=1.0):
+    rows, cols = np.nonzero(source)
+    allRows, allCols = np.indices(source.shape)
+    dist = np.empty(source.shape)
+    dist.fill(np.inf)
+    for r, c in zip(rows,cols):
+        dist = np.minimum(dist,np.hypot(allRows - r,allCols - c))
+    return dist * cellSize
+
+def test_strips():
+    """Threaded strips match brute force for several strip sizes"""
+    rng = np.random.RandomState(0)
+    for shape, density in [((23,37),0.02), ((16,50),0.01), ((40,9),0.05), ((1,30),0.1)]:
+        source = rng.rand(*shape) < density
+        source[rng.randint(shape[0]),rng.randint(shape[1])] = True
+        expected = BruteForce(source,2.0)
+        for threads, stripSize in [(1,512), (3,512), (3,4), (2,1), (4,7)]:
+            dist = GeoHATdistance.EuclideanDistance(source,2.0,threads=threads,stripSize=stripSize)
+            assert np.allclose(dist,expected), (shape, threads, stripSize)
+
+def test_single_source_wide():
+    """A source far from most strips"""
+    source = np.zeros((200,2000),bool)
+    source[100,0] = True
+    dist = GeoHATdistance.EuclideanDistance(source)
+    assert dist[100,-1] == 1999
+    assert np.allclose(dist[0,-1],np.hypot(100,1999))
+
+def test_max_distance():
+    """Distances are clamped at maxDist, and empty sources are all far"""
+    source = np.zeros((10,10),bool)
+    source[0,0] = True
+    dist = GeoHATdistance.EuclideanDistance(source,maxDist=5,dtype=np.float32,threads=2,stripSize=3)
+    assert dist.dtype == np.float32
+    assert np.allclose(dist,np.minimum(BruteForce(source),5))
+    assert np.isinf(GeoHATdistance.EuclideanDistance(np.zeros((3,3),bool))).all()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# Round trip tests of GeoHATedges edge files and the CSV edge list reader
+import os, sys, shutil, tempfile
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATedges
+
+def RandomEdges(rng,nNodes,nEdges):
+    fromIDs = rng.randint(1,nNodes + 1,nEdges)
+    toIDs = rng.randint(1,nNodes + 1,nEdges)
+    keep = fromIDs != toIDs
+    fromIDs, toIDs = fromIDs[keep], toIDs[keep]
+    # One edge per unordered pair
+    pairs = {}
+    for a, b in zip(fromIDs,toIDs):
+        pairs.setdefault((min(a,b), max(a,b)),(a, b))
+    fromIDs = np.array([pair[0] for pair in pairs.values()])
+    toIDs = np.array([pair[1] for pair in pairs.values()])
+    costs = np.round(rng.uniform(0,1000,len(fromIDs)),3)
+    costs[::7] = costs[3]
+    return fromIDs, toIDs, costs
+
+def WriteCSV(fileName,fromIDs,toIDs,costs,header="FromID, ToID, Cost",extra=False):
+    csvFile = open(fileName,'w')
+    if header:
+        csvFile.write(header + "\n")
+    for a, b, c in zip(fromIDs,toIDs,costs):
+        if extra:
+            csvFile.write("%d, %d, %r, 1.5, 2.5\n" %(a,b,c))
+        else:
+            csvFile.write("%d,%d,%r\n" %(a,b,c))
+    csvFile.close()
+
+def CheckStore(store,fromIDs,toIDs,costs,costType):
+    order = np.argsort(costs,kind='mergesort')
+    readFrom, readTo, readCosts = store.Read()
+    assert np.array_equal(readFrom,fromIDs[order]) and np.array_equal(readTo,toIDs[order])
+    assert np.array_equal(readCosts,costs[order].astype(costType))
+    # Pair lookups in either order, and pairs that are not edges
+    table = dict(((a, b), c) for a, b, c in zip(fromIDs,toIDs,costs.astype(costType)))
+    queryFrom = np.concatenate((fromIDs,toIDs,[1, 2, 100000]))
+    queryTo = np.concatenate((toIDs,fromIDs,[1, 100000, 3]))
+    expected = [table.get((a, b),table.get((b, a),np.nan)) for a, b in zip(queryFrom,queryTo)]
+    assert np.allclose(store.Costs(queryFrom,queryTo),expected,rtol=0,atol=0,equal_nan=True)
+    for a, b in list(table)[:20]:
+        assert store.Cost(b,a) == table[(a, b)]
+    assert store.Cost(1,100000) is None
+    # Thresholds
+    for maxCost in [None, -1, 0, costs[3], 500, 1e9]:
+        expectedCount = len(costs) if maxCost is None else int((costs.astype(costType).astype(np.float64) <= maxCost).sum())
+        assert store.Count(maxCost) == expectedCount
+        assert len(store.Read(maxCost)[2]) == expectedCount
+
+def test_edge_file():
+    """Edge files round trip their header, columns and pair lookups"""
+    folder = tempfile.mkdtemp()
+    try:
+        rng = np.random.RandomState(0)
+        fromIDs, toIDs, costs = RandomEdges(rng,300,2000)
+        edgeFN = os.path.join(folder,"edges.edg")
+        GeoHATedges.WriteEdges(edgeFN,fromIDs,toIDs,costs)
+        assert GeoHATedges.IsEdgeFile(edgeFN)
+        header = open(edgeFN,'rb').read(GeoHATedges.HEADER.size)
+        tag, count, bits = GeoHATedges.HEADER.unpack(header)
+        assert tag == GeoHATedges.FORMAT_TAG and count == len(costs)
+        assert 1 << bits >= 2 * count
+        assert os.path.getsize(edgeFN) == GeoHATedges.HEADER.size + 12 * count + 4 * (1 << bits)
+        store = GeoHATedges.OpenEdges(edgeFN)
+        assert isinstance(store.costs,np.memmap)
+        CheckStore(store,fromIDs,toIDs,costs,np.float32)
+        # An empty edge list
+        GeoHATedges.WriteEdges(edgeFN,[],[],[])
+        assert len(GeoHATedges.OpenEdges(edgeFN)) == 0
+    finally:
+        shutil.rmtree(folder)
+
+def test_read_csv():
+    """Blocked CSV reading matches loadtxt for any block size, with or without a header"""
+    folder = tempfile.mkdtemp()
+    try:
+        rng = np.random.RandomState(1)
+        fromIDs, toIDs, costs = RandomEdges(rng,50,300)
+        csvFN = os.path.join(folder,"edges.csv")
+        for header, extra in [("FromID, ToID, Cost",False), ("FromID, ToID, Distance, FromX, FromY, ToX, ToY",True),
+                              (None,False), (None,True)]:
+            WriteCSV(csvFN,fromIDs,toIDs,costs,header,extra)
+            for blockSize in [1, 7, 64, 1 << 24]:
+                readFrom, readTo, readCosts = GeoHATedges.ReadCSV(csvFN,blockSize)
+                assert np.array_equal(readFrom,fromIDs) and np.array_equal(readTo,toIDs), (header, blockSize)
+                assert np.array_equal(readCosts,costs)
+        # Windows line ends and no final line end
+        open(csvFN,'wb').write(b"FromID,ToID,Cost\r\n1,2,3.5\r\n4,5,6.25")
+        for blockSize in [3, 100]:
+            readFrom, readTo, readCosts = GeoHATedges.ReadCSV(csvFN,blockSize)
+            assert list(readFrom) == [1, 4] and list(readTo) == [2, 5] and list(readCosts) == [3.5, 6.25]
+        open(csvFN,'w').write("FromID,ToID,Cost\n")
+        assert len(GeoHATedges.ReadCSV(csvFN)[0]) == 0
+    finally:
+        shutil.rmtree(folder)
+
+def test_csv_store():
+    """CSV stores keep float64 costs and edge files are opened in their place"""
+    folder = tempfile.mkdtemp()
+    try:
+        rng = np.random.RandomState(2)
+        fromIDs, toIDs, costs = RandomEdges(rng,100,500)
+        # A cost just above a threshold that rounds to it in float32
+        costs[0] = 100.000001
+        csvFN = os.path.join(folder,"edges.csv")
+        WriteCSV(csvFN,fromIDs,toIDs,costs)
+        store = GeoHATedges.OpenEdges(csvFN)
+        assert store.costs.dtype == np.float64
+        CheckStore(store,fromIDs,toIDs,costs,np.float64)
+        assert store.Count(100.0) == int((costs <= 100.0).sum())
+        GeoHATedges.ConvertCSV(csvFN)
+        edgeFN = GeoHATedges.EdgeFileName(csvFN)
+        store = GeoHATedges.OpenEdges(csvFN)
+        assert isinstance(store.costs,np.memmap)
+        CheckStore(store,fromIDs,toIDs,costs,np.float32)
+        # A CSV edited after its edge file was written is read instead
+        later = os.path.getmtime(edgeFN) + 10
+        os.utime(csvFN,(later,later))
+        assert GeoHATedges.OpenEdges(csvFN).costs.dtype == np.float64
+    finally:
+        shutil.rmtree(folder)
+
+def BruteProximity(fromIDs,toIDs,costs,rule):
+    '''Checks every patch as a witness for every edge'''
+    table = {}
+    for a, b, c in zip(fromIDs,toIDs,costs):
+        table[(a, b)] = table[(b, a)] = float(c)
+    nodes = set(fromIDs) | set(toIDs)
+    keep = []
+    for a, b, c in zip(fromIDs,toIDs,costs):
+        c = float(c)
+        witness = False
+        for w in nodes:
+            if (a, w) not in table or (w, b) not in table:
+                continue
+            c1 = table[(a, w)]
+            c2 = table[(w, b)]
+            if rule == "GABRIEL":
+                witness = witness or c1 * c1 + c2 * c2 < c * c
+            else:
+                witness = witness or max(c1,c2) < c
+        keep.append(not witness)
+    return np.array(keep)
+
+def test_proximity_edges():
+    """RNG and Gabriel edges match a check of every possible witness"""
+    rng = np.random.RandomState(3)
+    for nNodes, nEdges in [(30,200), (60,400), (12,66)]:
+        fromIDs, toIDs, costs = RandomEdges(rng,nNodes,nEdges)
+        costs = np.round(costs / 50.0)
+        store = GeoHATedges.BuildStore(fromIDs,toIDs,costs)
+        fromIDs, toIDs, costs = GeoHATedges.UniqueEdges(*store.Read())
+        for rule in ("RNG", "GABRIEL"):
+            for blockSize in (7, 200000):
+                keep = GeoHATedges.ProximityEdges(store,fromIDs,toIDs,costs,rule,blockSize)
+                assert np.array_equal(keep,BruteProximity(fromIDs,toIDs,costs,rule)), (nNodes, rule)
+
+def test_minimum_spanning_edges():
+    """The minimum spanning forest weighs the same as networkx's"""
+    import networkx as nx
+    rng = np.random.RandomState(4)
+    for nNodes, nEdges in [(40,120), (100,150), (10,45)]:
+        fromIDs, toIDs, costs = RandomEdges(rng,nNodes,nEdges)
+        fromIDs, toIDs, costs = GeoHATedges.UniqueEdges(*GeoHATedges.BuildStore(fromIDs,toIDs,costs).Read())
+        keep = GeoHATedges.MinimumSpanningEdges(fromIDs,toIDs,costs)
+        G = nx.Graph()
+        G.add_weighted_edges_from(zip(fromIDs.tolist(),toIDs.tolist(),costs.tolist()))
+        expected = sum(d['weight'] for u, v, d in nx.minimum_spanning_edges(G))
+        assert np.isclose(costs[keep].sum(),expected)
+        assert keep.sum() == G.number_of_nodes() - nx.number_connected_components(G)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# Tests of GeoHATpaths.TracePaths on cost distance back link windows
+import os, sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATcostdist, GeoHATpaths
+from GeoHATcostdist import BL_ROWS, BL_COLS, BL_NODATA
+
+def test_paths_end_at_sources():
+    """Every traced path follows the back links, one step at a time, to a source cell"""
+    rng = np.random.RandomState(0)
+    costArr = rng.uniform(1,5,(30,35)).astype(np.float32)
+    costArr[rng.rand(30,35) < 0.2] = -1
+    sources = rng.randint(0,costArr.size,4)
+    costDist, backLink, (row0, col0) = GeoHATcostdist.CostDistance(costArr,sources)
+    nCols = backLink.shape[1]
+    startCells = rng.permutation(backLink.size)
+    paths = GeoHATpaths.TracePaths(backLink,startCells)
+    assert len(paths) == len(startCells)
+    links = backLink.ravel()
+    for start, path in zip(startCells,paths):
+        if links[start] == BL_NODATA:
+            assert path is None
+            continue
+        assert path[0] == start
+        assert links[path[-1]] == 0
+        assert (links[path[:-1]] != 0).all()
+        # Each step moves to the neighbor the back link points to, downhill
+        rows, cols = path // nCols, path % nCols
+        bl = links[path[:-1]]
+        assert np.array_equal(np.diff(rows),np.take(BL_ROWS,bl))
+        assert np.array_equal(np.diff(cols),np.take(BL_COLS,bl))
+        assert (np.diff(costDist.ravel()[path]) < 0).all()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Tests of the GeoHATspatial grid searches against brute force
+import os, sys
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATspatial
+
+INFO = {'xmin':1000.0,'ymax':2000.0,'cellSize':10.0}
+
+def BruteBoundaryPairs(zoneArr,info,radius=None):
+    '''Gaps between every pair of zones from every pair of their cells'''
+    cellSize = info['cellSize']
+    rows, cols = np.nonzero(zoneArr)
+    zones = zoneArr[rows,cols]
+    pairs = {}
+    for a in range(len(zones)):
+        dx = np.maximum(np.abs(cols - cols[a]) * cellSize - cellSize, 0)
+        dy = np.maximum(np.abs(rows - rows[a]) * cellSize - cellSize, 0)
+        gap = np.hypot(dx,dy)
+        for b in np.flatnonzero(zones > zones[a]):
+            key = (zones[a], zones[b])
+            if radius is not None and gap[b] > radius:
+                continue
+            pairs[key] = min(pairs.get(key,np.inf),gap[b])
+    return pairs
+
+def RandomZones(rng,shape,nZones,density=0.3):
+    zoneArr = rng.randint(1,nZones + 1,shape).astype(np.int32)
+    zoneArr[rng.rand(*shape) > density] = 0
+    return zoneArr
+
+def test_radius_pairs():
+    """Grid pairs within a radius match the pairs of a full distance matrix"""
+    rng = np.random.RandomState(0)
+    x = rng.uniform(0,100,300)
+    y = rng.uniform(0,50,300)
+    dist = np.hypot(x[:,None] - x[None,:], y[:,None] - y[None,:])
+    for radius in [0.5, 7.0, 30.0, None]:
+        blocks = list(GeoHATspatial.RadiusPairs(x,y,radius,blockSize=70))
+        i = np.concatenate([b[0] for b in blocks])
+        j = np.concatenate([b[1] for b in blocks])
+        d = np.concatenate([b[2] for b in blocks])
+        expI, expJ = np.nonzero(np.triu(dist <= (np.inf if radius is None else radius),1))
+        assert np.array_equal(i,expI) and np.array_equal(j,expJ), radius
+        assert np.allclose(d,dist[expI,expJ])
+
+def test_nearest_pairs():
+    """k nearest pairs match an argsort of the full distance matrix"""
+    rng = np.random.RandomState(1)
+    n = 250
+    x = np.concatenate((rng.uniform(0,10,n - 10), rng.uniform(500,600,10)))
+    y = rng.uniform(0,10,n)
+    dist = np.hypot(x[:,None] - x[None,:], y[:,None] - y[None,:])
+    np.fill_diagonal(dist,np.inf)
+    for k, radius in [(1,None), (4,None), (6,2.0), (20,None)]:
+        i, j, d = GeoHATspatial.NearestPairs(x,y,k,radius)
+        nearest = np.argsort(dist,axis=1,kind='mergesort')[:,:k]
+        rows = np.repeat(np.arange(n),k)
+        cols = nearest.ravel()
+        if radius is not None:
+            keep = dist[rows,cols] <= radius
+            rows, cols = rows[keep], cols[keep]
+        expected = set(zip(np.minimum(rows,cols),np.maximum(rows,cols)))
+        assert set(zip(i,j)) == expected, (k, radius)
+        assert np.allclose(d,dist[i,j])
+
+def CheckBoundaryPairs(zoneArr,radius):
+    fromIDs, toIDs, gaps, fromX, fromY, toX, toY = \
+        GeoHATspatial.NearestBoundaryPairs(zoneArr,INFO,radius)
+    expected = BruteBoundaryPairs(zoneArr,INFO,radius)
+    assert sorted(expected) == list(zip(fromIDs,toIDs))
+    assert np.allclose(gaps,[expected[key] for key in zip(fromIDs,toIDs)])
+    # The closest points are the gap apart and lie on their own zones' cells
+    assert np.allclose(np.hypot(toX - fromX,toY - fromY),gaps)
+    cellSize = INFO['cellSize']
+    for ids, xs, ys in ((fromIDs,fromX,fromY), (toIDs,toX,toY)):
+        cols = np.clip(np.floor((xs - INFO['xmin']) / cellSize - 1e-9),0,zoneArr.shape[1] - 1).astype(int)
+        rows = np.clip(np.floor((INFO['ymax'] - ys) / cellSize - 1e-9),0,zoneArr.shape[0] - 1).astype(int)
+        for zone, row, col in zip(ids,rows,cols):
+            near = zoneArr[max(row - 1,0):row + 2,max(col - 1,0):col + 2]
+            assert (near == zone).any()
+
+def test_boundary_pairs_radius():
+    """Pairs within a radius match brute force over every pair of cells"""
+    rng = np.random.RandomState(2)
+    zoneArr = RandomZones(rng,(30,40),12,0.1)
+    for radius in [0.0, 25.0, 120.0]:
+        CheckBoundaryPairs(zoneArr,radius)
+
+def test_boundary_pairs_all():
+    """Without a radius the expanding search finds every pair of zones"""
+    rng = np.random.RandomState(3)
+    CheckBoundaryPairs(RandomZones(rng,(30,40),12,0.05),None)
+    # Clustered zones plus a far away one, so several rounds are needed
+    zoneArr = np.zeros((60,200),np.int32)
+    zoneArr[:10,:10] = RandomZones(rng,(10,10),5,0.5)
+    zoneArr[55:,195:] = 9
+    CheckBoundaryPairs(zoneArr,None)
+    # One zone, or none, has no pairs
+    zoneArr = np.zeros((5,5),np.int32)
+    assert len(GeoHATspatial.NearestBoundaryPairs(zoneArr,INFO)[0]) == 0
+    zoneArr[2,2] = 4
+    assert len(GeoHATspatial.NearestBoundaryPairs(zoneArr,INFO)[0]) == 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# Round trip tests of the GeoHATstack cost distance stack
+import os, sys, shutil, tempfile
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATstack, GeoHATcostdist
+
+INFO = {'xmin':100.0,'ymax':500.0,'cellSize':30.0,'nRows':40,'nCols':50}
+
+def Windows(maxDist=None):
+    '''Cost distance windows for a few patches of a random cost surface'''
+    rng = np.random.RandomState(0)
+    costArr = rng.uniform(1,4,(INFO['nRows'],INFO['nCols'])).astype(np.float32)
+    costArr[rng.rand(*costArr.shape) < 0.1] = -1
+    windows = {}
+    for patchID, cells in [(1,[0, 1, 50]), (2,[1020]), (7,[1999]), (9,[0])]:
+        windows[patchID] = GeoHATcostdist.CostDistance(costArr,cells,1.0,maxDist)
+    return windows
+
+def RoundTrip(maxDist):
+    folder = tempfile.mkdtemp()
+    try:
+        windows = Windows(maxDist)
+        stack = GeoHATstack.OpenStack(folder,'w',INFO,maxDist)
+        for patchID in sorted(windows):
+            costDist, backLink, (row0, col0) = windows[patchID]
+            stack.Write(patchID,costDist,backLink,row0,col0)
+        stack.Close()
+        stack = GeoHATstack.OpenStack(folder)
+        assert stack.PatchIDs() == sorted(windows)
+        assert stack.info['nCols'] == 50 and stack.info['cellSize'] == 30.0
+        for patchID in windows:
+            costDist, backLink, origin = windows[patchID]
+            readCost, readLink, readOrigin = stack.Read(patchID)
+            assert readOrigin == origin
+            assert readCost.dtype == np.float32 and readLink.dtype == np.uint8
+            assert np.array_equal(readLink,backLink)
+            assert np.array_equal(np.isinf(readCost),np.isinf(costDist))
+            reached = np.isfinite(costDist)
+            if maxDist:
+                # Quantized to within half a step of the uint16 scale
+                step = float(maxDist) / GeoHATstack.UINT16_MAX
+                assert np.abs(readCost[reached] - costDist[reached]).max() <= step * 0.5 + 1e-5
+            else:
+                assert np.array_equal(readCost[reached],costDist[reached])
+        stack.Close()
+    finally:
+        shutil.rmtree(folder)
+
+def test_float32():
+    """Float32 stacks return the written windows exactly"""
+    RoundTrip(None)
+
+def test_uint16():
+    """Stacks with a cost threshold quantize costs to uint16"""
+    RoundTrip(12.0)
+
+def test_pack_back_links():
+    """Back links survive 3 bit packing for lengths that are not a multiple of 8"""
+    rng = np.random.RandomState(1)
+    for n in [1, 7, 8, 9, 100]:
+        links = rng.randint(1,9,n).astype(np.uint8)
+        packed = GeoHATstack._PackBackLinks(links)
+        assert packed.size == 3 * ((n + 7) // 8)
+        assert np.array_equal(GeoHATstack._UnpackBackLinks(packed,n),links)
+
+def test_append_after_crash():
+    """Appending drops a partly written entry and keeps the complete ones"""
+    folder = tempfile.mkdtemp()
+    try:
+        windows = Windows()
+        stack = GeoHATstack.OpenStack(folder,'w',INFO)
+        costDist, backLink, (row0, col0) = windows[1]
+        stack.Write(1,costDist,backLink,row0,col0)
+        stack.Close()
+        # Data written without its index record, then half an index record
+        stackName = os.path.join(folder,GeoHATstack.STACK_NAME)
+        open(stackName + ".cds",'ab').write(b'x' * 100)
+        open(stackName + ".cdx",'ab').write(b'\0' * 10)
+        stack = GeoHATstack.OpenStack(folder,'a')
+        assert stack.PatchIDs() == [1]
+        costDist, backLink, (row0, col0) = windows[2]
+        stack.Write(2,costDist,backLink,row0,col0)
+        stack.Close()
+        stack = GeoHATstack.OpenStack(folder)
+        assert stack.PatchIDs() == [1, 2]
+        assert np.array_equal(stack.Read(2)[1],windows[2][1])
+        assert np.array_equal(stack.Read(1)[0],windows[1][0])
+        stack.Close()
+    finally:
+        shutil.rmtree(folder)
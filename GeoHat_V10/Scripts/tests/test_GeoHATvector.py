@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# Tests of GeoHATvector writers resuming from a GeoHATledger after a crash
+import os, sys, struct, sqlite3, shutil, tempfile
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATvector, GeoHATledger
+
+def PatchFeatures(patchID):
+    '''A few lines from a patch: multi vertex paths and straight edges'''
+    paths = []
+    for k in range(patchID % 3 + 1):
+        n = 2 + (patchID + k) % 4
+        paths.append((np.arange(n) * 10.0 + patchID, np.arange(n) * 5.0 - k, (patchID, 100 + k, patchID * 1.5 + k)))
+    toIDs = np.arange(200,200 + patchID % 4)
+    lines = (np.zeros(len(toIDs)) + patchID, np.ones(len(toIDs)), toIDs * 2.0, toIDs * 3.0,
+             [np.repeat(patchID,len(toIDs)), toIDs, toIDs / 7.0])
+    return paths, lines
+
+def WritePatches(outName,patchIDs,resume,crashAfter=None):
+    '''Writes the features of each patch, recording patches in the ledger at
+    patch boundaries after a Flush, as the edge and path scripts do. If
+    crashAfter is given, the run stops without closing after that patch,
+    with the later patches' features partly written.'''
+    ledger = GeoHATledger.CompletionLedger(outName,resume)
+    writer = GeoHATvector.OpenFeatureWriter(outName,GeoHATvector.LCP_FIELDS,None,ledger,"FromID",batchSize=4)
+    pending = []
+    for patchID in patchIDs:
+        if ledger.IsComplete(patchID):
+            continue
+        if writer.Ready():
+            writer.Flush()
+            ledger.Commit(pending)
+            pending = []
+        paths, (x0, y0, x1, y1, columns) = PatchFeatures(patchID)
+        for x, y, values in paths:
+            writer.Add(x,y,values)
+        writer.AddLines(x0,y0,x1,y1,columns)
+        pending.append(patchID)
+        if patchID == crashAfter:
+            # Flush the uncommitted features to disk, then stop without closing
+            writer.Flush()
+            ledger.Close()
+            return writer
+    writer.Close()
+    ledger.Commit(pending)
+    ledger.Close()
+    return writer
+
+def ExpectedIDs(patchIDs):
+    ids = []
+    for patchID in patchIDs:
+        paths, lines = PatchFeatures(patchID)
+        ids += [patchID] * (len(paths) + len(lines[0]))
+    return ids
+
+def ReadShapefile(outName):
+    '''Returns the FromID of each record, checking that the three files and
+    their headers agree'''
+    base = os.path.splitext(outName)[0]
+    shp = open(base + ".shp",'rb').read()
+    shx = open(base + ".shx",'rb').read()
+    dbf = open(base + ".dbf",'rb').read()
+    assert struct.unpack(">i",shp[24:28])[0] * 2 == len(shp)
+    assert struct.unpack(">i",shx[24:28])[0] * 2 == len(shx)
+    # Walk the shp records and compare them with the index
+    offsets = []
+    position = 100
+    while position < len(shp):
+        number, length = struct.unpack(">ii",shp[position:position + 8])
+        assert number == len(offsets) + 1
+        offsets.append((position // 2, length))
+        position += 8 + 2 * length
+    assert position == len(shp)
+    index = [struct.unpack(">ii",shx[100 + 8 * i:108 + 8 * i]) for i in range((len(shx) - 100) // 8)]
+    assert index == offsets
+    nRecords, headerLength, recordLength = struct.unpack("<IHH",dbf[4:12])
+    assert nRecords == len(offsets)
+    assert len(dbf) == headerLength + nRecords * recordLength + 1 and dbf[-1:] == b"\x1a"
+    return [int(dbf[headerLength + i * recordLength + 1:headerLength + i * recordLength + 11])
+            for i in range(nRecords)]
+
+def ReadGeoPackage(outName):
+    connection = sqlite3.connect(outName)
+    table = os.path.splitext(os.path.basename(outName))[0]
+    ids = [row[0] for row in connection.execute('SELECT "FromID" FROM "%s" ORDER BY fid' %table)]
+    bbox = connection.execute("SELECT min_x, min_y, max_x, max_y FROM gpkg_contents").fetchone()
+    connection.close()
+    assert None not in bbox
+    return ids
+
+def CheckResume(outName,read,tear):
+    patchIDs = list(range(1,30))
+    writer = WritePatches(outName,patchIDs,False,crashAfter=17)
+    tear(writer)
+    # Some features on disk belong to patches missing from the ledger
+    ledger = GeoHATledger.CompletionLedger(outName,True)
+    assert 0 < len(ledger.completed) < 17
+    assert writer.Count() > len(ExpectedIDs(sorted(ledger.completed)))
+    ledger.Close()
+    resumed = WritePatches(outName,patchIDs,True)
+    assert resumed.resumed
+    assert read(outName) == ExpectedIDs(patchIDs)
+
+def test_shapefile_resume():
+    """A resumed shapefile holds each patch's features once, with consistent headers"""
+    folder = tempfile.mkdtemp()
+    try:
+        def Tear(writer):
+            # Die mid batch: half a record on the end of the shp and dbf
+            for outFile in (writer.shpFile, writer.dbfFile):
+                outFile.write(b"\0" * 13)
+                outFile.close()
+            writer.shxFile.close()
+        CheckResume(os.path.join(folder,"paths.shp"),ReadShapefile,Tear)
+        # Resuming with an empty ledger starts over
+        WritePatches(os.path.join(folder,"paths.shp"),[3, 4],False)
+        assert ReadShapefile(os.path.join(folder,"paths.shp")) == ExpectedIDs([3, 4])
+    finally:
+        shutil.rmtree(folder)
+
+def test_geopackage_resume():
+    """A resumed GeoPackage holds each patch's features once"""
+    folder = tempfile.mkdtemp()
+    try:
+        def Tear(writer):
+            writer.connection.close()
+        CheckResume(os.path.join(folder,"paths.gpkg"),ReadGeoPackage,Tear)
+    finally:
+        shutil.rmtree(folder)
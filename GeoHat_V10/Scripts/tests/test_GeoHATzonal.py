@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# Tests of the GeoHATzonal summaries against brute force loops
+import os, sys, math
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import GeoHATzonal
+
+def RandomZones(rng,shape,nZones,density=0.5):
+    zoneArr = rng.randint(1,nZones + 1,shape).astype(np.int32)
+    zoneArr[rng.rand(*shape) > density] = 0
+    return zoneArr
+
+def test_window_minimum():
+    """Window minimums match a loop over the zones' cells in the window"""
+    rng = np.random.RandomState(0)
+    zoneArr = RandomZones(rng,(30,40),15,0.3)
+    index = GeoHATzonal.ZonePixelIndex(zoneArr)
+    for row0, col0, shape, minID in [(0,0,(30,40),None), (5,7,(10,12),None),
+                                     (25,35,(5,5),None), (3,2,(20,20),6)]:
+        window = rng.uniform(0,10,shape).astype(np.float32)
+        window[rng.rand(*shape) < 0.2] = np.inf
+        window[rng.rand(*shape) < 0.1] = np.nan
+        expected = {}
+        for r in range(shape[0]):
+            for c in range(shape[1]):
+                zone = zoneArr[row0 + r,col0 + c]
+                if zone and np.isfinite(window[r,c]) and (minID is None or zone > minID):
+                    expected[zone] = min(expected.get(zone,np.inf),window[r,c])
+        ids, mins = index.WindowMinimum(window,row0,col0,minID)
+        assert list(ids) == sorted(expected)
+        assert np.array_equal(mins,[expected[zone] for zone in ids])
+        assert mins.dtype == np.float32
+
+def BruteAdjacency(zoneArr,connectivity):
+    nRows, nCols = zoneArr.shape
+    pairs = {}
+    shifts = [(0,1), (1,0)]
+    if connectivity == 8:
+        shifts += [(1,1), (1,-1)]
+    for r in range(nRows):
+        for c in range(nCols):
+            for dr, dc in shifts:
+                rr = r + dr
+                cc = c + dc
+                if rr >= nRows or cc < 0 or cc >= nCols:
+                    continue
+                a = zoneArr[r,c]
+                b = zoneArr[rr,cc]
+                if a and b and a != b:
+                    key = (min(a,b), max(a,b))
+                    pairs[key] = pairs.get(key,0) + (dr == 0 or dc == 0)
+    return pairs
+
+def Tiles(zoneArr,tileSize,halo):
+    '''Haloed tiles of an array, as GeoHATutils.RasterTiles reads them'''
+    nRows, nCols = zoneArr.shape
+    padded = np.zeros((nRows + 2 * halo, nCols + 2 * halo),zoneArr.dtype)
+    padded[halo:halo + nRows,halo:halo + nCols] = zoneArr
+    for row0 in range(0,nRows,tileSize):
+        for col0 in range(0,nCols,tileSize):
+            coreRows = min(tileSize,nRows - row0)
+            coreCols = min(tileSize,nCols - col0)
+            yield padded[row0:row0 + coreRows + 2 * halo,col0:col0 + coreCols + 2 * halo]
+
+def test_zone_adjacency():
+    """Tiled adjacency summed over the tiles matches the untiled result and brute force"""
+    rng = np.random.RandomState(1)
+    zoneArr = RandomZones(rng,(23,31),9,0.7)
+    for connectivity in (4, 8):
+        keys, edges = GeoHATzonal.ZoneAdjacency(zoneArr,connectivity)
+        fromIDs, toIDs = GeoHATzonal.UnpackPairs(keys)
+        expected = BruteAdjacency(zoneArr,connectivity)
+        assert list(zip(fromIDs,toIDs)) == sorted(expected)
+        assert list(edges) == [expected[key] for key in sorted(expected)]
+        for tileSize in (1, 5, 8, 40):
+            keyList = []
+            edgeList = []
+            for tile in Tiles(zoneArr,tileSize,1):
+                tileKeys, tileEdges = GeoHATzonal.ZoneAdjacency(tile,connectivity,0,1)
+                keyList.append(tileKeys)
+                edgeList.append(tileEdges)
+            tiledKeys, tiledEdges = GeoHATzonal.SumByKey(np.concatenate(keyList),np.concatenate(edgeList))
+            assert np.array_equal(tiledKeys,keys) and np.array_equal(tiledEdges,edges), (connectivity, tileSize)
+
+def test_zone_perimeters():
+    """Perimeters count every cell edge not shared with the same zone"""
+    rng = np.random.RandomState(2)
+    zoneArr = RandomZones(rng,(12,17),6,0.6)
+    padded = np.zeros((14,19),zoneArr.dtype)
+    padded[1:-1,1:-1] = zoneArr
+    expected = np.zeros(zoneArr.max() + 1)
+    for r in range(1,13):
+        for c in range(1,18):
+            zone = padded[r,c]
+            if zone:
+                for dr, dc in ((0,1), (0,-1), (1,0), (-1,0)):
+                    expected[zone] += padded[r + dr,c + dc] != zone
+    assert np.array_equal(GeoHATzonal.ZonePerimeters(zoneArr),expected)
+
+def test_patch_geometry():
+    """Geometry attributes match loops over each patch's cells"""
+    rng = np.random.RandomState(3)
+    zoneArr = np.zeros((25,30),np.int32)
+    zoneArr[2:12,3:15] = 4
+    zoneArr[14:23,5:9] = 7
+    zoneArr[15:24,12:29] = RandomZones(rng,(9,17),3,0.9) * 3
+    cellSize = 30.0
+    edgeWidth = 45.0
+    ids, attributes, dist = GeoHATzonal.PatchGeometry(zoneArr,cellSize,edgeWidth)
+    edgeRows, edgeCols = np.nonzero(zoneArr == 0)
+    perimeters = GeoHATzonal.ZonePerimeters(zoneArr)
+    assert list(ids) == sorted(set(zoneArr.ravel()) - set([0]))
+    for k, zone in enumerate(ids):
+        rows, cols = np.nonzero(zoneArr == zone)
+        toEdge = [np.hypot(edgeRows - r,edgeCols - c).min() * cellSize for r, c in zip(rows,cols)]
+        area = len(rows) * cellSize ** 2
+        core = np.sum(np.array(toEdge) > edgeWidth)
+        assert np.isclose(attributes['PatchArea'][k],area / 10000.0)
+        assert np.isclose(attributes['CoreArea'][k],core * cellSize ** 2 / 10000.0)
+        assert np.isclose(attributes['CAratio'][k],core / float(len(rows)))
+        assert np.isclose(attributes['DistToEdge'][k],np.mean(toEdge),rtol=1e-5)
+        assert np.isclose(attributes['ShapeIdx'][k],4 * math.sqrt(area) / (perimeters[zone] * cellSize))
+    # A 10 x 12 rectangle
+    assert np.isclose(attributes['ShapeIdx'][list(ids).index(4)],4 * math.sqrt(120.0) / 44)
+
+def test_edge_efficiency():
+    """Per patch counts and sums match a loop over the edges"""
+    rng = np.random.RandomState(4)
+    patchIDs = rng.randint(1,20,300)
+    targetIDs = rng.randint(1,40,300)
+    costs = rng.uniform(0,1500,300)
+    values = np.arange(2,40,3)
+    counts = rng.randint(1,1000,len(values))
+    maxDistance = 1000.0
+    cellArea = 900.0
+    ids, nEdges, areas, idwAreas = GeoHATzonal.EdgeEfficiency(patchIDs,targetIDs,costs,values,
+                                                              counts,maxDistance,cellArea)
+    expected = {}
+    for patchID, targetID, cost in zip(patchIDs,targetIDs,costs):
+        if cost >= maxDistance:
+            continue
+        area = 0.0
+        if targetID in values:
+            area = counts[list(values).index(targetID)] * cellArea
+        n, a, w = expected.get(patchID,(0,0.0,0.0))
+        expected[patchID] = (n + 1, a + area, w + area * math.exp(math.log(0.1) * cost / maxDistance))
+    assert list(ids) == sorted(expected)
+    for k, patchID in enumerate(ids):
+        n, a, w = expected[patchID]
+        assert nEdges[k] == n and np.isclose(areas[k],a) and np.isclose(idwAreas[k],w)
+    # No target zones at all
+    ids, nEdges, areas, idwAreas = GeoHATzonal.EdgeEfficiency(patchIDs,targetIDs,costs,[],[],maxDistance)
+    assert not areas.any()
+
+def test_crosstab():
+    """Crosstab counts and summaries match loops over the cells"""
+    rng = np.random.RandomState(5)
+    zoneArr = RandomZones(rng,(20,25),8,0.8)
+    classArr = RandomZones(rng,(20,25),5,0.9) * 10
+    keys, counts = GeoHATzonal.ZoneCrosstab(zoneArr,classArr,blockRows=3)
+    table = {}
+    for zone, cls in zip(zoneArr.ravel(),classArr.ravel()):
+        if zone and cls:
+            table[(zone,cls)] = table.get((zone,cls),0) + 1
+    zones, classes = GeoHATzonal.UnpackPairs(keys)
+    assert list(zip(zones,classes)) == sorted(table)
+    assert list(counts) == [table[key] for key in sorted(table)]
+    classValues = np.array([10, 20, 30, 50])
+    attributes = np.array([1.5, -1, 4.0, 8.0])
+    ids, cells, richness, evenness, meanAttribute = \
+        GeoHATzonal.CrosstabSummary(keys,counts,classValues,attributes)
+    assert list(ids) == sorted(set(zones))
+    for k, zone in enumerate(ids):
+        zoneCounts = np.array([table[key] for key in sorted(table) if key[0] == zone],float)
+        zoneClasses = [key[1] for key in sorted(table) if key[0] == zone]
+        assert cells[k] == zoneCounts.sum() and richness[k] == len(zoneCounts)
+        share = zoneCounts / zoneCounts.sum()
+        if len(share) > 1:
+            assert np.isclose(evenness[k],-(share * np.log(share)).sum() / math.log(len(share)))
+        else:
+            assert evenness[k] == 0
+        weights = [n for n, cls in zip(zoneCounts,zoneClasses) if cls in (10, 30, 50)]
+        values = [dict(zip(classValues,attributes))[cls] for cls in zoneClasses if cls in (10, 30, 50)]
+        if weights:
+            assert np.isclose(meanAttribute[k],np.dot(weights,values) / sum(weights))
+        else:
+            assert meanAttribute[k] == 0